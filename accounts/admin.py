@@ -61,15 +61,15 @@ class CoachAdmin(admin.ModelAdmin):
 
 @admin.register(Club)
 class ClubAdmin(admin.ModelAdmin):
-    list_display = ('name', 'coach', 'location', 'created_at', 'updated_at')
-    list_filter = ('created_at', 'updated_at')
-    search_fields = ('name', 'location', 'description', 'coach__user__username', 'coach__user__email')
+    list_display = ('name', 'coach', 'location', 'region', 'created_at', 'updated_at')
+    list_filter = ('region', 'created_at', 'updated_at')
+    search_fields = ('name', 'location', 'region', 'description', 'coach__user__username', 'coach__user__email')
     list_select_related = ('coach', 'coach__user')
     date_hierarchy = 'created_at'
     
     fieldsets = (
         ('Основная информация', {
-            'fields': ('name', 'coach', 'location')
+            'fields': ('name', 'coach', 'location', 'region')
         }),
         ('Дополнительная информация', {
             'fields': ('description',),
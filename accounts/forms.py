@@ -1,6 +1,6 @@
 from datetime import date
 from django import forms
-from accounts.models import UnregisteredParticipant, Profile_user, Profile_organizer
+from accounts.models import Club, UnregisteredParticipant, Profile_user, Profile_organizer
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django.contrib.auth.models import User, Group
@@ -284,6 +284,41 @@ class UnregisteredParticipantForm(forms.ModelForm):
             'birth_date': forms.DateInput(attrs={'type': 'date'})
         }
 
+    def _get_validation_exclusions(self):
+        exclude = super()._get_validation_exclusions()
+        # Уже известный гость не ошибка: запись находится по email и дате рождения (objects.resolve)
+        exclude.add('email')
+        return exclude
+
+
+# Форматы файлов импорта участников
+IMPORT_FORMATS = ('csv', 'xlsx')
+
+
+class ParticipantImportForm(forms.Form):
+    """Загрузка файла со списком участников клуба"""
+    file = forms.FileField(
+        label='Файл CSV или XLSX',
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.xlsx'})
+    )
+    club = forms.ModelChoiceField(
+        queryset=Club.objects.none(),
+        required=False,
+        label='Добавить в клуб',
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def __init__(self, *args, coach=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['club'].queryset = Club.objects.filter(coach=coach)
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        self.file_format = file.name.rsplit('.', 1)[-1].lower()
+        if self.file_format not in IMPORT_FORMATS:
+            raise ValidationError('Загрузите файл CSV или XLSX')
+        return file
+
 
 class OrganizerProfileForm(forms.ModelForm):
     class Meta:
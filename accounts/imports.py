@@ -0,0 +1,315 @@
+"""
+Импорт участников без аккаунта из CSV и XLSX.
+Файл читается построчно и обрабатывается порциями: строки проверяются формой участника,
+совпадения с уже существующими гостями ищутся одним запросом на порцию
+по email и дате рождения (уникальный индекс), новые участники вставляются bulk_create.
+Весь файл сохраняется в одной транзакции. Результат — отчет по каждой строке файла.
+"""
+import csv
+import io
+import re
+import zipfile
+from datetime import date, timedelta
+from itertools import chain
+from typing import NamedTuple
+from xml.etree import ElementTree
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Value
+
+from accounts.forms import UnregisteredParticipantForm
+from accounts.models import Coach, UnregisteredParticipant
+from accounts.models.unregistered_participant import IDENTITY_MISMATCH_MESSAGE, name_key, normalize_email
+
+# Строк файла в одной порции: один запрос совпадений и одна вставка
+IMPORT_BATCH_SIZE = 500
+
+IMPORT_CREATED = 'created'
+IMPORT_EXISTING = 'existing'
+IMPORT_DUPLICATE = 'duplicate'
+IMPORT_FOREIGN = 'foreign'
+IMPORT_INVALID = 'invalid'
+
+IMPORT_STATUS_LABELS = {
+    IMPORT_CREATED: 'Добавлен',
+    IMPORT_EXISTING: 'Уже есть в базе',
+    IMPORT_DUPLICATE: 'Повтор строки файла',
+    IMPORT_FOREIGN: 'Участник другого тренера',
+    IMPORT_INVALID: 'Ошибка',
+}
+
+# Чужой гость не добавляется в состав: иначе по email и дате рождения можно забрать спортсмена другого клуба
+FOREIGN_MESSAGE = "Участник с этим email и датой рождения уже есть в базе и не входит в ваш состав или клубы"
+
+# Заголовки столбцов файла (в нижнем регистре) и поля участника
+IMPORT_COLUMNS = {
+    'фамилия': 'last_name',
+    'имя': 'first_name',
+    'отчество': 'surname',
+    'пол': 'gender',
+    'дата рождения': 'birth_date',
+    'телефон': 'phone',
+    'email': 'email',
+    'e-mail': 'email',
+    'last_name': 'last_name',
+    'first_name': 'first_name',
+    'surname': 'surname',
+    'gender': 'gender',
+    'birth_date': 'birth_date',
+    'phone': 'phone',
+}
+REQUIRED_COLUMNS = ('last_name', 'first_name', 'birth_date', 'email')
+
+# Пол латиницей в выгрузках других систем
+GENDER_ALIASES = {'M': 'М', 'F': 'Ж', 'W': 'Ж'}
+
+# Даты XLSX хранятся числом дней от этой даты
+EXCEL_EPOCH = date(1899, 12, 30)
+EXCEL_DATE = re.compile(r'\d+(\.0+)?')
+
+XLSX_MAIN = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+XLSX_RELATIONSHIP = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}id'
+XLSX_PACKAGE_RELS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+
+class ImportResult(NamedTuple):
+    line: int
+    status: str
+    participant_id: int
+    errors: tuple
+
+    @property
+    def label(self):
+        return IMPORT_STATUS_LABELS[self.status]
+
+
+def read_csv(file):
+    """
+    Строки CSV из бинарного файла. Кодировка (UTF-8 или Windows-1251 из Excel)
+    и разделитель (запятая или точка с запятой) определяются по заголовку.
+    """
+    header = file.readline()
+    for encoding in ('utf-8-sig', 'cp1251'):
+        try:
+            header = header.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    text = io.TextIOWrapper(file, encoding=encoding, newline='')
+    try:
+        yield from csv.reader(chain([header], text), delimiter=delimiter)
+    except (UnicodeDecodeError, csv.Error):
+        raise ValidationError("Не удалось прочитать CSV: сохраните файл в UTF-8", code='invalid_file')
+
+
+def _xlsx_text(element):
+    return ''.join(node.text or '' for node in element.iter(f'{XLSX_MAIN}t'))
+
+
+def _xlsx_column(reference):
+    index = 0
+    for char in reference:
+        if not char.isalpha():
+            break
+        index = index * 26 + ord(char.upper()) - ord('A') + 1
+    return index - 1
+
+
+def _xlsx_first_sheet(archive):
+    workbook = ElementTree.fromstring(archive.read('xl/workbook.xml'))
+    rel_id = workbook.find(f'{XLSX_MAIN}sheets/{XLSX_MAIN}sheet').get(XLSX_RELATIONSHIP)
+    rels = ElementTree.fromstring(archive.read('xl/_rels/workbook.xml.rels'))
+    target = next(rel.get('Target') for rel in rels.iter(f'{XLSX_PACKAGE_RELS}Relationship') if rel.get('Id') == rel_id)
+    return target.lstrip('/') if target.startswith('/') else f'xl/{target}'
+
+
+def read_xlsx(file):
+    """Строки первого листа XLSX; лист разбирается потоково, в памяти только общие строки книги"""
+    try:
+        archive = zipfile.ZipFile(file)
+        sheet = _xlsx_first_sheet(archive)
+    except (zipfile.BadZipFile, KeyError, AttributeError, StopIteration, ElementTree.ParseError):
+        raise ValidationError("Файл не похож на книгу XLSX", code='invalid_file')
+
+    shared = []
+    if 'xl/sharedStrings.xml' in archive.namelist():
+        for _event, element in ElementTree.iterparse(archive.open('xl/sharedStrings.xml')):
+            if element.tag == f'{XLSX_MAIN}si':
+                shared.append(_xlsx_text(element))
+                element.clear()
+
+    root = None
+    for event, element in ElementTree.iterparse(archive.open(sheet), events=('start', 'end')):
+        if root is None:
+            root = element
+        if event != 'end' or element.tag != f'{XLSX_MAIN}row':
+            continue
+        row = []
+        for cell in element.iter(f'{XLSX_MAIN}c'):
+            reference = cell.get('r')
+            index = _xlsx_column(reference) if reference else len(row)
+            kind, value = cell.get('t'), cell.find(f'{XLSX_MAIN}v')
+            if kind == 'inlineStr':
+                text = _xlsx_text(cell)
+            elif value is None:
+                text = ''
+            elif kind == 's':
+                text = shared[int(value.text)]
+            else:
+                text = value.text or ''
+            row.extend([''] * (index - len(row)))
+            row.append(text)
+        yield row
+        # Разобранные строки листа не накапливаются в дереве
+        root.clear()
+
+
+def read_rows(file, file_format):
+    """Строки файла в формате csv или xlsx"""
+    return read_csv(file) if file_format == 'csv' else read_xlsx(file)
+
+
+def _normalize(data):
+    """Значения ячеек к виду формы участника: пол кириллицей, дата из числа XLSX"""
+    data = {field: (value or '').strip() for field, value in data.items()}
+    gender = data.get('gender', '')[:1].upper()
+    data['gender'] = GENDER_ALIASES.get(gender, gender)
+    if EXCEL_DATE.fullmatch(data.get('birth_date', '')):
+        data['birth_date'] = (EXCEL_EPOCH + timedelta(days=int(float(data['birth_date'])))).isoformat()
+    return data
+
+
+def _identity(email, birth_date):
+    return normalize_email(email), birth_date
+
+
+def _columns(header):
+    columns = {}
+    for index, title in enumerate(header):
+        field = IMPORT_COLUMNS.get((title or '').strip().lower())
+        if field:
+            columns.setdefault(field, index)
+    missing = [field for field in REQUIRED_COLUMNS if field not in columns]
+    if missing:
+        labels = [UnregisteredParticipant._meta.get_field(field).verbose_name for field in missing]
+        raise ValidationError(f"В файле нет столбцов: {', '.join(labels)}", code='missing_columns')
+    return columns
+
+
+def _owned_by(coach):
+    """Гость уже в составе тренера или в одном из его клубов"""
+    participant = OuterRef('pk')
+    return Exists(Coach.unregistered_participants.through.objects.filter(
+        coach=coach, unregisteredparticipant=participant
+    )) | Exists(UnregisteredParticipant.clubs.through.objects.filter(
+        club__coach=coach, unregisteredparticipant=participant
+    ))
+
+
+def _insert(created):
+    """
+    Вставляет новых гостей и проставляет им id. Гостя с тем же email и датой рождения
+    мог только что добавить параллельный запрос: такая строка пропускается и остается без id,
+    если ее данные отличаются от строки файла.
+    """
+    UnregisteredParticipant.objects.bulk_create(created, ignore_conflicts=True)
+    fields = ('last_name', 'first_name', 'surname', 'gender', 'phone')
+    inserted = UnregisteredParticipant.objects.with_email_key().filter(
+        email_key__in={normalize_email(participant.email) for participant in created},
+        birth_date__in={participant.birth_date for participant in created},
+    ).values_list('id', 'email', 'birth_date', *fields)
+    ids = {(_identity(email, birth_date), tuple(values)): pk for pk, email, birth_date, *values in inserted}
+    for participant in created:
+        key = _identity(participant.email, participant.birth_date)
+        participant.pk = ids.get((key, tuple(getattr(participant, field) for field in fields)))
+
+
+def _import_batch(batch, columns, seen, coach, club):
+    results, pending = {}, []
+    for line, row in batch:
+        form = UnregisteredParticipantForm(_normalize({
+            field: row[index] if index < len(row) else '' for field, index in columns.items()
+        }))
+        if form.is_valid():
+            pending.append((line, form.cleaned_data))
+        else:
+            results[line] = ImportResult(line, IMPORT_INVALID, None, tuple(
+                f"{form.fields[field].label}: {error}" if field in form.fields else error
+                for field, errors in form.errors.items() for error in errors
+            ))
+
+    # Совпадения со всей базой — одним запросом по уникальному индексу (email, дата рождения)
+    found = {}
+    if pending:
+        existing = UnregisteredParticipant.objects.with_email_key().filter(
+            email_key__in={normalize_email(data['email']) for _line, data in pending},
+            birth_date__in={data['birth_date'] for _line, data in pending},
+        ).annotate(
+            owned=_owned_by(coach) if coach is not None else Value(True)
+        ).values_list('id', 'email', 'birth_date', 'last_name', 'first_name', 'owned')
+        for participant_id, email, birth_date, last_name, first_name, owned in existing:
+            found[_identity(email, birth_date)] = (participant_id if owned else None, name_key(last_name, first_name))
+
+    created, linked = [], []
+    for line, data in pending:
+        key = _identity(data['email'], data['birth_date'])
+        if key in seen:
+            first_line, participant = seen[key]
+            results[line] = (IMPORT_DUPLICATE, participant, (f"Совпадает со строкой {first_line}",))
+        elif key in found:
+            participant_id, name = found[key]
+            if participant_id is None:
+                results[line] = (IMPORT_FOREIGN, None, (FOREIGN_MESSAGE,))
+            elif name != name_key(data['last_name'], data['first_name']):
+                participant_id = None
+                results[line] = (IMPORT_INVALID, None, (IDENTITY_MISMATCH_MESSAGE,))
+            else:
+                linked.append(participant_id)
+                results[line] = (IMPORT_EXISTING, participant_id, ())
+            seen[key] = (line, participant_id)
+        else:
+            participant = UnregisteredParticipant(**data)
+            seen[key] = (line, participant)
+            created.append(participant)
+            results[line] = (IMPORT_CREATED, participant, ())
+
+    if created:
+        _insert(created)
+        linked += [participant.pk for participant in created if participant.pk is not None]
+    if coach is not None and linked:
+        coach.unregistered_participants.add(*linked)
+    if club is not None and linked:
+        club.unregistered_participants.add(*linked)
+
+    for line, _row in batch:
+        result = results[line]
+        if not isinstance(result, ImportResult):
+            status, participant, errors = result
+            if status == IMPORT_CREATED and participant.pk is None:
+                status, errors = IMPORT_FOREIGN, (FOREIGN_MESSAGE,)
+            result = ImportResult(line, status, getattr(participant, 'pk', participant), errors)
+        yield result
+
+
+def import_participants(rows, coach=None, club=None, batch_size=IMPORT_BATCH_SIZE):
+    """
+    Импортирует участников из строк файла (первая строка — заголовок) и отдает ImportResult
+    по каждой непустой строке. Новые участники и уже известные участники тренера добавляются
+    в его состав и в клуб; чужие гости только попадают в отчет.
+    Файл сохраняется целиком или не сохраняется совсем: ошибка чтения посреди файла откатывает все порции.
+    """
+    rows = iter(rows)
+    columns = _columns(next(rows, []))
+    seen, batch = {}, []
+    with transaction.atomic():
+        for line, row in enumerate(rows, start=2):
+            if not any((value or '').strip() for value in row):
+                continue
+            batch.append((line, row))
+            if len(batch) >= batch_size:
+                yield from _import_batch(batch, columns, seen, coach, club)
+                batch = []
+        if batch:
+            yield from _import_batch(batch, columns, seen, coach, club)
@@ -0,0 +1,46 @@
+from collections import Counter
+
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from accounts.forms import IMPORT_FORMATS
+from accounts.imports import IMPORT_BATCH_SIZE, IMPORT_CREATED, IMPORT_STATUS_LABELS, import_participants, read_rows
+from accounts.models import Club, Coach
+
+
+class Command(BaseCommand):
+    help = 'Импортирует участников без аккаунта из CSV или XLSX и выводит отчет по строкам'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу')
+        parser.add_argument('--format', choices=IMPORT_FORMATS, help='Формат файла, по умолчанию — по расширению')
+        parser.add_argument('--coach', type=int, help='ID тренера: участники добавляются в его состав')
+        parser.add_argument('--club', type=int, help='ID клуба: участники добавляются в клуб')
+        parser.add_argument('--batch-size', type=int, default=IMPORT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        file_format = options['format'] or options['path'].rsplit('.', 1)[-1].lower()
+        if file_format not in IMPORT_FORMATS:
+            raise CommandError('Укажите --format: csv или xlsx')
+        try:
+            coach = Coach.objects.get(pk=options['coach']) if options['coach'] else None
+            club = Club.objects.get(pk=options['club']) if options['club'] else None
+        except (Coach.DoesNotExist, Club.DoesNotExist) as e:
+            raise CommandError(e)
+
+        counts = Counter()
+        with open(options['path'], 'rb') as file:
+            try:
+                for result in import_participants(
+                    read_rows(file, file_format), coach=coach, club=club, batch_size=options['batch_size']
+                ):
+                    counts[result.status] += 1
+                    # Новые участники перечисляются только с -v 2
+                    if result.status != IMPORT_CREATED or options['verbosity'] > 1:
+                        details = '; '.join(result.errors)
+                        self.stdout.write(f'{result.line}\t{result.label}\t{result.participant_id or ""}\t{details}')
+            except ValidationError as e:
+                raise CommandError(e.messages[0])
+
+        summary = ', '.join(f'{label}: {counts[status]}' for status, label in IMPORT_STATUS_LABELS.items())
+        self.stdout.write(self.style.SUCCESS(summary))
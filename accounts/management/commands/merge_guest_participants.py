@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from accounts.merge import MERGE_BATCH_SIZE, duplicate_groups, merge_duplicate_participants
+
+
+class Command(BaseCommand):
+    help = 'Сливает дубликаты гостей с одинаковыми email и датой рождения'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=MERGE_BATCH_SIZE, help='Групп дубликатов в транзакции')
+        parser.add_argument('--dry-run', action='store_true', help='Только посчитать группы дубликатов')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            self.stdout.write(f'Групп дубликатов: {duplicate_groups().count()}')
+            return
+        merged, unresolved = merge_duplicate_participants(options['batch_size'])
+        for participant_id in unresolved:
+            self.stdout.write(self.style.WARNING(
+                f'Гость {participant_id}: две оплаченные регистрации в одной категории, слияние пропущено'
+            ))
+        self.stdout.write(self.style.SUCCESS(f'Удалено дубликатов: {merged}'))
@@ -0,0 +1,105 @@
+"""
+Слияние дубликатов гостей: записи UnregisteredParticipant с одинаковыми email и датой рождения.
+Остается самая ранняя запись; регистрации, составы тренеров и членство в клубах
+переносятся на нее, дубликаты удаляются. Группы обрабатываются порциями, каждая — в своей транзакции.
+"""
+from collections import defaultdict
+
+from django.contrib.postgres.aggregates import ArrayAgg
+from django.db import transaction
+from django.db.models import Case, Count, When
+from django.db.models.functions import Lower
+
+from accounts.models import Coach, UnregisteredParticipant
+from payments.settings import PAYMENT_STATUS_SUCCEEDED
+from tournaments.models import Registration
+from tournaments.standings import rebuild_standings
+from tournaments.stats import invalidate_tournament_stats
+
+# Групп дубликатов в одной транзакции
+MERGE_BATCH_SIZE = 500
+
+
+def duplicate_groups():
+    """Id гостей каждой группы дубликатов, первым — сохраняемая запись"""
+    return UnregisteredParticipant.objects.values('birth_date', email_key=Lower('email')).annotate(
+        count=Count('id'), ids=ArrayAgg('id', ordering='id')
+    ).filter(count__gt=1).order_by('email_key', 'birth_date').values_list('ids', flat=True)
+
+
+def _repoint_memberships(through, keep):
+    """Переносит строки связи многие-ко-многим на сохраняемые записи; повторы пропускаются"""
+    other = next(
+        field.attname for field in through._meta.fields
+        if field.is_relation and field.related_model is not UnregisteredParticipant
+    )
+    rows = through.objects.filter(unregisteredparticipant_id__in=keep).values_list(other, 'unregisteredparticipant_id')
+    through.objects.bulk_create(
+        [through(**{other: other_id, 'unregisteredparticipant_id': keep[guest_id]}) for other_id, guest_id in rows],
+        ignore_conflicts=True
+    )
+
+
+def _conflicting_registrations(keep):
+    """
+    Регистрации, которые после слияния совпадут по турниру и категории.
+    В каждой такой группе остается оплаченная регистрация, иначе самая ранняя.
+    Возвращает (id лишних регистраций, сохраняемые записи с двумя оплатами в одной категории).
+    """
+    guests = set(keep) | set(keep.values())
+    registrations = defaultdict(list)
+    for reg in Registration.objects.filter(unregistered_participant__in=guests).with_last_payment().order_by('id'):
+        target = keep.get(reg.unregistered_participant_id, reg.unregistered_participant_id)
+        registrations[reg.tournament_id, reg.tournament_category_id, target].append(reg)
+
+    extra, unresolved = [], set()
+    for (_tournament, _category, target), regs in registrations.items():
+        paid = [reg for reg in regs if reg.last_payment_status == PAYMENT_STATUS_SUCCEEDED]
+        if len(paid) > 1:
+            unresolved.add(target)
+        kept = paid[0] if paid else regs[0]
+        extra += [(target, reg.pk) for reg in regs if reg is not kept]
+    return [pk for target, pk in extra if target not in unresolved], unresolved
+
+
+def _merge_batch(groups):
+    keep = {duplicate: ids[0] for ids in groups for duplicate in ids[1:]}
+    extra, unresolved = _conflicting_registrations(keep)
+    # Две оплаченные регистрации в одной категории разбираются вручную, группа не сливается
+    keep = {duplicate: target for duplicate, target in keep.items() if target not in unresolved}
+    if not keep:
+        return 0, False, unresolved
+
+    with transaction.atomic():
+        # Удаление через ORM: сигналы уменьшают счетчики мест
+        Registration.objects.filter(pk__in=extra).delete()
+        moved = Registration.objects.filter(unregistered_participant__in=keep)
+        tournaments = set(moved.values_list('tournament_id', flat=True))
+        has_places = moved.filter(place__isnull=False).exists()
+        moved.update(unregistered_participant=Case(
+            *(When(unregistered_participant=duplicate, then=target) for duplicate, target in keep.items())
+        ))
+        _repoint_memberships(Coach.unregistered_participants.through, keep)
+        _repoint_memberships(UnregisteredParticipant.clubs.through, keep)
+        UnregisteredParticipant.objects.filter(pk__in=keep).delete()
+    for tournament_id in tournaments:
+        invalidate_tournament_stats(tournament_id)
+    return len(keep), has_places, unresolved
+
+
+def merge_duplicate_participants(batch_size=MERGE_BATCH_SIZE):
+    """
+    Сливает дубликаты гостей. Возвращает (количество удаленных дубликатов, id гостей,
+    оставленных с дубликатами из-за двух оплаченных регистраций в одной категории).
+    """
+    groups = list(duplicate_groups())
+    merged, rebuild, unresolved = 0, False, set()
+    for start in range(0, len(groups), batch_size):
+        count, has_places, skipped = _merge_batch(groups[start:start + batch_size])
+        merged += count
+        rebuild = rebuild or has_places
+        unresolved |= skipped
+    # Медальный зачет спортсменов ведется по id гостя
+    if rebuild:
+        rebuild_standings()
+    return merged, sorted(unresolved)
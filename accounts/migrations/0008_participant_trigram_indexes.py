@@ -0,0 +1,52 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:43
+
+import django.contrib.postgres.indexes
+import django.db.models.functions.text
+from django.contrib.postgres.operations import TrigramExtension
+from django.conf import settings
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_unregisteredparticipant_clubs'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        # auth_user — модель Django, поэтому индекс по email создается вручную
+        migrations.RunSQL(
+            'CREATE INDEX auth_user_email_trgm ON auth_user USING gin ((UPPER(email::text)) gin_trgm_ops);',
+            'DROP INDEX IF EXISTS auth_user_email_trgm;',
+        ),
+        migrations.AddIndex(
+            model_name='profile_user',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='gin_trgm_ops'), name='profile_user_last_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='profile_user',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='gin_trgm_ops'), name='profile_user_first_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='profile_user',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('phone'), name='gin_trgm_ops'), name='profile_user_phone_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='unregisteredparticipant',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('last_name'), name='gin_trgm_ops'), name='unreg_last_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='unregisteredparticipant',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('first_name'), name='gin_trgm_ops'), name='unreg_first_name_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='unregisteredparticipant',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('phone'), name='gin_trgm_ops'), name='unreg_phone_trgm'),
+        ),
+        migrations.AddIndex(
+            model_name='unregisteredparticipant',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.indexes.OpClass(django.db.models.functions.text.Upper('email'), name='gin_trgm_ops'), name='unreg_email_trgm'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_participant_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='club',
+            name='region',
+            field=models.CharField(blank=True, max_length=100, verbose_name='Регион'),
+        ),
+    ]
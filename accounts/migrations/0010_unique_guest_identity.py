@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:23
+
+import django.db.models.functions.text
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+
+def check_duplicates(apps, schema_editor):
+    """Уникальный индекс не создастся, пока в таблице есть дубликаты гостей"""
+    UnregisteredParticipant = apps.get_model('accounts', 'UnregisteredParticipant')
+    duplicates = UnregisteredParticipant.objects.annotate(email_key=Lower('email')).values(
+        'email_key', 'birth_date'
+    ).annotate(count=Count('id')).filter(count__gt=1).count()
+    if duplicates:
+        raise RuntimeError(
+            f'Дубликатов гостей: {duplicates}. Сначала выполните manage.py merge_guest_participants'
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_club_region'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicates, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='unregisteredparticipant',
+            constraint=models.UniqueConstraint(django.db.models.functions.text.Lower('email'), models.F('birth_date'), name='unique_guest_identity'),
+        ),
+    ]
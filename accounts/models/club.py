@@ -7,6 +7,7 @@ class Club(models.Model):
     name = models.CharField(max_length=100, verbose_name=_('Название клуба'))
     coach = models.ForeignKey(Coach, on_delete=models.CASCADE, related_name='clubs', verbose_name=_('Тренер'))
     location = models.TextField(verbose_name=_('Место расположения'))
+    region = models.CharField(max_length=100, blank=True, verbose_name=_('Регион'))
     description = models.TextField(blank=True, verbose_name=_('Описание'))
     created_at = models.DateTimeField(auto_now_add=True, verbose_name=_('Дата создания'))
     updated_at = models.DateTimeField(auto_now=True, verbose_name=_('Дата обновления'))
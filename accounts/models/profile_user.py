@@ -1,4 +1,6 @@
+from django.contrib.postgres.indexes import GinIndex, OpClass
 from django.db import models
+from django.db.models.functions import Upper
 from django.contrib.auth.models import User
 from django.utils.translation import gettext as _
 
@@ -18,6 +20,14 @@ class Profile_user(models.Model):
         blank=True,
         verbose_name=_('Клубы')
     )
+
+    class Meta:
+        indexes = [
+            # Триграммы по UPPER(...): icontains при регистрации на месте и взвешивании
+            GinIndex(OpClass(Upper('last_name'), name='gin_trgm_ops'), name='profile_user_last_name_trgm'),
+            GinIndex(OpClass(Upper('first_name'), name='gin_trgm_ops'), name='profile_user_first_name_trgm'),
+            GinIndex(OpClass(Upper('phone'), name='gin_trgm_ops'), name='profile_user_phone_trgm'),
+        ]
     
     def __str__(self):
         return f'Профиль {self.user.username}'
@@ -1,5 +1,56 @@
-from django.db import models
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models.functions import Lower, Upper
 from django.utils.translation import gettext as _
+from psycopg2.errorcodes import UNIQUE_VIOLATION
+
+
+def normalize_email(email):
+    """Email для сравнения личностей гостей; совпадает с Lower('email') уникального индекса"""
+    return email.strip().lower()
+
+
+def name_key(last_name, first_name):
+    """Фамилия и имя для сверки гостя, найденного по email и дате рождения"""
+    return last_name.strip().casefold(), first_name.strip().casefold()
+
+
+# Email и дата рождения совпали, а имя нет: чужую запись не подставляем в регистрацию
+IDENTITY_MISMATCH_MESSAGE = (
+    "Участник с этим email и датой рождения уже зарегистрирован под другим именем. "
+    "Проверьте данные или обратитесь к организатору"
+)
+
+
+class UnregisteredParticipantQuerySet(models.QuerySet):
+    def with_email_key(self):
+        return self.alias(email_key=Lower('email'))
+
+    def identity(self, email, birth_date):
+        """Гость с тем же email и датой рождения; запрос идет по уникальному индексу"""
+        return self.with_email_key().filter(email_key=normalize_email(email), birth_date=birth_date)
+
+    def resolve(self, **data):
+        """
+        Гость по email и дате рождения: существующая запись или новая.
+        Данные уже известного гостя не перезаписываются; если у него другие фамилия или имя,
+        поднимается ValidationError. Возвращает (участник, создан ли).
+        """
+        data['email'] = data['email'].strip()
+        participant = self.identity(data['email'], data['birth_date']).first()
+        if participant is None:
+            try:
+                with transaction.atomic():
+                    return self.create(**data), True
+            except IntegrityError as e:
+                # Тот же гость одновременно регистрируется в другой вкладке
+                if getattr(e.__cause__, 'pgcode', None) != UNIQUE_VIOLATION:
+                    raise
+            participant = self.identity(data['email'], data['birth_date']).get()
+        if name_key(participant.last_name, participant.first_name) != name_key(data['last_name'], data['first_name']):
+            raise ValidationError(IDENTITY_MISMATCH_MESSAGE, code='identity_mismatch')
+        return participant, False
 
 
 class UnregisteredParticipant(models.Model):
@@ -19,9 +70,22 @@ class UnregisteredParticipant(models.Model):
         verbose_name=_('Клубы')
     )
 
+    objects = UnregisteredParticipantQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'Незарегистрированный участник'
         verbose_name_plural = 'Незарегистрированные участники'
+        constraints = [
+            # Один гость — одна запись: повторные регистрации и импорт находят ее по email и дате рождения
+            models.UniqueConstraint(Lower('email'), 'birth_date', name='unique_guest_identity'),
+        ]
+        indexes = [
+            # Триграммы по UPPER(...): icontains при регистрации на месте и взвешивании
+            GinIndex(OpClass(Upper('last_name'), name='gin_trgm_ops'), name='unreg_last_name_trgm'),
+            GinIndex(OpClass(Upper('first_name'), name='gin_trgm_ops'), name='unreg_first_name_trgm'),
+            GinIndex(OpClass(Upper('phone'), name='gin_trgm_ops'), name='unreg_phone_trgm'),
+            GinIndex(OpClass(Upper('email'), name='gin_trgm_ops'), name='unreg_email_trgm'),
+        ]
 
     def __str__(self):
         return f"{self.last_name} {self.first_name} {self.surname}"
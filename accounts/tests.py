@@ -1,3 +1,186 @@
+import io
+import tempfile
+import zipfile
+from datetime import date
+
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
 from django.test import TestCase
+from django.urls import reverse
+
+from accounts.imports import (
+    IMPORT_CREATED,
+    IMPORT_DUPLICATE,
+    IMPORT_EXISTING,
+    IMPORT_FOREIGN,
+    IMPORT_INVALID,
+    import_participants,
+    read_csv,
+    read_xlsx,
+)
+from accounts.models import Club, Coach, UnregisteredParticipant
+
+CSV_HEADER = 'Фамилия;Имя;Отчество;Пол;Дата рождения;Телефон;Email\n'
+
+
+def make_xlsx(rows):
+    """Книга XLSX с общими строками; числа записываются числовыми ячейками"""
+    shared, sheet_rows = [], []
+    for number, row in enumerate(rows, start=1):
+        cells = []
+        for column, value in enumerate(row):
+            reference = f'{chr(ord("A") + column)}{number}'
+            if isinstance(value, int):
+                cells.append(f'<c r="{reference}"><v>{value}</v></c>')
+            else:
+                shared.append(value)
+                cells.append(f'<c r="{reference}" t="s"><v>{len(shared) - 1}</v></c>')
+        sheet_rows.append(f'<row r="{number}">{"".join(cells)}</row>')
+    main = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as archive:
+        archive.writestr('xl/workbook.xml', (
+            f'<workbook xmlns="{main}" xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Лист1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        ))
+        archive.writestr('xl/_rels/workbook.xml.rels', (
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" Target="worksheets/sheet1.xml"/></Relationships>'
+        ))
+        archive.writestr('xl/sharedStrings.xml', (
+            f'<sst xmlns="{main}">{"".join(f"<si><t>{value}</t></si>" for value in shared)}</sst>'
+        ))
+        archive.writestr('xl/worksheets/sheet1.xml', (
+            f'<worksheet xmlns="{main}"><sheetData>{"".join(sheet_rows)}</sheetData></worksheet>'
+        ))
+    buffer.seek(0)
+    return buffer
+
+
+class ParticipantImportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('coach', 'coach@example.com', 'password')
+        self.coach = Coach.objects.create(user=self.user)
+        self.club = Club.objects.create(name='Клуб', location='Москва', coach=self.coach)
+        self.existing = UnregisteredParticipant.objects.create(
+            last_name='Иванов', first_name='Иван', surname='Иванович', gender='М',
+            birth_date=date(2010, 3, 15), phone='+70000000000', email='Ivanov@Example.com'
+        )
+
+    def csv(self, *lines, encoding='utf-8'):
+        return io.BytesIO((CSV_HEADER + ''.join(f'{line}\n' for line in lines)).encode(encoding))
+
+    def test_rows_matched_deduplicated_and_created(self):
+        file = self.csv(
+            'Иванов;Иван;Иванович;М;15.03.2010;+70000000000;ivanov@example.com',
+            'Петров;Петр;Петрович;M;2011-05-01;+70000000001;petrov@example.com',
+            '',
+            'Петров;Петр;Петрович;М;01.05.2011;+70000000001;PETROV@example.com',
+            'Сидоров;;Сидорович;М;31.02.2011;+70000000002;не почта',
+        )
+        self.coach.unregistered_participants.add(self.existing)
+        results = list(import_participants(read_csv(file), coach=self.coach, club=self.club))
+
+        self.assertEqual(
+            [(result.line, result.status) for result in results],
+            [(2, IMPORT_EXISTING), (3, IMPORT_CREATED), (5, IMPORT_DUPLICATE), (6, IMPORT_INVALID)]
+        )
+        self.assertEqual(results[0].participant_id, self.existing.pk)
+        self.assertEqual(results[2].participant_id, results[1].participant_id)
+        self.assertEqual(results[2].errors, ('Совпадает со строкой 3',))
+        self.assertEqual(len(results[3].errors), 3)
+        self.assertEqual(UnregisteredParticipant.objects.count(), 2)
+        self.assertEqual(set(self.coach.unregistered_participants.values_list('last_name', flat=True)), {'Иванов', 'Петров'})
+        self.assertEqual(self.club.unregistered_participants.count(), 2)
+
+    def test_batch_costs_constant_queries(self):
+        lines = [f'Спортсмен{n};Иван;Иванович;М;15.03.2010;+70000000000;athlete{n}@example.com' for n in range(200)]
+        # На всю порцию: выборка совпадений, вставка участников, выборка их id и вставка состава тренера;
+        # весь импорт — в точке сохранения
+        with self.assertNumQueries(6):
+            results = list(import_participants(read_csv(self.csv(*lines)), coach=self.coach))
+        self.assertEqual({result.status for result in results}, {IMPORT_CREATED})
+
+        # Повторный импорт ничего не создает, но снова находит всех одной выборкой
+        results = list(import_participants(read_csv(self.csv(*lines)), batch_size=50))
+        self.assertEqual({result.status for result in results}, {IMPORT_EXISTING})
+        self.assertEqual(UnregisteredParticipant.objects.count(), 201)
+
+    def test_foreign_guest_reported_not_linked(self):
+        other = Coach.objects.create(user=User.objects.create_user('other', 'other@example.com', 'password'))
+        other.unregistered_participants.add(self.existing)
+        file = self.csv(
+            'Иванов;Иван;Иванович;М;15.03.2010;+70000000000;ivanov@example.com',
+            'Иванов;Иван;Иванович;М;15.03.2010;+70000000000;IVANOV@example.com',
+        )
+        results = list(import_participants(read_csv(file), coach=self.coach, club=self.club))
+        self.assertEqual([(result.status, result.participant_id) for result in results],
+                         [(IMPORT_FOREIGN, None), (IMPORT_DUPLICATE, None)])
+        self.assertFalse(self.coach.unregistered_participants.exists())
+        self.assertFalse(self.club.unregistered_participants.exists())
+
+        # Гость клуба тренера считается своим
+        self.club.unregistered_participants.add(self.existing)
+        results = list(import_participants(read_csv(self.csv(
+            'Иванов;Иван;Иванович;М;15.03.2010;+70000000000;ivanov@example.com'
+        )), coach=self.coach))
+        self.assertEqual(results[0].status, IMPORT_EXISTING)
+        self.assertTrue(self.coach.unregistered_participants.filter(pk=self.existing.pk).exists())
+
+    def test_name_mismatch_not_matched(self):
+        self.coach.unregistered_participants.add(self.existing)
+        file = self.csv('Петров;Иван;Иванович;М;15.03.2010;+70000000000;ivanov@example.com')
+        results = list(import_participants(read_csv(file), coach=self.coach))
+        self.assertEqual([(result.status, result.participant_id) for result in results], [(IMPORT_INVALID, None)])
+        self.assertIn('под другим именем', results[0].errors[0])
+        self.assertEqual(UnregisteredParticipant.objects.get().last_name, 'Иванов')
+
+    def test_failed_file_rolls_back_earlier_batches(self):
+        def rows():
+            yield from read_csv(self.csv(
+                'Петров;Петр;Петрович;М;01.05.2011;+70000000001;petrov@example.com',
+                'Сидоров;Сидор;Сидорович;М;01.05.2011;+70000000002;sidorov@example.com',
+            ))
+            raise ValidationError("Не удалось прочитать CSV: сохраните файл в UTF-8")
+
+        with self.assertRaises(ValidationError):
+            list(import_participants(rows(), coach=self.coach, batch_size=1))
+        self.assertEqual(UnregisteredParticipant.objects.count(), 1)
+        self.assertFalse(self.coach.unregistered_participants.exists())
+
+    def test_xlsx_and_windows_csv(self):
+        header = ['Фамилия', 'Имя', 'Отчество', 'Пол', 'Дата рождения', 'Телефон', 'Email']
+        file = make_xlsx([header, ['Петров', 'Петр', 'Петрович', 'М', 40664, '+70000000001', 'petrov@example.com']])
+        results = list(import_participants(read_xlsx(file)))
+        self.assertEqual(results[0].status, IMPORT_CREATED)
+        self.assertEqual(UnregisteredParticipant.objects.get(pk=results[0].participant_id).birth_date, date(2011, 5, 1))
+
+        file = self.csv('Сидоров;Сидор;Сидорович;Ж;01.01.2012;+70000000002;sidorov@example.com', encoding='cp1251')
+        self.assertEqual([result.status for result in import_participants(read_csv(file))], [IMPORT_CREATED])
+
+    def test_missing_columns_rejected(self):
+        file = io.BytesIO('Фамилия,Имя\nИванов,Иван\n'.encode())
+        with self.assertRaisesMessage(ValidationError, 'В файле нет столбцов: Дата рождения, Email'):
+            list(import_participants(read_csv(file)))
+
+    def test_upload_view_reports_rows(self):
+        self.client.login(username='coach', password='password')
+        upload = SimpleUploadedFile('club.csv', self.csv(
+            'Петров;Петр;Петрович;М;01.05.2011;+70000000001;petrov@example.com',
+            'Сидоров;Сидор;Сидорович;М;01.05.2011;+70000000002;',
+        ).getvalue())
+        response = self.client.post(reverse('accounts:import_participants'), {'file': upload, 'club': self.club.pk})
+        self.assertContains(response, 'Добавлено участников: 1, уже были в базе: 0')
+        self.assertEqual([result.line for result in response.context['report']], [3])
+        self.assertTrue(self.club.unregistered_participants.filter(last_name='Петров').exists())
 
-# Create your tests here.
+    def test_command_imports_file(self):
+        with tempfile.NamedTemporaryFile(suffix='.csv') as file:
+            file.write(self.csv('Петров;Петр;Петрович;М;01.05.2011;+70000000001;petrov@example.com').getvalue())
+            file.flush()
+            output = io.StringIO()
+            call_command('import_participants', file.name, coach=self.coach.pk, verbosity=2, stdout=output)
+        self.assertIn('Добавлен', output.getvalue())
+        self.assertTrue(self.coach.unregistered_participants.filter(last_name='Петров').exists())
@@ -15,6 +15,7 @@ urlpatterns = [
     path('profile/create-club/', views.create_club, name='create_club'),
     path('profile/edit-club/<int:club_id>/', views.edit_club, name='edit_club'),
     path('profile/delete-club/<int:club_id>/', views.delete_club, name='delete_club'),
+    path('profile/import-participants/', views.import_participants, name='import_participants'),
     path('coach/<int:coach_id>/clubs/', views.get_coach_clubs, name='get_coach_clubs'),
     
     path('profile/edit/', views.profile_edit_view, name='profile_edit'),
@@ -4,10 +4,13 @@ from django.contrib.auth import login
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect
 from django.contrib import messages
-from accounts.forms import RegisterForm, CoachProfileForm, OrganizerProfileForm
+from accounts.forms import RegisterForm, CoachProfileForm, OrganizerProfileForm, ParticipantImportForm
+from accounts import imports
 from django.contrib.auth.models import Group
 from accounts.models import Club, Coach
 import logging
+from collections import Counter
+from django.core.exceptions import ValidationError
 from django.http import JsonResponse
 from accounts.models.profile_user import Profile_user
 
@@ -219,6 +222,7 @@ def create_club(request):
             club = Club.objects.create(
                 name=request.POST.get('name'),
                 location=request.POST.get('location'),
+                region=request.POST.get('region', '').strip(),
                 description=request.POST.get('description', ''),
                 coach=request.user.coach
             )
@@ -243,6 +247,7 @@ def edit_club(request, club_id):
         try:
             club.name = request.POST.get('name')
             club.location = request.POST.get('location')
+            club.region = request.POST.get('region', '').strip()
             club.description = request.POST.get('description', '')
             club.save()
             messages.success(request, 'Клуб успешно обновлен!')
@@ -425,6 +430,41 @@ def remove_member(request, club_id, member_id):
             
     return redirect('accounts:profile')
 
+@login_required
+def import_participants(request):
+    """Импорт участников клуба из файла CSV или XLSX с отчетом по строкам"""
+    if not hasattr(request.user, 'coach'):
+        messages.error(request, 'Импорт участников доступен только тренерам')
+        return redirect('accounts:profile')
+
+    coach = request.user.coach
+    form = ParticipantImportForm(request.POST or None, request.FILES or None, coach=coach)
+    report, counts = [], Counter()
+    if request.method == 'POST' and form.is_valid():
+        rows = imports.read_rows(form.cleaned_data['file'].file, form.file_format)
+        try:
+            for result in imports.import_participants(rows, coach=coach, club=form.cleaned_data['club']):
+                counts[result.status] += 1
+                # В отчете на странице — строки, требующие внимания
+                if result.status in (imports.IMPORT_INVALID, imports.IMPORT_DUPLICATE, imports.IMPORT_FOREIGN):
+                    report.append(result)
+        except ValidationError as e:
+            # Импорт откатился целиком: частичный отчет не показываем
+            report, counts = [], Counter()
+            messages.error(request, e.messages[0])
+        else:
+            messages.success(request, f'Добавлено участников: {counts[imports.IMPORT_CREATED]}, '
+                                      f'уже были в базе: {counts[imports.IMPORT_EXISTING]}')
+            if counts[imports.IMPORT_FOREIGN]:
+                messages.warning(request, f'Не добавлены участники других тренеров: {counts[imports.IMPORT_FOREIGN]}')
+
+    return render(request, 'accounts/import_participants.html', {
+        'form': form,
+        'report': report,
+        'counts': [(label, counts[status]) for status, label in imports.IMPORT_STATUS_LABELS.items()],
+        'submitted': bool(counts),
+    })
+
 @login_required
 def edit_organizer_profile(request):
     """Редактирование профиля организатора"""
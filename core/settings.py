@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     'crispy_forms',
     'crispy_bootstrap5',
@@ -102,6 +103,24 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Для нескольких воркеров gunicorn лучше общий бэкенд (Redis, Memcached)
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'tournament',
+    },
+    # Общий для всех воркеров кэш в базе: для данных, которые сбрасываются сигналами
+    # (иначе сброс видит только воркер, обработавший запись). Таблицу создает миграция tournaments 0016
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'shared_cache',
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -0,0 +1,18 @@
+# ASGI-процессы для асинхронных представлений (SSE-поток результатов турнира):
+# gunicorn core.asgi:application -c gunicorn_asgi_config.py
+import multiprocessing
+
+bind = "unix:/run/gunicorn-asgi.sock"
+workers = multiprocessing.cpu_count()
+worker_class = "uvicorn.workers.UvicornWorker"
+# Открытые потоки не блокируют цикл событий, поэтому обычного таймаута достаточно
+timeout = 30
+graceful_timeout = 10
+
+# Logging
+accesslog = "/var/log/gunicorn/asgi_access.log"
+errorlog = "/var/log/gunicorn/asgi_error.log"
+loglevel = "info"
+
+# Process naming
+proc_name = "tournament_gunicorn_asgi"
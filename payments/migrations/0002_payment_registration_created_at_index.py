@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payments', '0001_initial'),
+        ('tournaments', '0010_create_missing_tournament_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payment',
+            index=models.Index(fields=['registration', '-created_at'], name='payments_pa_registr_8615ca_idx'),
+        ),
+    ]
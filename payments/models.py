@@ -16,4 +16,8 @@ class Payment(models.Model):
         return f"Payment {self.payment_id} - {self.amount} {self.currency}"
 
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+        indexes = [
+            # Последний платеж регистрации (Registration.objects.with_last_payment)
+            models.Index(fields=['registration', '-created_at']),
+        ]
\ No newline at end of file
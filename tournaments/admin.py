@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import TournamentCategoryTemplate, TournamentCategory, Tournament, FightingStyle, Registration
+from .models import TournamentCategoryTemplate, TournamentCategory, Tournament, FightingStyle, Registration, RegistrationPhase
 
 @admin.register(TournamentCategoryTemplate)
 class TournamentCategoryTemplateAdmin(admin.ModelAdmin):
@@ -14,10 +14,22 @@ class TournamentCategoryAdmin(admin.ModelAdmin):
     list_filter = ('edit',)
     search_fields = ('template',)
 
+class RegistrationPhaseInline(admin.TabularInline):
+    model = RegistrationPhase
+    fields = ('phase', 'starts_at', 'ends_at', 'price')
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+    def has_add_permission(self, request, obj=None):
+        return False  # Периоды строятся автоматически по датам турнира
+
+
 @admin.register(Tournament)
 class TournamentAdmin(admin.ModelAdmin):
     list_display = ('title', 'location', 'registration_deadline')
     filter_horizontal = ('fighting_styles', 'tournament_categories')
+    inlines = (RegistrationPhaseInline,)
     
 
 @admin.register(FightingStyle)
@@ -45,15 +57,16 @@ class RegistrationAdmin(admin.ModelAdmin):
             return f"{obj.unregistered_participant.last_name} {obj.unregistered_participant.first_name} {obj.unregistered_participant.surname} (Гость)"
     get_participant_name.short_description = 'Участник'
     
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_last_payment()
+
     def get_payment_status(self, obj):
-        last_payment = obj.payments.order_by('-created_at').first()
-        if last_payment:
-            if last_payment.status == 'succeeded':
-                return 'Оплачено'
-            elif last_payment.status == 'pending':
-                return 'В обработке'
-            elif last_payment.status == 'canceled':
-                return 'Отменено'
+        if obj.last_payment_status == 'succeeded':
+            return 'Оплачено'
+        elif obj.last_payment_status == 'pending':
+            return 'В обработке'
+        elif obj.last_payment_status == 'canceled':
+            return 'Отменено'
         return 'Не оплачено'
     get_payment_status.short_description = 'Статус оплаты'
     
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class MainPageConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'tournaments'
+
+    def ready(self):
+        # Сброс кэша статистики турниров при изменении регистраций и платежей
+        from tournaments import stats  # noqa: F401
+        # Изменение категорий и видов борьбы обновляет updated_at турниров (ключ кэша категорий и карточек)
+        from tournaments import categories  # noqa: F401
@@ -0,0 +1,281 @@
+"""
+Жеребьевка и построение сеток турнира.
+Участники группируются по категории, весу и поясу; для каждой группы строится
+олимпийская сетка с утешительными схватками или круговая система для маленьких групп.
+Жеребьевка воспроизводима: одно и то же зерно дает одинаковые сетки.
+"""
+import random
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from accounts.models import Profile_user, UnregisteredParticipant
+from tournaments.models import Bracket, Fight, Registration
+from tournaments.models.bracket import FORMAT_ROUND_ROBIN, FORMAT_SINGLE_ELIMINATION
+from tournaments.models.fight import (
+    SLOT_BLUE,
+    SLOT_RED,
+    STAGE_BRONZE,
+    STAGE_MAIN,
+    STAGE_REPECHAGE,
+    STAGE_ROUND_ROBIN,
+)
+
+# Группы до этого размера (от трех участников) проводятся по круговой системе
+ROUND_ROBIN_MAX = 5
+# Утешительные схватки проводятся, если в сетке есть четвертьфиналы
+REPECHAGE_MIN_SIZE = 8
+
+
+def bracket_size(participants):
+    """Ближайшая степень двойки, вмещающая всех участников"""
+    size = 2
+    while size < participants:
+        size *= 2
+    return size
+
+
+def seed_order(size):
+    """Позиции посевов в сетке: order[k] — позиция (k + 1)-го номера посева"""
+    seeds = [1]
+    while len(seeds) < size:
+        total = len(seeds) * 2 + 1
+        seeds = [seed for top in seeds for seed in (top, total - top)]
+    order = [0] * size
+    for position, seed in enumerate(seeds):
+        order[seed - 1] = position
+    return order
+
+
+def meeting_round(a, b):
+    """Круг, в котором встретятся победители позиций a и b"""
+    return (a ^ b).bit_length()
+
+
+def draw_positions(entries, size, rng):
+    """
+    Расставляет участников по позициям сетки; свободные позиции (None) — проходы.
+    Проходы достаются сильнейшим посевам, посеянные занимают позиции по номеру посева,
+    остальные ставятся так, чтобы одноклубники встречались как можно позже.
+    """
+    order = seed_order(size)
+    positions = [None] * size
+    club_positions = defaultdict(list)
+
+    def place(entry, position):
+        positions[position] = entry
+        for club in entry.club_ids:
+            club_positions[club].append(position)
+
+    seeded = sorted((entry for entry in entries if entry.seed), key=lambda entry: (entry.seed, entry.id))
+    for entry, position in zip(seeded, order):
+        place(entry, position)
+
+    free = order[len(seeded):len(entries)]
+    rng.shuffle(free)
+    others = sorted((entry for entry in entries if not entry.seed), key=lambda entry: entry.id)
+    rng.shuffle(others)
+    # Сначала расставляются самые большие клубы, пока есть из чего выбирать
+    club_sizes = defaultdict(int)
+    for entry in others:
+        for club in entry.club_ids:
+            club_sizes[club] += 1
+    others.sort(key=lambda entry: -max((club_sizes[club] for club in entry.club_ids), default=0))
+
+    never = size.bit_length() + 1
+    for entry in others:
+        def separation(position):
+            return min(
+                (meeting_round(position, other) for club in entry.club_ids for other in club_positions[club]),
+                default=never
+            )
+        position = max(free, key=separation)
+        free.remove(position)
+        place(entry, position)
+    return positions
+
+
+class _Node:
+    """Схватка на этапе построения сетки, до сохранения в базу"""
+    def __init__(self, stage, round, red, blue):
+        self.stage = stage
+        self.round = round
+        self.sources = [red, blue]
+        self.result = None
+        self.fight = None
+
+
+def _resolve(source):
+    """
+    Источник участника: ('entry', регистрация), ('winner', узел), ('loser', узел) или None.
+    Ссылки на несостоявшиеся схватки (проходы) заменяются тем, что через них проходит.
+    """
+    if source is None or source[0] == 'entry':
+        return source
+    kind, node = source
+    if node.fight is not None:
+        return source
+    return node.result if kind == 'winner' else None
+
+
+def _elimination_nodes(positions):
+    size = len(positions)
+    rounds = size.bit_length() - 1
+    current = [
+        _Node(STAGE_MAIN, 1, *(('entry', entry) if entry else None for entry in positions[i:i + 2]))
+        for i in range(0, size, 2)
+    ]
+    nodes = list(current)
+    by_round = [current]
+    for round_number in range(2, rounds + 1):
+        current = [
+            _Node(STAGE_MAIN, round_number, ('winner', current[i]), ('winner', current[i + 1]))
+            for i in range(0, len(current), 2)
+        ]
+        nodes.extend(current)
+        by_round.append(current)
+
+    if size >= REPECHAGE_MIN_SIZE:
+        # Проигравшие в четвертьфиналах своей половины встречаются в утешительной схватке,
+        # ее победитель борется за бронзу с проигравшим полуфинал другой половины
+        quarterfinals, semifinals = by_round[-3], by_round[-2]
+        repechage = [
+            _Node(STAGE_REPECHAGE, 1, ('loser', quarterfinals[0]), ('loser', quarterfinals[1])),
+            _Node(STAGE_REPECHAGE, 1, ('loser', quarterfinals[2]), ('loser', quarterfinals[3])),
+        ]
+        bronze = [
+            _Node(STAGE_BRONZE, 1, ('winner', repechage[0]), ('loser', semifinals[1])),
+            _Node(STAGE_BRONZE, 1, ('winner', repechage[1]), ('loser', semifinals[0])),
+        ]
+        nodes.extend(repechage + bronze)
+    return nodes
+
+
+def _round_robin_nodes(entries):
+    """Все пары участников по кругам (круговой метод)"""
+    players = list(entries) + ([None] if len(entries) % 2 else [])
+    nodes = []
+    for round_number in range(1, len(players)):
+        for i in range(len(players) // 2):
+            red, blue = players[i], players[-1 - i]
+            if red and blue:
+                nodes.append(_Node(STAGE_ROUND_ROBIN, round_number, ('entry', red), ('entry', blue)))
+        players.insert(1, players.pop())
+    return nodes
+
+
+def build_bracket(bracket, entries, rng):
+    """Схватки сетки (несохраненные Fight) для участников группы"""
+    if ROUND_ROBIN_MAX >= len(entries) > 2:
+        bracket.bracket_format = FORMAT_ROUND_ROBIN
+        bracket.size = len(entries)
+        entries = sorted(entries, key=lambda entry: entry.id)
+        rng.shuffle(entries)
+        nodes = _round_robin_nodes(entries)
+    else:
+        bracket.bracket_format = FORMAT_SINGLE_ELIMINATION
+        bracket.size = bracket_size(len(entries))
+        nodes = _elimination_nodes(draw_positions(entries, bracket.size, rng))
+
+    fights = []
+    # Узлы идут в порядке схваток, поэтому источники каждого узла уже разрешены
+    for node in nodes:
+        red, blue = (_resolve(source) for source in node.sources)
+        if red is None or blue is None:
+            node.result = red or blue
+            continue
+        node.fight = Fight(bracket=bracket, stage=node.stage, round=node.round, number=len(fights) + 1)
+        node.fight._next = node.fight._loser_next = None
+        for slot, source in ((SLOT_RED, red), (SLOT_BLUE, blue)):
+            kind, value = source
+            if kind == 'entry':
+                setattr(node.fight, slot, value)
+            elif kind == 'winner':
+                value.fight._next = (node.fight, slot)
+            else:
+                value.fight._loser_next = (node.fight, slot)
+        fights.append(node.fight)
+    return fights
+
+
+def _club_ids(tournament):
+    """Клубы участников турнира: {('profile' | 'guest', id): {club_id, ...}}"""
+    clubs = defaultdict(set)
+    members = Profile_user.clubs.through.objects.filter(profile_user__registrations__tournament=tournament)
+    for profile_id, club_id in members.values_list('profile_user_id', 'club_id'):
+        clubs['profile', profile_id].add(club_id)
+    guests = UnregisteredParticipant.clubs.through.objects.filter(
+        unregisteredparticipant__registrations__tournament=tournament
+    )
+    for guest_id, club_id in guests.values_list('unregisteredparticipant_id', 'club_id'):
+        clubs['guest', guest_id].add(club_id)
+    return clubs
+
+
+def _save_fights(fights):
+    """
+    Вставка схваток пачками. Схватка ссылается на следующие, поэтому сначала сохраняются
+    финалы, затем схватки, ведущие к ним, и так далее — по одному INSERT на уровень.
+    """
+    depth = {}
+
+    def fight_depth(fight):
+        # Несохраненные модели не хэшируются, поэтому ключ — id объекта
+        if id(fight) not in depth:
+            targets = [link[0] for link in (fight._next, fight._loser_next) if link]
+            depth[id(fight)] = 1 + max(map(fight_depth, targets), default=-1)
+        return depth[id(fight)]
+
+    levels = defaultdict(list)
+    for fight in fights:
+        levels[fight_depth(fight)].append(fight)
+    for level in sorted(levels):
+        for fight in levels[level]:
+            if fight._next:
+                fight.next_fight, fight.next_slot = fight._next
+            if fight._loser_next:
+                fight.loser_next_fight, fight.loser_next_slot = fight._loser_next
+        Fight.objects.bulk_create(levels[level])
+
+
+def generate_brackets(tournament, seed=None):
+    """
+    Проводит жеребьевку всех групп турнира и заменяет ранее построенные сетки.
+    Возвращает список созданных сеток.
+    """
+    if seed is None:
+        seed = random.SystemRandom().randrange(2 ** 31)
+
+    with transaction.atomic():
+        if Fight.objects.filter(bracket__tournament=tournament, winner__isnull=False).exists():
+            raise ValidationError('По сеткам турнира уже есть результаты', code='brackets_started')
+        Bracket.objects.filter(tournament=tournament).delete()
+
+        clubs = _club_ids(tournament)
+        groups = defaultdict(list)
+        registrations = Registration.objects.filter(tournament=tournament).only(
+            'id', 'tournament_category', 'weight_category', 'belt_level', 'seed',
+            'profile_user', 'unregistered_participant'
+        ).order_by('tournament_category_id', 'weight_category', 'belt_level', 'id')
+        for reg in registrations:
+            if reg.profile_user_id:
+                reg.club_ids = clubs.get(('profile', reg.profile_user_id), set())
+            else:
+                reg.club_ids = clubs.get(('guest', reg.unregistered_participant_id), set())
+            groups[reg.tournament_category_id, reg.weight_category, reg.belt_level].append(reg)
+
+        brackets, fights = [], []
+        for (category_id, weight, belt), entries in groups.items():
+            bracket = Bracket(
+                tournament=tournament, tournament_category_id=category_id, weight_category=weight,
+                belt_level=belt, participants=len(entries), draw_seed=seed
+            )
+            # Своя последовательность на группу: сетка не зависит от состава других групп
+            rng = random.Random(f'{seed}:{category_id}:{weight}:{belt}')
+            fights.extend(build_bracket(bracket, entries, rng))
+            brackets.append(bracket)
+
+        Bracket.objects.bulk_create(brackets)
+        _save_fights(fights)
+    return brackets
@@ -0,0 +1,127 @@
+"""
+Сведения о категориях турнира для проверки регистраций: веса, пояса, возраст и пол.
+Загружаются одним запросом в неизменяемую структуру и кэшируются в памяти процесса
+по (id турнира, updated_at). Изменение категорий, их шаблонов и видов борьбы
+обновляет updated_at турниров, поэтому устаревшая запись кэша просто перестает совпадать.
+Здесь же связь турнира с видами борьбы: они выводятся в карточке, ключ кэша которой включает updated_at.
+"""
+from types import MappingProxyType
+from typing import NamedTuple
+
+from django.db.models import Q
+from django.db.models.signals import m2m_changed, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from tournaments.models import FightingStyle, Tournament, TournamentCategory, TournamentCategoryTemplate
+
+# Турниров в кэше процесса; при переполнении кэш очищается
+CATEGORY_CACHE_SIZE = 256
+
+_cache = {}
+
+
+class CategoryMeta(NamedTuple):
+    id: int
+    label: str
+    weights: tuple
+    belts: tuple
+    age_from: int
+    age_to: int
+    gender: str
+
+
+# Пол категории в сообщениях об ошибках
+CATEGORY_GENDERS = {'М': 'мужчин', 'Ж': 'женщин'}
+
+
+def gender_error(meta, gender):
+    """Ошибка, если пол участника не подходит категории; неизвестный пол не проверяется"""
+    if meta.gender and gender and gender != meta.gender:
+        return f"Категория только для {CATEGORY_GENDERS.get(meta.gender, meta.gender)}"
+    return None
+
+
+def _load(tournament):
+    rows = tournament.tournament_categories.order_by('id').values_list(
+        'id', 'template__name', 'template__fighting_style__name', 'weight_categories', 'belt_levels',
+        'template__age_from', 'template__age_to', 'template__gender',
+    )
+    return MappingProxyType({
+        category_id: CategoryMeta(
+            category_id, f"{name} [{style}]", tuple(weights or ()), tuple(belts or ()), age_from, age_to, gender
+        )
+        for category_id, name, style, weights, belts, age_from, age_to, gender in rows
+    })
+
+
+def tournament_categories(tournament):
+    """Сведения о категориях турнира: {id категории: CategoryMeta}, только для чтения"""
+    cached = _cache.get(tournament.pk)
+    if cached is not None and cached[0] == tournament.updated_at:
+        return cached[1]
+    categories = _load(tournament)
+    if len(_cache) >= CATEGORY_CACHE_SIZE:
+        _cache.clear()
+    _cache[tournament.pk] = (tournament.updated_at, categories)
+    return categories
+
+
+def category_catalog(categories):
+    """Компактный справочник категорий для страницы регистрации: {id: веса, пояса, возраст}"""
+    return {
+        meta.id: {'weights': meta.weights, 'belts': meta.belts, 'age_from': meta.age_from, 'age_to': meta.age_to}
+        for meta in categories.values()
+    }
+
+
+def catalog_version(tournament):
+    """Версия справочника в URL: меняется вместе с updated_at турнира"""
+    return str(int(tournament.updated_at.timestamp() * 1_000_000))
+
+
+def _touch(tournaments):
+    tournaments.update(updated_at=timezone.now())
+
+
+def _relation_changed(relation, instance, action, reverse, pk_set):
+    """Изменение связи многие-ко-многим relation обновляет updated_at затронутых турниров"""
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            instance.updated_at = timezone.now()
+            Tournament.objects.filter(pk=instance.pk).update(updated_at=instance.updated_at)
+    elif action in ('post_add', 'post_remove'):
+        _touch(Tournament.objects.filter(pk__in=pk_set))
+    elif action == 'pre_clear':
+        # После очистки связей турниры уже не найти
+        _touch(Tournament.objects.filter(**{relation: instance}))
+
+
+@receiver(m2m_changed, sender=Tournament.tournament_categories.through)
+def tournament_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _relation_changed('tournament_categories', instance, action, reverse, pk_set)
+
+
+@receiver(m2m_changed, sender=Tournament.fighting_styles.through)
+def tournament_fighting_styles_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    _relation_changed('fighting_styles', instance, action, reverse, pk_set)
+
+
+@receiver(post_save, sender=TournamentCategory)
+def category_changed(sender, instance, created, **kwargs):
+    if not created:
+        _touch(Tournament.objects.filter(tournament_categories=instance))
+
+
+@receiver(post_save, sender=TournamentCategoryTemplate)
+def category_template_changed(sender, instance, created, **kwargs):
+    if not created:
+        _touch(Tournament.objects.filter(tournament_categories__template=instance))
+
+
+@receiver(post_save, sender=FightingStyle)
+def fighting_style_changed(sender, instance, created, **kwargs):
+    if not created:
+        _touch(Tournament.objects.filter(
+            Q(tournament_categories__template__fighting_style=instance) | Q(fighting_styles=instance)
+        ))
@@ -0,0 +1,104 @@
+"""
+Валидаторы условных GET-запросов (ETag) для страниц турниров.
+Считаются одним агрегирующим запросом, без рендеринга страницы; при совпадении
+валидатора браузер получает 304 Not Modified. Last-Modified не отдается: удаление турнира
+и новые регистрации не меняют ни одну дату, а ETag учитывает их через количество строк.
+"""
+import hashlib
+
+from django.contrib.messages import get_messages
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from tournaments.categories import catalog_version
+from tournaments.models import Tournament, TournamentCategory
+
+
+def _make_etag(*parts):
+    return hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def _skip(request):
+    """Страница с непрочитанными сообщениями всегда отдается целиком"""
+    return len(get_messages(request)) > 0
+
+
+def _page_key(request):
+    """Содержимое страницы зависит от пользователя и от того, AJAX ли это запрос"""
+    user = request.user.pk if request.user.is_authenticated else 'anon'
+    return user, request.headers.get('x-requested-with', '')
+
+
+def _phase_boundaries(now):
+    """Последние наступившие границы периодов регистрации: их смена меняет карточки"""
+    return {
+        'phase_started': Max('registration_phases__starts_at', filter=Q(registration_phases__starts_at__lte=now)),
+        'phase_ended': Max('registration_phases__ends_at', filter=Q(registration_phases__ends_at__lt=now)),
+    }
+
+
+def _listing_state(request, scope):
+    # Состояние вычисляется один раз на запрос
+    if not hasattr(request, '_listing_state'):
+        now = timezone.now()
+        request._listing_state = Tournament.objects.listing(scope, now).aggregate(
+            updated_at=Max('updated_at'),
+            count=Count('id', distinct=True),
+            **_phase_boundaries(now)
+        )
+    return request._listing_state
+
+
+def listing_etag(scope):
+    def etag_func(request, *args, **kwargs):
+        if _skip(request):
+            return None
+        state = _listing_state(request, scope)
+        return _make_etag(
+            scope, request.GET.get('cursor', ''), *_page_key(request),
+            state['updated_at'], state['count'], state['phase_started'], state['phase_ended']
+        )
+    return etag_func
+
+
+def _tournament_state(request, pk):
+    if not hasattr(request, '_tournament_state'):
+        now = timezone.now()
+        request._tournament_state = Tournament.objects.filter(pk=pk).aggregate(
+            updated_at=Max('updated_at'),
+            registrations=Count('registrations', distinct=True),
+            **_phase_boundaries(now)
+        )
+    return request._tournament_state
+
+
+def tournament_etag(request, pk):
+    if _skip(request):
+        return None
+    state = _tournament_state(request, pk)
+    if state['updated_at'] is None:
+        return None
+    return _make_etag(
+        pk, *_page_key(request),
+        state['updated_at'], state['registrations'], state['phase_started'], state['phase_ended']
+    )
+
+
+def category_etag(request, category_id):
+    """Категория не хранит время изменения, поэтому ETag — хэш отдаваемых данных"""
+    values = TournamentCategory.objects.filter(pk=category_id).values_list(
+        'weight_categories', 'belt_levels', 'template__age_from', 'template__age_to'
+    ).first()
+    return _make_etag(category_id, *values) if values else None
+
+
+def catalog_tournament(request, pk):
+    # Турнир нужен и валидатору, и представлению — загружается один раз на запрос
+    if not hasattr(request, '_catalog_tournament'):
+        request._catalog_tournament = Tournament.objects.only('id', 'updated_at').filter(pk=pk).first()
+    return request._catalog_tournament
+
+
+def catalog_etag(request, pk):
+    tournament = catalog_tournament(request, pk)
+    return _make_etag('categories', pk, catalog_version(tournament)) if tournament else None
@@ -0,0 +1,53 @@
+from django.db import transaction
+from django.db.models import Count
+
+from tournaments.models import CategoryCounter, Registration, Tournament, TournamentCounter
+
+
+def reconcile_participant_counters(tournament):
+    """
+    Пересчитывает счетчики участников турнира по таблице регистраций.
+    Строка счетчика турнира блокируется, поэтому параллельные регистрации ждут окончания сверки.
+    Возвращает количество исправленных счетчиков.
+    """
+    with transaction.atomic():
+        counter, _created = TournamentCounter.objects.select_for_update().get_or_create(tournament=tournament)
+
+        registrations = Registration.objects.filter(tournament=tournament)
+        actual = {
+            (row['tournament_category'], row['weight_category']): row['participants']
+            for row in registrations.values('tournament_category', 'weight_category').annotate(participants=Count('id'))
+        }
+        stored = {
+            (row.tournament_category_id, row.weight_category): row
+            for row in CategoryCounter.objects.filter(tournament=tournament)
+        }
+
+        fixed = []
+        for key, row in stored.items():
+            participants = actual.get(key, 0)
+            if row.participants != participants:
+                row.participants = participants
+                fixed.append(row)
+        CategoryCounter.objects.bulk_update(fixed, ['participants'])
+        missing = [
+            CategoryCounter(tournament=tournament, tournament_category_id=category_id,
+                            weight_category=weight, participants=participants)
+            for (category_id, weight), participants in actual.items()
+            if (category_id, weight) not in stored
+        ]
+        CategoryCounter.objects.bulk_create(missing)
+
+        total = sum(actual.values())
+        if counter.participants != total:
+            counter.participants = total
+            counter.save(update_fields=['participants'])
+            fixed.append(counter)
+    return len(fixed) + len(missing)
+
+
+def reconcile_all_participant_counters(tournaments=None):
+    """Сверяет счетчики всех (или переданных) турниров по одному турниру за транзакцию"""
+    if tournaments is None:
+        tournaments = Tournament.objects.all()
+    return sum(reconcile_participant_counters(tournament) for tournament in tournaments.only('id').iterator())
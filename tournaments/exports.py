@@ -0,0 +1,158 @@
+"""
+Потоковая выгрузка участников турнира в CSV и XLSX.
+Строки читаются серверным курсором порциями и сразу отдаются клиенту,
+поэтому память не растет с количеством участников.
+"""
+import csv
+import io
+import zipfile
+from xml.sax.saxutils import escape
+
+from tournaments.models import Registration
+
+# Количество регистраций, читаемых из базы за один раз
+EXPORT_CHUNK_SIZE = 2000
+
+EXPORT_HEADER = [
+    'Категория', 'Вес, кг', 'Пояс', 'ФИО', 'Дата рождения', 'Email', 'Телефон',
+    'Тип участника', 'Статус оплаты', 'Дата оплаты',
+]
+
+PAYMENT_STATUS_LABELS = {
+    'succeeded': 'Оплачено',
+    'pending': 'В обработке',
+    'waiting_for_capture': 'В обработке',
+    'canceled': 'Отменено',
+}
+
+
+def export_rows(tournament):
+    """Строки выгрузки, сгруппированные по категории, весу и поясу"""
+    registrations = Registration.objects.filter(tournament=tournament).select_related(
+        'tournament_category__template',
+        'profile_user__user',
+        'unregistered_participant'
+    ).with_last_payment().order_by(
+        'tournament_category__template__name',
+        'tournament_category_id',
+        'weight_category',
+        'belt_level',
+        'id'
+    )
+    for reg in registrations.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        participant = reg.profile_user or reg.unregistered_participant
+        email = reg.profile_user.user.email if reg.profile_user else participant.email
+        yield [
+            reg.tournament_category.actual_name(),
+            reg.weight_category,
+            reg.belt_level,
+            participant.get_full_name() if reg.profile_user else str(participant),
+            participant.birth_date.strftime('%d.%m.%Y') if participant.birth_date else '',
+            email,
+            participant.phone or '',
+            'Зарегистрирован' if reg.profile_user else 'Гость',
+            PAYMENT_STATUS_LABELS.get(reg.last_payment_status, 'Не оплачено'),
+            reg.last_payment_date.strftime('%d.%m.%Y %H:%M') if reg.last_payment_date else '',
+        ]
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: возвращает записанную строку, ничего не храня"""
+    def write(self, value):
+        return value
+
+
+def stream_csv(rows):
+    writer = csv.writer(_Echo())
+    # BOM, чтобы Excel открыл файл в UTF-8
+    yield '\ufeff' + writer.writerow(EXPORT_HEADER)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class _ZipStream(io.RawIOBase):
+    """Буфер без seek для zipfile: накопленные байты забираются после каждой записи"""
+    def __init__(self):
+        self._chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def take(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+XLSX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'
+)
+XLSX_ROOT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="xl/workbook.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+    '</Relationships>'
+)
+XLSX_WORKBOOK = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Участники" sheetId="1" r:id="rId1"/></sheets>'
+    '</workbook>'
+)
+XLSX_WORKBOOK_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+    '</Relationships>'
+)
+
+
+def _xlsx_row(row):
+    cells = []
+    for value in row:
+        if isinstance(value, int):
+            cells.append(f'<c t="n"><v>{value}</v></c>')
+        else:
+            cells.append(f'<c t="inlineStr"><is><t>{escape(str(value))}</t></is></c>')
+    return f'<row>{"".join(cells)}</row>'
+
+
+def stream_xlsx(rows):
+    """Минимальная книга XLSX из одного листа, упакованная в ZIP по мере чтения строк"""
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', XLSX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', XLSX_ROOT_RELS)
+        archive.writestr('xl/workbook.xml', XLSX_WORKBOOK)
+        archive.writestr('xl/_rels/workbook.xml.rels', XLSX_WORKBOOK_RELS)
+        yield stream.take()
+
+        with archive.open('xl/worksheets/sheet1.xml', 'w') as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            sheet.write(_xlsx_row(EXPORT_HEADER).encode())
+            for row in rows:
+                sheet.write(_xlsx_row(row).encode())
+                # deflate копит данные, поэтому отдаем только непустые порции
+                data = stream.take()
+                if data:
+                    yield data
+            sheet.write(b'</sheetData></worksheet>')
+    yield stream.take()
@@ -0,0 +1,107 @@
+import django_filters
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from tournaments.models import FightingStyle, RegistrationPhase, Tournament
+from tournaments.models.registration_phase import (
+    OPEN_REGISTRATION_PHASES,
+    PHASE_CHOICES,
+    PHASE_CLOSED,
+    PHASE_NOT_STARTED,
+)
+
+# Максимальное количество результатов поиска
+SEARCH_LIMIT = 50
+
+
+class TournamentFilter(django_filters.FilterSet):
+    """
+    Полнотекстовый поиск и фильтры по турнирам.
+    Цена и период регистрации отбираются по GiST-индексу периодов на момент now, а не по аннотациям турнира
+    """
+    q = django_filters.CharFilter(method='filter_search', label='Поиск')
+    style = django_filters.ModelMultipleChoiceFilter(
+        queryset=FightingStyle.objects.all(),
+        method='filter_style',
+        label='Вид борьбы'
+    )
+    date_from = django_filters.DateFilter(field_name='tournament_start', lookup_expr='date__gte', label='Начало с')
+    date_to = django_filters.DateFilter(field_name='tournament_start', lookup_expr='date__lte', label='Начало по')
+    price_min = django_filters.NumberFilter(field_name='price__gte', method='filter_price', label='Цена от')
+    price_max = django_filters.NumberFilter(field_name='price__lte', method='filter_price', label='Цена до')
+    newbies = django_filters.BooleanFilter(field_name='newbies', label='Участие новичков')
+    phase = django_filters.ChoiceFilter(choices=PHASE_CHOICES, method='filter_phase', label='Регистрация')
+
+    class Meta:
+        model = Tournament
+        fields = []
+
+    def __init__(self, *args, now=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.now = now or timezone.now()
+
+    def filter_search(self, queryset, name, value):
+        query = SearchQuery(value, config='russian', search_type='websearch')
+        return queryset.filter(search_vector=query).annotate(
+            rank=SearchRank(F('search_vector'), query)
+        ).order_by('-rank', '-created_at')
+
+    def filter_style(self, queryset, name, value):
+        if not value:
+            return queryset
+        # Подзапрос вместо JOIN, чтобы не дублировать строки турниров
+        tournament_ids = Tournament.fighting_styles.through.objects.filter(
+            fightingstyle__in=value
+        ).values('tournament_id')
+        return queryset.filter(id__in=tournament_ids)
+
+    def filter_price(self, queryset, name, value):
+        phases = RegistrationPhase.objects.current(self.now).filter(**{name: value})
+        return queryset.filter(id__in=phases.values('tournament_id'))
+
+    def filter_phase(self, queryset, name, value):
+        current = RegistrationPhase.objects.current(self.now).values('tournament_id')
+        if value in OPEN_REGISTRATION_PHASES:
+            return queryset.filter(id__in=current.filter(phase=value))
+        # Без действующего периода: не началась, если впереди есть период, иначе закрыта
+        queryset = queryset.exclude(id__in=current)
+        upcoming = RegistrationPhase.objects.upcoming(self.now).values('tournament_id')
+        if value == PHASE_NOT_STARTED:
+            return queryset.filter(id__in=upcoming)
+        return queryset.exclude(id__in=upcoming)
+
+    def facets(self, styles):
+        """
+        Количество найденных турниров по видам борьбы, периодам регистрации и новичкам.
+        Три запроса по id найденных турниров: итоги, действующие периоды и виды борьбы
+        """
+        ids = self.qs.order_by().values('id')
+        current = RegistrationPhase.objects.current(self.now)
+        upcoming = RegistrationPhase.objects.upcoming(self.now).values('tournament_id')
+        counts = Tournament.objects.filter(id__in=ids).aggregate(
+            total=Count('id'),
+            newbies=Count('id', filter=Q(newbies=True)),
+            open=Count('id', filter=Q(id__in=current.values('tournament_id'))),
+            not_started=Count('id', filter=~Q(id__in=current.values('tournament_id')) & Q(id__in=upcoming)),
+        )
+        phases = dict(current.filter(tournament__in=ids).values_list('phase').annotate(
+            count=Count('tournament_id', distinct=True)
+        ).order_by())
+        phases[PHASE_NOT_STARTED] = counts['not_started']
+        phases[PHASE_CLOSED] = counts['total'] - counts['open'] - counts['not_started']
+        style_counts = dict(Tournament.fighting_styles.through.objects.filter(tournament_id__in=ids).values_list(
+            'fightingstyle_id'
+        ).annotate(count=Count('tournament_id')).order_by())
+        return {
+            'total': counts['total'],
+            'newbies': counts['newbies'],
+            'phases': [
+                {'value': phase, 'label': label, 'count': phases.get(phase, 0)}
+                for phase, label in PHASE_CHOICES
+            ],
+            'styles': [
+                {'id': style.id, 'name': style.name, 'count': style_counts.get(style.id, 0)}
+                for style in styles
+            ],
+        }
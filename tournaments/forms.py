@@ -1,8 +1,12 @@
 from datetime import date, datetime
 from django import forms
 from tournaments.models import Registration, Tournament, FightingStyle, TournamentCategory, TournamentCategoryTemplate
+from tournaments.models.fight import METHOD_CHOICES, SLOT_CHOICES
+from tournaments.models.registration import TOURNAMENT_FULL_MESSAGE
+from tournaments.categories import gender_error, tournament_categories
 from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django.utils.text import capfirst
 
 # class TournamentForm(forms.ModelForm):
 #     # поле для видов борьбы с чекбоксами
@@ -78,10 +82,18 @@ from django.utils import timezone
 #         return image
     
 
+class CategoryChoiceField(forms.TypedChoiceField):
+    """Id категории турнира по закэшированным сведениям: выбор проверяется без запросов к базе"""
+    def __init__(self, categories, **kwargs):
+        super().__init__(coerce=int, empty_value=None, **kwargs)
+        self.choices = [('', '---------'), *((meta.id, meta.label) for meta in categories.values())]
+
+
 class TournamentRegistrationForm(forms.ModelForm):
     class Meta:
         model = Registration
-        fields = ['tournament_category', 'weight_category', 'belt_level']
+        # Категория — отдельное поле формы с id: в регистрацию записывается tournament_category_id
+        fields = ['weight_category', 'belt_level']
         widgets = {
             'weight_category': forms.Select(attrs={'disabled': True}),
             'belt_level': forms.Select()
@@ -91,10 +103,16 @@ class TournamentRegistrationForm(forms.ModelForm):
         self.user = kwargs.pop('user', None)
         self.tournament = tournament
         super().__init__(*args, **kwargs)
-        if tournament:
-            self.fields['tournament_category'].queryset = tournament.tournament_categories.all()
-            self.fields['weight_category'].choices = []  # Будет заполнено через AJAX
-            self.fields['belt_level'].choices = []  # Будет заполнено через AJAX
+        self.categories = tournament_categories(tournament) if tournament else {}
+        self.fields['tournament_category'] = CategoryChoiceField(
+            self.categories, label=capfirst(Registration._meta.get_field('tournament_category').verbose_name)
+        )
+        self.fields['weight_category'].choices = []  # Будет заполнено через AJAX
+        self.fields['belt_level'].choices = []  # Будет заполнено через AJAX
+
+    def _post_clean(self):
+        self.instance.tournament_category_id = self.cleaned_data.get('tournament_category')
+        super()._post_clean()
 
     def clean(self):
         def calculate_age(birth_date):
@@ -106,37 +124,28 @@ class TournamentRegistrationForm(forms.ModelForm):
         weight = cleaned_data.get('weight_category')
         belt = cleaned_data.get('belt_level')
         
+        # Быстрый отказ, если мест уже нет; гарантию дает условное обновление счетчика при сохранении
+        if self.tournament and not self.tournament.has_free_places():
+            raise ValidationError(TOURNAMENT_FULL_MESSAGE)
+
         if category and weight and belt:
-            # Проверка на повторную регистрацию
-            if self.tournament:
-                existing_reg = Registration.objects.filter(
-                    tournament=self.tournament,
-                    tournament_category=category
-                )
-                
-                if self.user and self.user.is_authenticated:
-                    existing_reg = existing_reg.filter(profile_user=self.user.profile_user)
-                elif 'email' in self.data:
-                    existing_reg = existing_reg.filter(unregistered_participant__email=self.data['email'])
-                
-                if existing_reg.exists():
-                    raise ValidationError(
-                        "Вы уже зарегистрированы в этой категории. "
-                        "Выберите другую категорию или отмените предыдущую регистрацию."
-                    )
+            meta = self.categories[category]
+
+            # Повторную регистрацию отклоняет уникальный индекс при сохранении:
+            # гость находится по email и дате рождения, поэтому это та же запись участника
 
             # Проверка веса
-            if weight not in category.weight_categories:
+            if weight not in meta.weights:
                 raise ValidationError({
                     'weight_category': f"Выбранный вес ({weight} кг) не доступен в этой категории. "
-                                     f"Доступные веса: {', '.join(map(str, category.weight_categories))} кг"
+                                     f"Доступные веса: {', '.join(map(str, meta.weights))} кг"
                 })
             
             # Проверка пояса
-            if belt not in category.belt_levels:
+            if belt not in meta.belts:
                 raise ValidationError({
                     'belt_level': f"Выбранный пояс ({belt}) не доступен в этой категории. "
-                                f"Доступные пояса: {', '.join(category.belt_levels)}"
+                                f"Доступные пояса: {', '.join(meta.belts)}"
                 })
             
             # Проверка возраста
@@ -155,19 +164,27 @@ class TournamentRegistrationForm(forms.ModelForm):
                         'birth_date': "Некорректная дата рождения"
                     })
             
+            # Проверка пола: из профиля или из формы гостя
+            if self.user and self.user.is_authenticated:
+                gender = self.user.profile_user.gender
+            else:
+                gender = self.data.get('gender')
+            error = gender_error(meta, gender)
+            if error:
+                raise ValidationError({'tournament_category': error})
+
             if age is not None:
-                template = category.template
-                if template.age_from and age < template.age_from:
+                if meta.age_from and age < meta.age_from:
                     raise ValidationError({
                         'tournament_category': f"Вы слишком молоды для этой категории. "
                                             f"Ваш возраст: {age} лет. "
-                                            f"Минимальный возраст: {template.age_from} лет"
+                                            f"Минимальный возраст: {meta.age_from} лет"
                     })
-                if template.age_to and age > template.age_to:
+                if meta.age_to and age > meta.age_to:
                     raise ValidationError({
                         'tournament_category': f"Вы слишком взрослы для этой категории. "
                                             f"Ваш возраст: {age} лет. "
-                                            f"Максимальный возраст: {template.age_to} лет"
+                                            f"Максимальный возраст: {meta.age_to} лет"
                     })
         
         return cleaned_data
@@ -280,4 +297,53 @@ class WeightCategoriesForm(forms.Form):
                     widget=forms.CheckboxSelectMultiple,
                     required=False,
                     help_text="Выберите допустимые пояса для категории"
-                )
\ No newline at end of file
+                )
+
+CHECK_IN_MARKS = [
+    ('check_in', 'Прибыл на турнир'),
+    ('weigh_in', 'Прошел взвешивание'),
+]
+
+
+class CheckInMarkForm(forms.Form):
+    """Отметка участника на месте: прибытие или взвешивание с фактическим весом"""
+    mark = forms.ChoiceField(choices=CHECK_IN_MARKS)
+    actual_weight = forms.DecimalField(
+        label='Вес на взвешивании, кг', max_digits=5, decimal_places=2, min_value=0, required=False
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if cleaned_data.get('mark') == 'weigh_in' and cleaned_data.get('actual_weight') is None:
+            raise ValidationError("Укажите вес участника")
+        return cleaned_data
+
+    def update_values(self):
+        """Значения полей регистрации для одного UPDATE"""
+        now = timezone.now()
+        if self.cleaned_data['mark'] == 'check_in':
+            return {'checked_in_at': now}
+        return {'weighed_in_at': now, 'actual_weight': self.cleaned_data['actual_weight']}
+
+
+class BracketDrawForm(forms.Form):
+    """Жеребьевка сеток; при пустом зерне выбирается случайное"""
+    seed = forms.IntegerField(
+        label='Зерно жеребьевки', min_value=0, max_value=2 ** 31 - 1, required=False,
+        help_text='Укажите зерно прошлой жеребьевки, чтобы повторить ее'
+    )
+
+
+class FightResultForm(forms.Form):
+    """Результат схватки с судейского стола ковра"""
+    winner = forms.ChoiceField(label='Победитель', choices=SLOT_CHOICES)
+    method = forms.ChoiceField(label='Способ победы', choices=METHOD_CHOICES)
+    red_score = forms.IntegerField(label='Очки красного', min_value=0, max_value=999, required=False)
+    blue_score = forms.IntegerField(label='Очки синего', min_value=0, max_value=999, required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for field in ('red_score', 'blue_score'):
+            if cleaned_data.get(field) is None:
+                cleaned_data[field] = 0
+        return cleaned_data
@@ -0,0 +1,114 @@
+"""
+Живые результаты для табло (Server-Sent Events).
+События ленты рассылаются через PostgreSQL LISTEN/NOTIFY: в каждом ASGI-процессе
+одно соединение слушает канал и раскладывает события по очередям подключенных табло,
+поэтому тысячи открытых соединений не опрашивают базу и не занимают потоки.
+"""
+import asyncio
+import json
+
+import psycopg2
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections
+
+CHANNEL = 'tournament_results'
+# Комментарий-пинг, чтобы прокси не закрывали простаивающее соединение, сек
+HEARTBEAT_INTERVAL = 15
+# Пауза перед переподключением браузера после обрыва, мс
+RETRY_INTERVAL = 3000
+# Сколько пропущенных событий досылается при переподключении
+REPLAY_LIMIT = 200
+# Очередь медленного табло; при переполнении поток закрывается и браузер переподключается
+QUEUE_SIZE = 100
+
+
+def publish(event):
+    """Рассылка события ленты; NOTIFY доставляется слушателям только после коммита транзакции"""
+    message = json.dumps(
+        {'tournament': event.tournament_id, 'id': event.id, 'data': event.payload}, cls=DjangoJSONEncoder
+    )
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_notify(%s, %s)', [CHANNEL, message])
+
+
+def format_event(event_id, data):
+    """Событие в формате text/event-stream"""
+    return f"id: {event_id}\nevent: result\ndata: {json.dumps(data, ensure_ascii=False, cls=DjangoJSONEncoder)}\n\n"
+
+
+def _connect():
+    listener = psycopg2.connect(**connections['default'].get_connection_params())
+    listener.autocommit = True
+    with listener.cursor() as cursor:
+        cursor.execute(f'LISTEN {CHANNEL}')
+    return listener
+
+
+class Broadcaster:
+    """Подписки табло процесса: {id турнира: {очередь, ...}}"""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.listener = None
+        self.fd = None
+        self.lock = None
+
+    async def subscribe(self, tournament_id):
+        if self.listener is None:
+            await self.listen()
+        queue = asyncio.Queue(QUEUE_SIZE)
+        self.subscribers.setdefault(tournament_id, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, tournament_id, queue):
+        queues = self.subscribers.get(tournament_id, set())
+        queues.discard(queue)
+        if not queues:
+            self.subscribers.pop(tournament_id, None)
+
+    async def listen(self):
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+        async with self.lock:
+            if self.listener is not None:
+                return
+            listener = await sync_to_async(_connect, thread_sensitive=False)()
+            self.listener, self.fd = listener, listener.fileno()
+            asyncio.get_running_loop().add_reader(self.fd, self.receive)
+
+    def receive(self):
+        try:
+            self.listener.poll()
+        except psycopg2.Error:
+            self.close()
+            return
+        while self.listener.notifies:
+            self.dispatch(self.listener.notifies.pop(0).payload)
+
+    def dispatch(self, message):
+        event = json.loads(message)
+        for queue in list(self.subscribers.get(event['tournament'], ())):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                self.disconnect(queue)
+
+    @staticmethod
+    def disconnect(queue):
+        """Закрывает поток табло; недоставленное браузер получит при переподключении по Last-Event-ID"""
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+    def close(self):
+        """Соединение с базой потеряно: все потоки закрываются, следующий подписчик подключится заново"""
+        asyncio.get_running_loop().remove_reader(self.fd)
+        self.listener.close()
+        self.listener = None
+        for queues in self.subscribers.values():
+            for queue in queues:
+                self.disconnect(queue)
+
+
+broadcaster = Broadcaster()
@@ -0,0 +1,95 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+
+from tournaments.brackets import build_bracket
+from tournaments.models import Bracket, Registration
+from tournaments.scheduling import build_tasks, plan
+
+
+def synthetic_rows(fights_count, rng):
+    """Строки задач для случайных сеток общим объемом не меньше fights_count схваток"""
+    # Ключи задач — id() схваток, поэтому схватки должны жить до конца замера
+    rows, fights, number = [], [], 0
+    while len(rows) < fights_count:
+        entries = []
+        for _ in range(rng.randint(2, 40)):
+            number += 1
+            # Несохраненные регистрации: построителю сеток нужны только id, посев и клубы
+            entry = Registration(id=number)
+            entry.club_ids = {rng.randint(1, 50)}
+            entries.append(entry)
+        age = rng.choice((8, 10, 12, 14, 16, 18, 30))
+        bracket_fights = build_bracket(Bracket(), entries, rng)
+        fights.extend(bracket_fights)
+        for fight in bracket_fights:
+            athletes = tuple(athlete.id for athlete in (fight.red, fight.blue) if athlete is not None)
+            rows.append((
+                id(fight), (age, len(rows)), athletes,
+                id(fight._next[0]) if fight._next else None,
+                id(fight._loser_next[0]) if fight._loser_next else None,
+                False, None, None,
+            ))
+    return rows, fights
+
+
+def violations(tasks, mats, duration, rest):
+    """Количество нарушений: порядок схваток сетки, отдых участников, пересечения на коврах"""
+    count = 0
+    by_athlete, by_mat = {}, {}
+    for task in tasks:
+        count += sum(successor.start < task.start + duration + rest for successor in task.successors)
+        count += not 1 <= task.mat <= mats
+        for athlete in task.athletes:
+            by_athlete.setdefault(athlete, []).append(task.start)
+        by_mat.setdefault(task.mat, []).append(task.start)
+    for starts, gap in [(starts, duration + rest) for starts in by_athlete.values()] + \
+                       [(starts, duration) for starts in by_mat.values()]:
+        starts.sort()
+        count += sum(later - earlier < gap for earlier, later in zip(starts, starts[1:]))
+    return count
+
+
+class Command(BaseCommand):
+    help = 'Замеряет время построения расписания на синтетическом турнире'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fights', type=int, default=5000, help='Количество схваток')
+        parser.add_argument('--mats', type=int, default=8, help='Количество ковров')
+        parser.add_argument('--duration', type=int, default=6, help='Длительность схватки, мин')
+        parser.add_argument('--rest', type=int, default=15, help='Отдых между схватками, мин')
+        parser.add_argument('--runs', type=int, default=5, help='Количество повторов')
+        parser.add_argument('--seed', type=int, default=1, help='Зерно генератора')
+
+    def handle(self, *args, **options):
+        rows, _fights = synthetic_rows(options['fights'], random.Random(options['seed']))
+        mats, duration, rest = options['mats'], options['duration'], options['rest']
+        self.stdout.write(f"Схваток: {len(rows)}, ковров: {mats}")
+
+        full, incremental = [], []
+        for _ in range(options['runs']):
+            tasks = build_tasks(rows)
+            started = time.perf_counter()
+            finish = plan(tasks, mats, duration, rest)
+            full.append(time.perf_counter() - started)
+
+            # Треть турнира прошла: сыгранные схватки закреплены, остальные переставляются
+            now = finish / 3
+            replan = build_tasks(
+                row[:5] + ((task.start < now), task.start, task.mat)
+                for row, task in zip(rows, tasks)
+            )
+            started = time.perf_counter()
+            plan(replan, mats, duration, rest, now=now)
+            incremental.append(time.perf_counter() - started)
+
+        lower_bound = len(rows) * duration / mats
+        self.stdout.write(f"Нарушений ограничений: {violations(tasks, mats, duration, rest)}")
+        self.stdout.write(
+            f"Продолжительность: {finish / 60:.1f} ч (нижняя граница {lower_bound / 60:.1f} ч)"
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Полное расписание: {min(full) * 1000:.0f} мс, "
+            f"перестановка после трети турнира: {min(incremental) * 1000:.0f} мс (лучшее из {options['runs']})"
+        ))
@@ -0,0 +1,25 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.brackets import generate_brackets
+from tournaments.models import Tournament
+
+
+class Command(BaseCommand):
+    help = 'Проводит жеребьевку и строит сетки всех категорий турнира'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament', type=int, help='ID турнира')
+        parser.add_argument('--seed', type=int, help='Зерно жеребьевки (для повторения результата)')
+
+    def handle(self, *args, **options):
+        try:
+            tournament = Tournament.objects.get(pk=options['tournament'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"Турнир {options['tournament']} не найден")
+        try:
+            brackets = generate_brackets(tournament, seed=options['seed'])
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+        seed = brackets[0].draw_seed if brackets else options['seed']
+        self.stdout.write(self.style.SUCCESS(f'Построено сеток: {len(brackets)}, зерно жеребьевки: {seed}'))
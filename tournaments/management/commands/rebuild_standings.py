@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from tournaments.standings import rebuild_standings
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает медальный зачет клубов, регионов и спортсменов по местам участников'
+
+    def handle(self, *args, **options):
+        rows = rebuild_standings()
+        self.stdout.write(self.style.SUCCESS(f'Строк зачета: {rows}'))
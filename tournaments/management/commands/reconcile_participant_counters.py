@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from tournaments.counters import reconcile_all_participant_counters
+from tournaments.models import Tournament
+
+
+class Command(BaseCommand):
+    help = 'Сверяет счетчики участников турниров и категорий с таблицей регистраций'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tournament', type=int, action='append', help='ID турнира (можно несколько)')
+
+    def handle(self, *args, **options):
+        tournaments = Tournament.objects.all()
+        if options['tournament']:
+            tournaments = tournaments.filter(pk__in=options['tournament'])
+        fixed = reconcile_all_participant_counters(tournaments)
+        self.stdout.write(self.style.SUCCESS(f'Исправлено счетчиков: {fixed}'))
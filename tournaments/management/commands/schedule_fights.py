@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.scheduling import schedule_tournament
+
+
+class Command(BaseCommand):
+    help = 'Расставляет схватки турнира по коврам и времени'
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament', type=int, help='ID турнира')
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Переставить только несыгранные и еще не начатые схватки'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            tournament = Tournament.objects.get(pk=options['tournament'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f"Турнир {options['tournament']} не найден")
+        moved, finish = schedule_tournament(tournament, incremental=options['incremental'])
+        self.stdout.write(self.style.SUCCESS(f'Перенесено схваток: {moved}, окончание: {finish:%d.%m.%Y %H:%M}'))
+        if finish > tournament.tournament_end:
+            self.stdout.write(self.style.WARNING('Расписание не укладывается в даты турнира'))
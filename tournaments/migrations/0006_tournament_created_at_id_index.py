@@ -0,0 +1,18 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_unregisteredparticipant_clubs'),
+        ('tournaments', '0005_registration_belt_level_registration_newbies_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='tournament',
+            index=models.Index(fields=['-created_at', '-id'], name='tournaments_created_03b5fa_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:25
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_unregisteredparticipant_clubs'),
+        ('tournaments', '0006_tournament_created_at_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tournament',
+            name='search_vector',
+            field=models.GeneratedField(db_persist=True, expression=django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.CombinedSearchVector(django.contrib.postgres.search.SearchVector('title', config='russian', weight='A'), '||', django.contrib.postgres.search.SearchVector('location', config='russian', weight='B'), django.contrib.postgres.search.SearchConfig('russian')), '||', django.contrib.postgres.search.SearchVector('description', config='russian', weight='C'), django.contrib.postgres.search.SearchConfig('russian')), output_field=django.contrib.postgres.search.SearchVectorField()),
+        ),
+        migrations.AddIndex(
+            model_name='tournament',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='tournaments_search__41d5e3_gin'),
+        ),
+    ]
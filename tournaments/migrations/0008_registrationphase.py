@@ -0,0 +1,46 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:28
+
+import django.contrib.postgres.fields.ranges
+import django.contrib.postgres.indexes
+import django.db.models.deletion
+import tournaments.models.registration_phase
+from django.db import migrations, models
+
+
+def build_registration_phases(apps, schema_editor):
+    Tournament = apps.get_model('tournaments', 'Tournament')
+    RegistrationPhase = apps.get_model('tournaments', 'RegistrationPhase')
+    RegistrationPhase.objects.bulk_create([
+        RegistrationPhase(tournament=tournament, phase=phase, starts_at=starts_at, ends_at=ends_at, price=price)
+        for tournament in Tournament.objects.iterator()
+        for phase, starts_at, ends_at, price in tournaments.models.registration_phase.registration_phase_periods(tournament)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0007_tournament_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegistrationPhase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('phase', models.CharField(choices=[('early', 'Ранняя регистрация'), ('regular', 'Обычная регистрация'), ('late', 'Поздняя регистрация')], max_length=20, verbose_name='Период')),
+                ('starts_at', models.DateTimeField(verbose_name='Начало')),
+                ('ends_at', models.DateTimeField(verbose_name='Окончание')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, verbose_name='Цена')),
+                ('period', models.GeneratedField(db_persist=True, expression=tournaments.models.registration_phase.TsTzRange('starts_at', 'ends_at', models.Value('[]')), output_field=django.contrib.postgres.fields.ranges.DateTimeRangeField())),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='registration_phases', to='tournaments.tournament')),
+            ],
+            options={
+                'verbose_name': 'Период регистрации',
+                'verbose_name_plural': 'Периоды регистрации',
+                'ordering': ['tournament', 'starts_at'],
+                'indexes': [django.contrib.postgres.indexes.GistIndex(fields=['period'], name='tournaments_period_15d146_gist')],
+            },
+        ),
+        migrations.RunPython(build_registration_phases, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def count_participants(apps, schema_editor):
+    Registration = apps.get_model('tournaments', 'Registration')
+    TournamentCounter = apps.get_model('tournaments', 'TournamentCounter')
+    CategoryCounter = apps.get_model('tournaments', 'CategoryCounter')
+    TournamentCounter.objects.bulk_create([
+        TournamentCounter(tournament_id=row['tournament'], participants=row['participants'])
+        for row in Registration.objects.values('tournament').annotate(participants=Count('id'))
+    ])
+    CategoryCounter.objects.bulk_create([
+        CategoryCounter(
+            tournament_id=row['tournament'],
+            tournament_category_id=row['tournament_category'],
+            weight_category=row['weight_category'],
+            participants=row['participants']
+        )
+        for row in Registration.objects.values(
+            'tournament', 'tournament_category', 'weight_category'
+        ).annotate(participants=Count('id'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0008_registrationphase'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TournamentCounter',
+            fields=[
+                ('tournament', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='participant_counter', serialize=False, to='tournaments.tournament')),
+                ('participants', models.PositiveIntegerField(default=0, verbose_name='Участников')),
+            ],
+            options={
+                'verbose_name': 'Счетчик участников турнира',
+                'verbose_name_plural': 'Счетчики участников турниров',
+            },
+        ),
+        migrations.CreateModel(
+            name='CategoryCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight_category', models.PositiveSmallIntegerField(verbose_name='Весовая категория')),
+                ('participants', models.PositiveIntegerField(default=0, verbose_name='Участников')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='category_counters', to='tournaments.tournament')),
+                ('tournament_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='participant_counters', to='tournaments.tournamentcategory')),
+            ],
+            options={
+                'verbose_name': 'Счетчик участников категории',
+                'verbose_name_plural': 'Счетчики участников категорий',
+                'constraints': [models.UniqueConstraint(fields=('tournament', 'tournament_category', 'weight_category'), name='unique_category_counter')],
+            },
+        ),
+        migrations.RunPython(count_participants, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+def create_missing_counters(apps, schema_editor):
+    Tournament = apps.get_model('tournaments', 'Tournament')
+    TournamentCounter = apps.get_model('tournaments', 'TournamentCounter')
+    TournamentCounter.objects.bulk_create([
+        TournamentCounter(tournament_id=pk)
+        for pk in Tournament.objects.filter(participant_counter__isnull=True).values_list('pk', flat=True)
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0009_participant_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_missing_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0010_create_missing_tournament_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='actual_weight',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, verbose_name='Вес на взвешивании'),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='checked_in_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Прибыл на турнир'),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='weighed_in_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Прошел взвешивание'),
+        ),
+    ]
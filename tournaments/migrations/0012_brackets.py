@@ -0,0 +1,69 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0011_registration_check_in'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='registration',
+            name='seed',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Посев'),
+        ),
+        migrations.CreateModel(
+            name='Bracket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight_category', models.PositiveSmallIntegerField(verbose_name='Весовая категория')),
+                ('belt_level', models.CharField(max_length=50, verbose_name='Уровень пояса')),
+                ('bracket_format', models.CharField(choices=[('single_elimination', 'Олимпийская система с утешительными'), ('round_robin', 'Круговая система')], max_length=20, verbose_name='Формат')),
+                ('size', models.PositiveSmallIntegerField(verbose_name='Размер сетки')),
+                ('participants', models.PositiveSmallIntegerField(verbose_name='Участников')),
+                ('draw_seed', models.BigIntegerField(verbose_name='Зерно жеребьевки')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='brackets', to='tournaments.tournament')),
+                ('tournament_category', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='brackets', to='tournaments.tournamentcategory')),
+            ],
+            options={
+                'verbose_name': 'Сетка',
+                'verbose_name_plural': 'Сетки',
+                'ordering': ['tournament_category', 'weight_category', 'belt_level'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Fight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('stage', models.CharField(choices=[('main', 'Основная сетка'), ('repechage', 'Утешительные'), ('bronze', 'За третье место'), ('round_robin', 'Круговая система')], max_length=20, verbose_name='Стадия')),
+                ('round', models.PositiveSmallIntegerField(verbose_name='Круг')),
+                ('number', models.PositiveSmallIntegerField(verbose_name='Номер в сетке')),
+                ('next_slot', models.CharField(blank=True, choices=[('red', 'Красный'), ('blue', 'Синий')], max_length=4)),
+                ('loser_next_slot', models.CharField(blank=True, choices=[('red', 'Красный'), ('blue', 'Синий')], max_length=4)),
+                ('blue', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tournaments.registration')),
+                ('bracket', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='fights', to='tournaments.bracket')),
+                ('loser_next_fight', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tournaments.fight')),
+                ('next_fight', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tournaments.fight')),
+                ('red', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='tournaments.registration')),
+                ('winner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='won_fights', to='tournaments.registration')),
+            ],
+            options={
+                'verbose_name': 'Схватка',
+                'verbose_name_plural': 'Схватки',
+                'ordering': ['bracket', 'number'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='bracket',
+            constraint=models.UniqueConstraint(fields=('tournament', 'tournament_category', 'weight_category', 'belt_level'), name='unique_bracket'),
+        ),
+        migrations.AddConstraint(
+            model_name='fight',
+            constraint=models.UniqueConstraint(fields=('bracket', 'number'), name='unique_fight_number'),
+        ),
+    ]
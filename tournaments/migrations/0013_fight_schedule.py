@@ -0,0 +1,39 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:51
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0012_brackets'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fight',
+            name='mat',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Ковер'),
+        ),
+        migrations.AddField(
+            model_name='fight',
+            name='scheduled_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Время начала'),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='fight_duration',
+            field=models.PositiveSmallIntegerField(default=6, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Длительность схватки, мин'),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='mats',
+            field=models.PositiveSmallIntegerField(default=1, validators=[django.core.validators.MinValueValidator(1)], verbose_name='Количество ковров'),
+        ),
+        migrations.AddField(
+            model_name='tournament',
+            name='rest_duration',
+            field=models.PositiveSmallIntegerField(default=15, verbose_name='Отдых между схватками участника, мин'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+# Generated by Django 5.2.1 on 2026-10-18 19:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0013_fight_schedule'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fight',
+            name='blue_score',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Очки синего'),
+        ),
+        migrations.AddField(
+            model_name='fight',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Окончание'),
+        ),
+        migrations.AddField(
+            model_name='fight',
+            name='method',
+            field=models.CharField(blank=True, choices=[('points', 'По очкам'), ('submission', 'Болевой / удушающий'), ('decision', 'Решение судей'), ('disqualification', 'Дисквалификация'), ('walkover', 'Неявка соперника')], max_length=20, verbose_name='Способ победы'),
+        ),
+        migrations.AddField(
+            model_name='fight',
+            name='red_score',
+            field=models.PositiveSmallIntegerField(default=0, verbose_name='Очки красного'),
+        ),
+        migrations.AddField(
+            model_name='registration',
+            name='place',
+            field=models.PositiveSmallIntegerField(blank=True, null=True, verbose_name='Место'),
+        ),
+        migrations.CreateModel(
+            name='ResultEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('payload', models.JSONField(verbose_name='Данные события')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('fight', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tournaments.fight')),
+                ('tournament', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='result_events', to='tournaments.tournament')),
+            ],
+            options={
+                'verbose_name': 'Событие результатов',
+                'verbose_name_plural': 'События результатов',
+                'indexes': [models.Index(fields=['tournament', 'id'], name='result_event_tournament_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-18 20:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0014_fight_results'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MedalStanding',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scope', models.CharField(choices=[('club', 'Клубы'), ('region', 'Регионы'), ('athlete', 'Спортсмены')], max_length=10, verbose_name='Разрез')),
+                ('key', models.CharField(max_length=100, verbose_name='Ключ')),
+                ('name', models.CharField(max_length=255, verbose_name='Название')),
+                ('gold', models.PositiveIntegerField(default=0, verbose_name='Золото')),
+                ('silver', models.PositiveIntegerField(default=0, verbose_name='Серебро')),
+                ('bronze', models.PositiveIntegerField(default=0, verbose_name='Бронза')),
+                ('tournament', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='medal_standings', to='tournaments.tournament')),
+            ],
+            options={
+                'verbose_name': 'Медальный зачет',
+                'verbose_name_plural': 'Медальный зачет',
+                'indexes': [models.Index(models.F('scope'), models.F('tournament'), models.OrderBy(models.F('gold'), descending=True), models.OrderBy(models.F('silver'), descending=True), models.OrderBy(models.F('bronze'), descending=True), models.F('name'), name='medal_standing_rank_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('tournament__isnull', False)), fields=('scope', 'tournament', 'key'), name='unique_tournament_standing'), models.UniqueConstraint(condition=models.Q(('tournament__isnull', True)), fields=('scope', 'key'), name='unique_overall_standing')],
+            },
+        ),
+    ]
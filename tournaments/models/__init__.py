@@ -1,13 +1,27 @@
 from .fighting_style import FightingStyle
+from .registration_phase import RegistrationPhase
 from .tournament import Tournament
 from .tournament_category_template import TournamentCategoryTemplate
 from .tournament_category import TournamentCategory
+from .tournament_counter import TournamentCounter
+from .category_counter import CategoryCounter
 from .registration import Registration
+from .bracket import Bracket
+from .fight import Fight
+from .result_event import ResultEvent
+from .medal_standing import MedalStanding
 
 __all__ = [
     'FightingStyle',
+    'RegistrationPhase',
     'Tournament',
     'TournamentCategoryTemplate',
     'TournamentCategory',
+    'TournamentCounter',
+    'CategoryCounter',
     'Registration',
+    'Bracket',
+    'Fight',
+    'ResultEvent',
+    'MedalStanding',
 ] 
\ No newline at end of file
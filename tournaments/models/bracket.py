@@ -0,0 +1,46 @@
+from django.db import models
+from django.utils.translation import gettext as _
+
+# Форматы сеток
+FORMAT_SINGLE_ELIMINATION = 'single_elimination'
+FORMAT_ROUND_ROBIN = 'round_robin'
+
+FORMAT_CHOICES = [
+    (FORMAT_SINGLE_ELIMINATION, 'Олимпийская система с утешительными'),
+    (FORMAT_ROUND_ROBIN, 'Круговая система'),
+]
+
+
+class Bracket(models.Model):
+    """Сетка одной группы участников: категория, вес и пояс"""
+    tournament = models.ForeignKey(
+        'Tournament',
+        on_delete=models.CASCADE,
+        related_name='brackets'
+    )
+    tournament_category = models.ForeignKey(
+        'TournamentCategory',
+        on_delete=models.CASCADE,
+        related_name='brackets'
+    )
+    weight_category = models.PositiveSmallIntegerField(_('Весовая категория'))
+    belt_level = models.CharField(_('Уровень пояса'), max_length=50)
+    bracket_format = models.CharField(_('Формат'), max_length=20, choices=FORMAT_CHOICES)
+    size = models.PositiveSmallIntegerField(_('Размер сетки'))
+    participants = models.PositiveSmallIntegerField(_('Участников'))
+    draw_seed = models.BigIntegerField(_('Зерно жеребьевки'))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Сетка')
+        verbose_name_plural = _('Сетки')
+        ordering = ['tournament_category', 'weight_category', 'belt_level']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tournament', 'tournament_category', 'weight_category', 'belt_level'],
+                name='unique_bracket'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tournament_category} {self.weight_category} кг, {self.belt_level}"
@@ -0,0 +1,34 @@
+from django.db import models
+from django.utils.translation import gettext as _
+from .tournament_counter import CounterQuerySet
+
+
+class CategoryCounter(models.Model):
+    """Количество участников в весовой категории турнира"""
+    tournament = models.ForeignKey(
+        'Tournament',
+        on_delete=models.CASCADE,
+        related_name='category_counters'
+    )
+    tournament_category = models.ForeignKey(
+        'TournamentCategory',
+        on_delete=models.CASCADE,
+        related_name='participant_counters'
+    )
+    weight_category = models.PositiveSmallIntegerField(_('Весовая категория'))
+    participants = models.PositiveIntegerField(_('Участников'), default=0)
+
+    objects = CounterQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Счетчик участников категории')
+        verbose_name_plural = _('Счетчики участников категорий')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['tournament', 'tournament_category', 'weight_category'],
+                name='unique_category_counter'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.tournament_id}/{self.tournament_category_id}/{self.weight_category}: {self.participants}"
@@ -0,0 +1,108 @@
+from django.db import models
+from django.utils.translation import gettext as _
+
+# Стадии схватки
+STAGE_MAIN = 'main'
+STAGE_REPECHAGE = 'repechage'
+STAGE_BRONZE = 'bronze'
+STAGE_ROUND_ROBIN = 'round_robin'
+
+STAGE_CHOICES = [
+    (STAGE_MAIN, 'Основная сетка'),
+    (STAGE_REPECHAGE, 'Утешительные'),
+    (STAGE_BRONZE, 'За третье место'),
+    (STAGE_ROUND_ROBIN, 'Круговая система'),
+]
+
+# Угол, в который проходит участник следующей схватки
+SLOT_RED = 'red'
+SLOT_BLUE = 'blue'
+
+SLOT_CHOICES = [
+    (SLOT_RED, 'Красный'),
+    (SLOT_BLUE, 'Синий'),
+]
+
+# Способ победы
+METHOD_POINTS = 'points'
+METHOD_SUBMISSION = 'submission'
+METHOD_DECISION = 'decision'
+METHOD_DISQUALIFICATION = 'disqualification'
+METHOD_WALKOVER = 'walkover'
+
+METHOD_CHOICES = [
+    (METHOD_POINTS, 'По очкам'),
+    (METHOD_SUBMISSION, 'Болевой / удушающий'),
+    (METHOD_DECISION, 'Решение судей'),
+    (METHOD_DISQUALIFICATION, 'Дисквалификация'),
+    (METHOD_WALKOVER, 'Неявка соперника'),
+]
+
+
+class Fight(models.Model):
+    """
+    Схватка сетки. Участники схватки первого круга известны сразу, остальные
+    приходят из схваток, которые ссылаются на нее через next_fight / loser_next_fight.
+    """
+    bracket = models.ForeignKey(
+        'Bracket',
+        on_delete=models.CASCADE,
+        related_name='fights'
+    )
+    stage = models.CharField(_('Стадия'), max_length=20, choices=STAGE_CHOICES)
+    round = models.PositiveSmallIntegerField(_('Круг'))
+    number = models.PositiveSmallIntegerField(_('Номер в сетке'))
+    red = models.ForeignKey(
+        'Registration',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    blue = models.ForeignKey(
+        'Registration',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    winner = models.ForeignKey(
+        'Registration',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='won_fights'
+    )
+    next_fight = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    next_slot = models.CharField(max_length=4, choices=SLOT_CHOICES, blank=True)
+    loser_next_fight = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+'
+    )
+    loser_next_slot = models.CharField(max_length=4, choices=SLOT_CHOICES, blank=True)
+    mat = models.PositiveSmallIntegerField(_('Ковер'), null=True, blank=True)
+    scheduled_at = models.DateTimeField(_('Время начала'), null=True, blank=True)
+    red_score = models.PositiveSmallIntegerField(_('Очки красного'), default=0)
+    blue_score = models.PositiveSmallIntegerField(_('Очки синего'), default=0)
+    method = models.CharField(_('Способ победы'), max_length=20, choices=METHOD_CHOICES, blank=True)
+    finished_at = models.DateTimeField(_('Окончание'), null=True, blank=True)
+
+    class Meta:
+        verbose_name = _('Схватка')
+        verbose_name_plural = _('Схватки')
+        ordering = ['bracket', 'number']
+        constraints = [
+            models.UniqueConstraint(fields=['bracket', 'number'], name='unique_fight_number'),
+        ]
+
+    def __str__(self):
+        return f"{self.bracket} — схватка {self.number}"
@@ -0,0 +1,85 @@
+from django.db import models
+from django.db.models import F, Q
+from django.utils.translation import gettext as _
+
+# Разрезы медального зачета
+SCOPE_CLUB = 'club'
+SCOPE_REGION = 'region'
+SCOPE_ATHLETE = 'athlete'
+
+SCOPE_CHOICES = [
+    (SCOPE_CLUB, 'Клубы'),
+    (SCOPE_REGION, 'Регионы'),
+    (SCOPE_ATHLETE, 'Спортсмены'),
+]
+
+# Поле медали по занятому месту
+MEDALS = {1: 'gold', 2: 'silver', 3: 'bronze'}
+
+
+class MedalStandingQuerySet(models.QuerySet):
+    def add(self, place, name, **key):
+        """
+        Добавляет медаль за место одним UPDATE; недостающая строка создается.
+        Строка блокируется до конца транзакции, поэтому параллельные результаты не теряются.
+        """
+        medal = MEDALS[place]
+        rows = self.filter(**key)
+        if rows.update(**{medal: F(medal) + 1, 'name': name}):
+            return
+        self.get_or_create(**key, defaults={'name': name})
+        rows.update(**{medal: F(medal) + 1})
+
+    def ranked(self):
+        return self.order_by('-gold', '-silver', '-bronze', 'name')
+
+
+class MedalStanding(models.Model):
+    """
+    Строка медального зачета: клуб, регион или спортсмен в турнире
+    или по всем турнирам (tournament пустой). Обновляется вместе с результатами схваток.
+    """
+    scope = models.CharField(_('Разрез'), max_length=10, choices=SCOPE_CHOICES)
+    tournament = models.ForeignKey(
+        'Tournament',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='medal_standings'
+    )
+    # id клуба, название региона или участник ('profile:<id>' / 'guest:<id>')
+    key = models.CharField(_('Ключ'), max_length=100)
+    name = models.CharField(_('Название'), max_length=255)
+    gold = models.PositiveIntegerField(_('Золото'), default=0)
+    silver = models.PositiveIntegerField(_('Серебро'), default=0)
+    bronze = models.PositiveIntegerField(_('Бронза'), default=0)
+
+    objects = MedalStandingQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Медальный зачет')
+        verbose_name_plural = _('Медальный зачет')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'tournament', 'key'], condition=Q(tournament__isnull=False),
+                name='unique_tournament_standing'
+            ),
+            models.UniqueConstraint(
+                fields=['scope', 'key'], condition=Q(tournament__isnull=True),
+                name='unique_overall_standing'
+            ),
+        ]
+        indexes = [
+            # Таблица зачета читается по индексу в порядке мест
+            models.Index(
+                'scope', 'tournament', F('gold').desc(), F('silver').desc(), F('bronze').desc(), 'name',
+                name='medal_standing_rank_idx'
+            ),
+        ]
+
+    @property
+    def total(self):
+        return self.gold + self.silver + self.bronze
+
+    def __str__(self):
+        return f"{self.name}: {self.gold}/{self.silver}/{self.bronze}"
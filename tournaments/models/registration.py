@@ -1,7 +1,78 @@
-from django.db import models
+from collections import Counter
+
+from django.apps import apps
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.db.models import Count, OuterRef, Q, Subquery
+from django.db.models.lookups import Exact
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
 from django.utils.translation import gettext as _
+from psycopg2.errorcodes import UNIQUE_VIOLATION
+from payments.settings import PAYMENT_STATUS_SUCCEEDED
 from .tournament import Tournament
 from .tournament_category import TournamentCategory
+from .tournament_counter import TournamentCounter
+from .category_counter import CategoryCounter
+
+
+TOURNAMENT_FULL_MESSAGE = "Все места на турнире заняты"
+DUPLICATE_REGISTRATION_MESSAGE = (
+    "Вы уже зарегистрированы в этой категории. "
+    "Выберите другую категорию или отмените предыдущую регистрацию."
+)
+
+# Поиск при регистрации на месте: триграммный индекс работает от трех символов
+LOOKUP_MIN_LENGTH = 3
+LOOKUP_LIMIT = 20
+
+
+def last_payment(field):
+    """Подзапрос поля последнего платежа регистрации (индекс Payment по registration, -created_at)"""
+    Payment = apps.get_model('payments', 'Payment')
+    payments = Payment.objects.filter(registration=OuterRef('pk')).order_by('-created_at')
+    return Subquery(payments.values(field)[:1])
+
+
+class RegistrationQuerySet(models.QuerySet):
+    def with_last_payment(self):
+        """Аннотирует last_payment_status и last_payment_date последнего платежа регистрации"""
+        return self.annotate(
+            last_payment_status=last_payment('status'),
+            last_payment_date=last_payment('created_at'),
+        )
+
+    def paid(self):
+        """Регистрации, последний платеж которых прошел успешно"""
+        return self.alias(last_status=last_payment('status')).filter(last_status=PAYMENT_STATUS_SUCCEEDED)
+
+    def participant_counts(self):
+        """Количество участников и оплативших по (категория, вес) одним GROUP BY"""
+        return self.order_by().values('tournament_category', 'weight_category').annotate(
+            participants=Count('id'),
+            paid=Count('id', filter=Exact(last_payment('status'), PAYMENT_STATUS_SUCCEEDED)),
+        )
+
+    def lookup(self, query):
+        """
+        Поиск регистраций по фамилии, имени, телефону или email участника.
+        Участники ищутся подзапросами по триграммным индексам, затем сужаются до регистраций турнира.
+        """
+        query = query.strip()
+        if len(query) < LOOKUP_MIN_LENGTH:
+            return self.none()
+        Profile_user = apps.get_model('accounts', 'Profile_user')
+        UnregisteredParticipant = apps.get_model('accounts', 'UnregisteredParticipant')
+        profiles = Profile_user.objects.filter(
+            Q(last_name__icontains=query) | Q(first_name__icontains=query)
+            | Q(phone__icontains=query) | Q(user__email__icontains=query)
+        ).values('id')
+        guests = UnregisteredParticipant.objects.filter(
+            Q(last_name__icontains=query) | Q(first_name__icontains=query)
+            | Q(phone__icontains=query) | Q(email__icontains=query)
+        ).values('id')
+        return self.filter(Q(profile_user__in=profiles) | Q(unregistered_participant__in=guests))
+
 
 class Registration(models.Model):
     """Модель регистрации участника на турнир"""
@@ -37,6 +108,13 @@ class Registration(models.Model):
         default=False
     )
     registration_date = models.DateTimeField(auto_now_add=True)
+    checked_in_at = models.DateTimeField('Прибыл на турнир', null=True, blank=True)
+    weighed_in_at = models.DateTimeField('Прошел взвешивание', null=True, blank=True)
+    actual_weight = models.DecimalField('Вес на взвешивании', max_digits=5, decimal_places=2, null=True, blank=True)
+    seed = models.PositiveSmallIntegerField('Посев', null=True, blank=True)
+    place = models.PositiveSmallIntegerField('Место', null=True, blank=True)
+
+    objects = RegistrationQuerySet.as_manager()
     
     class Meta:
         unique_together = [
@@ -44,6 +122,82 @@ class Registration(models.Model):
             ('tournament', 'unregistered_participant', 'tournament_category')
         ]
     
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            if self._state.adding:
+                # Сначала вставка, затем место: блокировка строки счетчика держится только до коммита.
+                # Повторную регистрацию в категории отклоняет уникальный индекс, без предварительного SELECT
+                try:
+                    super().save(*args, **kwargs)
+                except IntegrityError as e:
+                    if getattr(e.__cause__, 'pgcode', None) == UNIQUE_VIOLATION:
+                        raise ValidationError(DUPLICATE_REGISTRATION_MESSAGE, code='duplicate_registration')
+                    raise
+                self.change_counters(1, limit=self.tournament.max_participants)
+                return
+
+            previous = None
+            if update_fields is None or {'tournament', 'tournament_category', 'weight_category'} & set(update_fields):
+                previous = Registration.objects.filter(pk=self.pk).values_list(
+                    'tournament_id', 'tournament_category_id', 'weight_category'
+                ).first()
+            super().save(*args, **kwargs)
+            # Перенос в другую категорию или вес: переносим и счетчик
+            if previous and previous != (self.tournament_id, self.tournament_category_id, self.weight_category):
+                Registration.change_counters_for(*previous, delta=-1)
+                self.change_counters(1)
+
+    def change_counters(self, delta, limit=None):
+        Registration.change_counters_for(
+            self.tournament_id, self.tournament_category_id, self.weight_category, delta, limit
+        )
+
+    @staticmethod
+    def change_counters_for(tournament_id, tournament_category_id, weight_category, delta, limit=None):
+        """
+        Изменяет счетчики турнира и весовой категории; турнир всегда первым, чтобы не было взаимных блокировок.
+        Если турнир заполнен (limit), транзакция откатывается с ValidationError.
+        """
+        if not TournamentCounter.objects.change(delta, limit, tournament_id=tournament_id):
+            raise ValidationError(TOURNAMENT_FULL_MESSAGE, code='tournament_full')
+        CategoryCounter.objects.change(
+            delta,
+            tournament_id=tournament_id,
+            tournament_category_id=tournament_category_id,
+            weight_category=weight_category
+        )
+
+    @property
+    def result(self):
+        return f"{self.place} место" if self.place else None
+
+    @staticmethod
+    def add_counters(tournament_id, keys, limit=None):
+        """
+        Счетчики для регистраций, вставленных одним bulk_create: keys — [(id категории, вес), ...].
+        Турнир увеличивается сразу на всю заявку, категории — по одному UPDATE на весовую категорию.
+        """
+        if not TournamentCounter.objects.change(len(keys), limit, tournament_id=tournament_id):
+            raise ValidationError(TOURNAMENT_FULL_MESSAGE, code='tournament_full')
+        for (tournament_category_id, weight_category), count in sorted(Counter(keys).items()):
+            CategoryCounter.objects.change(
+                count,
+                tournament_id=tournament_id,
+                tournament_category_id=tournament_category_id,
+                weight_category=weight_category
+            )
+
+    def participant_name(self):
+        if self.profile_user:
+            return self.profile_user.get_full_name()
+        return str(self.unregistered_participant)
+
     def __str__(self):
         participant = self.profile_user or self.unregistered_participant
-        return f"{participant} - {self.tournament.title} ({self.tournament_category.actual_name})" 
\ No newline at end of file
+        return f"{participant} - {self.tournament.title} ({self.tournament_category.actual_name})" 
+
+@receiver(post_delete, sender=Registration)
+def decrease_participant_counters(sender, instance, **kwargs):
+    """Срабатывает и при каскадном удалении (участника, категории), в той же транзакции"""
+    instance.change_counters(-1)
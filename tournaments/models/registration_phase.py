@@ -0,0 +1,137 @@
+from django.contrib.postgres.fields import DateTimeRangeField
+from django.contrib.postgres.indexes import GistIndex
+from django.db import models
+from django.db.models import Func, Value
+from django.utils import timezone
+from django.utils.translation import gettext as _
+
+# Периоды регистрации
+PHASE_EARLY = 'early'
+PHASE_REGULAR = 'regular'
+PHASE_LATE = 'late'
+PHASE_CLOSED = 'closed'
+PHASE_NOT_STARTED = 'not_started'
+
+OPEN_REGISTRATION_PHASES = (PHASE_EARLY, PHASE_REGULAR, PHASE_LATE)
+
+PHASE_CHOICES = [
+    (PHASE_EARLY, 'Ранняя регистрация'),
+    (PHASE_REGULAR, 'Обычная регистрация'),
+    (PHASE_LATE, 'Поздняя регистрация'),
+    (PHASE_CLOSED, 'Регистрация закрыта'),
+    (PHASE_NOT_STARTED, 'Регистрация еще не началась'),
+]
+
+# Поля турнира, от которых зависит расписание регистрации.
+# Расписание пересобирает Tournament.save(); Tournament.objects.update() по этим полям его не трогает,
+# после такого обновления нужно вызвать sync_registration_phases() у каждого измененного турнира
+PHASE_SOURCE_FIELDS = (
+    'early_registration_start', 'early_registration_price',
+    'regular_registration_start', 'regular_registration_price',
+    'late_registration_start', 'late_registration_price',
+    'registration_deadline',
+)
+
+
+def registration_phase_periods(tournament):
+    """
+    Расписание регистрации турнира: список (фаза, начало, окончание, цена).
+    Каждый период длится до начала следующего заданного периода, последний — до дедлайна.
+    Единственное место, где описаны правила смены периодов.
+    """
+    starts = [
+        (PHASE_EARLY, tournament.early_registration_start, tournament.early_registration_price),
+        (PHASE_REGULAR, tournament.regular_registration_start, tournament.regular_registration_price),
+        (PHASE_LATE, tournament.late_registration_start, tournament.late_registration_price),
+    ]
+    starts = [(phase, start, price) for phase, start, price in starts if start is not None]
+
+    periods = []
+    for i, (phase, starts_at, price) in enumerate(starts):
+        if i + 1 < len(starts):
+            ends_at = starts[i + 1][1]
+            if starts_at >= ends_at:
+                continue
+        else:
+            ends_at = tournament.registration_deadline
+            if starts_at > ends_at:
+                continue
+        periods.append((phase, starts_at, ends_at, price))
+    return periods
+
+
+def registration_phase_at(tournament, now):
+    """
+    (фаза, цена, окончание фазы) в момент now по полям турнира, без запросов к базе.
+    Повторяет TournamentQuerySet.with_registration_phase: границы включены, на стыке действует более поздний период.
+    """
+    periods = registration_phase_periods(tournament)
+    current = [period for period in periods if period[1] <= now <= period[2]]
+    if current:
+        phase, _starts_at, ends_at, price = max(current, key=lambda period: period[1])
+        return phase, price, ends_at
+    upcoming = [starts_at for _phase, starts_at, _ends_at, _price in periods if starts_at > now]
+    if upcoming:
+        return PHASE_NOT_STARTED, None, min(upcoming)
+    return PHASE_CLOSED, None, None
+
+
+class TsTzRange(Func):
+    function = 'TSTZRANGE'
+    output_field = DateTimeRangeField()
+
+
+class RegistrationPhaseQuerySet(models.QuerySet):
+    def current(self, now=None):
+        """Периоды, действующие в момент now (поиск по GiST-индексу)"""
+        if now is None:
+            now = timezone.now()
+        return self.filter(period__contains=now)
+
+    def upcoming(self, now=None):
+        """Периоды, которые начнутся после now"""
+        if now is None:
+            now = timezone.now()
+        return self.filter(starts_at__gt=now)
+
+
+class RegistrationPhase(models.Model):
+    """Период регистрации турнира (ранняя, обычная, поздняя) с ценой"""
+    tournament = models.ForeignKey(
+        'Tournament',
+        on_delete=models.CASCADE,
+        related_name='registration_phases'
+    )
+    phase = models.CharField(
+        _('Период'),
+        max_length=20,
+        choices=PHASE_CHOICES[:3]
+    )
+    starts_at = models.DateTimeField(_('Начало'))
+    ends_at = models.DateTimeField(_('Окончание'))
+    price = models.DecimalField(
+        _('Цена'),
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True
+    )
+    # Границы включены; на стыке периодов действует более поздний
+    period = models.GeneratedField(
+        expression=TsTzRange('starts_at', 'ends_at', Value('[]')),
+        output_field=DateTimeRangeField(),
+        db_persist=True,
+    )
+
+    objects = RegistrationPhaseQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Период регистрации')
+        verbose_name_plural = _('Периоды регистрации')
+        ordering = ['tournament', 'starts_at']
+        indexes = [
+            GistIndex(fields=['period']),
+        ]
+
+    def __str__(self):
+        return f"{self.tournament_id}: {self.get_phase_display()} ({self.starts_at:%d.%m.%Y} - {self.ends_at:%d.%m.%Y})"
@@ -0,0 +1,31 @@
+from django.db import models
+from django.utils.translation import gettext as _
+
+
+class ResultEvent(models.Model):
+    """
+    Событие ленты результатов турнира. id служит номером события SSE:
+    переподключившееся табло получает события после Last-Event-ID.
+    """
+    tournament = models.ForeignKey(
+        'Tournament',
+        on_delete=models.CASCADE,
+        related_name='result_events'
+    )
+    fight = models.ForeignKey(
+        'Fight',
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    payload = models.JSONField(_('Данные события'))
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _('Событие результатов')
+        verbose_name_plural = _('События результатов')
+        indexes = [
+            models.Index(fields=['tournament', 'id'], name='result_event_tournament_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.tournament_id}: {self.payload}"
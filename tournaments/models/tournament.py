@@ -1,7 +1,111 @@
-from django.db import models
+import math
+
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db import models, transaction
+from django.db.models import Case, Exists, OuterRef, Prefetch, Subquery, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
 from django.utils.translation import gettext as _
 from django.core.validators import MinValueValidator
 from .fighting_style import FightingStyle
+from .tournament_category import TournamentCategory
+from .tournament_counter import TournamentCounter
+from .registration_phase import (
+    OPEN_REGISTRATION_PHASES,
+    PHASE_CLOSED,
+    PHASE_EARLY,
+    PHASE_LATE,
+    PHASE_NOT_STARTED,
+    PHASE_REGULAR,
+    PHASE_SOURCE_FIELDS,
+    RegistrationPhase,
+    registration_phase_at,
+    registration_phase_periods,
+)
+
+PHASE_LABELS = {
+    PHASE_EARLY: "Ранняя регистрация открыта до {}",
+    PHASE_REGULAR: "Обычная регистрация открыта до {}",
+    PHASE_LATE: "Поздняя регистрация открыта до {}",
+}
+
+# Максимальное время жизни кэша карточки турнира, сек
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Поля турнира, которые нужны карточке в списках (описание не загружается)
+CARD_FIELDS = (
+    'id', 'title', 'image', 'location', 'created_at', 'updated_at',
+    'early_registration_start', 'regular_registration_start', 'late_registration_start',
+    'registration_deadline', 'tournament_start', 'tournament_end',
+)
+
+
+class TournamentQuerySet(models.QuerySet):
+    def listing(self, scope, now=None):
+        """Активные турниры (дедлайн не прошел) или прошедшие при scope='latest'"""
+        if now is None:
+            now = timezone.now()
+        if scope == 'latest':
+            return self.filter(registration_deadline__lte=now)
+        return self.filter(registration_deadline__gt=now)
+
+    def for_cards(self):
+        """Только поля карточки турнира и предзагруженные виды борьбы"""
+        return self.only(*CARD_FIELDS).prefetch_related('fighting_styles')
+
+    def for_detail(self):
+        """
+        Все данные страницы турнира: организатор (JOIN), названия видов борьбы (подзапрос)
+        и категории с шаблонами отдельным запросом
+        """
+        return self.select_related('profile_organizer__user').annotate(
+            fighting_style_names=ArraySubquery(
+                FightingStyle.objects.filter(tournament=OuterRef('pk')).values('name')
+            )
+        ).prefetch_related(
+            Prefetch(
+                'tournament_categories',
+                queryset=TournamentCategory.objects.select_related('template__fighting_style')
+            )
+        ).with_registration_phase()
+
+    def with_registration_phase(self, now=None):
+        """Аннотирует current_phase, current_price и phase_ends_at на момент now по расписанию регистрации"""
+        if now is None:
+            now = timezone.now()
+        current = RegistrationPhase.objects.filter(
+            tournament=OuterRef('pk')
+        ).current(now).order_by('-starts_at')[:1]
+        upcoming = RegistrationPhase.objects.filter(
+            tournament=OuterRef('pk')
+        ).upcoming(now).order_by('starts_at')[:1]
+        return self.annotate(
+            current_phase=Coalesce(
+                Subquery(current.values('phase')),
+                Case(
+                    When(Exists(upcoming), then=Value(PHASE_NOT_STARTED)),
+                    default=Value(PHASE_CLOSED),
+                ),
+                output_field=models.CharField(),
+            ),
+            current_price=Subquery(current.values('price')),
+            phase_ends_at=Coalesce(
+                Subquery(current.values('ends_at')),
+                Subquery(upcoming.values('starts_at')),
+            ),
+        )
+
+    def registration_open(self, now=None, max_price=None):
+        """Турниры, регистрация на которые открыта в момент now (и цена не выше max_price)"""
+        if now is None:
+            now = timezone.now()
+        phases = RegistrationPhase.objects.current(now)
+        if max_price is not None:
+            phases = phases.filter(price__lte=max_price)
+        return self.with_registration_phase(now).filter(id__in=phases.values('tournament_id'))
+
 
 class Tournament(models.Model):
     """Модель турнира"""
@@ -77,6 +181,21 @@ class Tournament(models.Model):
     tournament_end = models.DateTimeField(
         _('Дата окончания соревнований'), 
     )
+    # Параметры расписания схваток
+    mats = models.PositiveSmallIntegerField(
+        _('Количество ковров'),
+        default=1,
+        validators=[MinValueValidator(1)]
+    )
+    fight_duration = models.PositiveSmallIntegerField(
+        _('Длительность схватки, мин'),
+        default=6,
+        validators=[MinValueValidator(1)]
+    )
+    rest_duration = models.PositiveSmallIntegerField(
+        _('Отдых между схватками участника, мин'),
+        default=15
+    )
     # Связь многие-ко-многим с видами борьбы
     tournament_categories = models.ManyToManyField(
         'TournamentCategory',
@@ -118,6 +237,19 @@ class Tournament(models.Model):
         default=False
     )
 
+    # Поисковый вектор (название, место, описание) с русской морфологией
+    search_vector = models.GeneratedField(
+        expression=(
+            SearchVector('title', weight='A', config='russian')
+            + SearchVector('location', weight='B', config='russian')
+            + SearchVector('description', weight='C', config='russian')
+        ),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = TournamentQuerySet.as_manager()
+
     class Meta:
         verbose_name = _('Турнир')
         verbose_name_plural = _('Турниры')
@@ -125,41 +257,74 @@ class Tournament(models.Model):
         indexes = [
             models.Index(fields=['title']),
             models.Index(fields=['registration_deadline']),
+            models.Index(fields=['-created_at', '-id']),
+            GinIndex(fields=['search_vector']),
         ]
 
     def __str__(self):
         return self.title
 
     def get_current_participants_count(self):
-        """Возвращает текущее количество участников"""
-        return self.registrations.count()
+        """Возвращает текущее количество участников из счетчика (без COUNT по регистрациям)"""
+        try:
+            return self.participant_counter.participants
+        except TournamentCounter.DoesNotExist:
+            return 0
+
+    def has_free_places(self):
+        """Есть ли свободные места (по счетчику, без блокировок; окончательно проверяет Registration.save)"""
+        return self.max_participants is None or self.get_current_participants_count() < self.max_participants
+
+    def get_category_participants_counts(self):
+        """Количество участников по (категория, весовая категория) из счетчиков"""
+        return {
+            (category_id, weight): participants
+            for category_id, weight, participants in self.category_counters.values_list(
+                'tournament_category_id', 'weight_category', 'participants'
+            )
+        }
+
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        adding = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding:
+                TournamentCounter.objects.create(tournament=self)
+            if update_fields is None or set(update_fields) & set(PHASE_SOURCE_FIELDS):
+                self.sync_registration_phases()
+
+    def sync_registration_phases(self):
+        """Пересоздает расписание периодов регистрации по датам турнира"""
+        self.registration_phases.all().delete()
+        RegistrationPhase.objects.bulk_create([
+            RegistrationPhase(tournament=self, phase=phase, starts_at=starts_at, ends_at=ends_at, price=price)
+            for phase, starts_at, ends_at, price in registration_phase_periods(self)
+        ])
+        # Аннотации, загруженные до сохранения, больше не актуальны
+        for attr in ('current_phase', 'current_price', 'phase_ends_at'):
+            self.__dict__.pop(attr, None)
+
+    def get_registration_phase(self, now=None):
+        """
+        Возвращает (фаза, цена, окончание фазы) текущего периода регистрации.
+        Берет аннотации with_registration_phase, а без них считает по полям турнира,
+        так что работает и для несохраненного экземпляра
+        """
+        if now is None and hasattr(self, 'current_phase'):
+            return self.current_phase, self.current_price, self.phase_ends_at
+        phase = registration_phase_at(self, timezone.now() if now is None else now)
+        if now is None:
+            self.current_phase, self.current_price, self.phase_ends_at = phase
+        return phase
 
     def is_registration_open(self):
         """Проверяет, открыта ли регистрация"""
-        from django.utils import timezone
-        now = timezone.now()
-        
-        # Если нет ранней и поздней регистрации
-        if self.early_registration_start is None and self.late_registration_start is None:
-            if self.regular_registration_start and now >= self.regular_registration_start and now <= self.registration_deadline:
-                return True
-            return False
-
-        # Проверяем периоды регистрации
-        if self.early_registration_start and now >= self.early_registration_start:
-            if self.regular_registration_start and now < self.regular_registration_start:
-                return True
-            elif self.regular_registration_start and now >= self.regular_registration_start:
-                if self.late_registration_start and now < self.late_registration_start:
-                    return True
-                elif self.late_registration_start and now >= self.late_registration_start:
-                    return now <= self.registration_deadline
-                return now <= self.registration_deadline
-        return False
+        phase, _price, _ends_at = self.get_registration_phase()
+        return phase in OPEN_REGISTRATION_PHASES
 
     def get_status(self):
         """Возвращает текущий статус турнира"""
-        from django.utils import timezone
         now = timezone.now()
 
         if now < self.registration_deadline:
@@ -171,69 +336,31 @@ class Tournament(models.Model):
         else:
             return 'completed'
 
+    def get_card_cache_timeout(self):
+        """Время жизни кэша карточки (сек): до ближайшей смены периода регистрации"""
+        _phase, _price, ends_at = self.get_registration_phase()
+        if ends_at is None:
+            return CARD_CACHE_TIMEOUT
+        seconds = math.ceil((ends_at - timezone.now()).total_seconds())
+        return max(1, min(seconds, CARD_CACHE_TIMEOUT))
+
     def get_current_registration_price(self):
         """Возвращает текущую цену регистрации на основе дат"""
-        from django.utils import timezone
-        now = timezone.now()
-        
-        # Если нет ранней и поздней регистрации
-        if self.early_registration_start is None and self.late_registration_start is None:
-            if self.regular_registration_start and now >= self.regular_registration_start and now <= self.registration_deadline:
-                return self.regular_registration_price
-            return None
-
-        # Проверяем периоды регистрации
-        if self.early_registration_start and now >= self.early_registration_start:
-            if self.regular_registration_start and now < self.regular_registration_start:
-                return self.early_registration_price
-            elif self.regular_registration_start and now >= self.regular_registration_start:
-                if self.late_registration_start and now < self.late_registration_start:
-                    return self.regular_registration_price
-                elif self.late_registration_start and now >= self.late_registration_start:
-                    if now <= self.registration_deadline:
-                        return self.late_registration_price
-                    return None
-                elif now <= self.registration_deadline:
-                    return self.regular_registration_price
-                return None
-        return None
+        _phase, price, _ends_at = self.get_registration_phase()
+        return price
 
     def get_current_registration_info(self):
         """Возвращает текст с типом и датой текущей регистрации"""
-        from django.utils import timezone
-        now = timezone.now()
-
-        # Если нет ранней и поздней регистрации
-        if self.early_registration_start is None and self.late_registration_start is None:
-            if self.regular_registration_start and now >= self.regular_registration_start and now <= self.registration_deadline:
-                return _("Регистрация открыта до {}").format(
-                    self.registration_deadline.strftime("%d.%m.%Y")
-                )
+        phase, _price, ends_at = self.get_registration_phase()
+        if phase == PHASE_CLOSED:
             return _("Регистрация закрыта")
-
-        # Проверяем периоды регистрации
-        if self.early_registration_start and now >= self.early_registration_start:
-            if self.regular_registration_start and now < self.regular_registration_start:
-                return _("Ранняя регистрация открыта до {}").format(
-                    self.regular_registration_start.strftime("%d.%m.%Y")
-                )
-            elif self.regular_registration_start and now >= self.regular_registration_start:
-                if self.late_registration_start and now < self.late_registration_start:
-                    return _("Обычная регистрация открыта до {}").format(
-                        self.late_registration_start.strftime("%d.%m.%Y")
-                    )
-                elif self.late_registration_start and now >= self.late_registration_start:
-                    if now <= self.registration_deadline:
-                        return _("Поздняя регистрация открыта до {}").format(
-                            self.registration_deadline.strftime("%d.%m.%Y")
-                        )
-                    return _("Регистрация закрыта")
-                elif now <= self.registration_deadline:
-                    return _("Обычная регистрация открыта до {}").format(
-                        self.registration_deadline.strftime("%d.%m.%Y")
-                    )
-                return _("Регистрация закрыта")
-        return _("Регистрация еще не началась")
+        if phase == PHASE_NOT_STARTED:
+            return _("Регистрация еще не началась")
+        if phase == PHASE_REGULAR and self.early_registration_start is None and self.late_registration_start is None:
+            label = _("Регистрация открыта до {}")
+        else:
+            label = _(PHASE_LABELS[phase])
+        return label.format(ends_at.strftime("%d.%m.%Y"))
         
     def get_org_profile(self):
         return self.profile_organizer
@@ -242,6 +369,8 @@ class Tournament(models.Model):
         return self.registration_deadline
     
     def fs_qset(self):
+        if hasattr(self, 'fighting_style_names'):
+            return "\n".join(self.fighting_style_names)
         data = self.fighting_styles.all().values_list()
         return "\n".join(str(x[1]) for x in data)
     
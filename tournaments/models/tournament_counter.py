@@ -0,0 +1,44 @@
+from django.db import models
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.utils.translation import gettext as _
+
+
+class CounterQuerySet(models.QuerySet):
+    def change(self, delta, limit=None, **key):
+        """
+        Атомарно изменяет счетчик на delta одним UPDATE (строка блокируется до конца транзакции).
+        С limit счетчик увеличивается, только если не превысит предел; возвращает False, если мест нет.
+        Недостающая строка создается только при увеличении. При уменьшении счетчик не опускается ниже нуля:
+        разошедшийся счетчик не должен ломать удаление регистрации, расхождение исправит сверка.
+        """
+        rows = self.filter(**key)
+        if limit is not None:
+            rows = rows.filter(participants__lte=limit - delta)
+        value = F('participants') + delta if delta >= 0 else Greatest(F('participants') + delta, 0)
+        if rows.update(participants=value):
+            return True
+        if delta <= 0:
+            return True
+        self.get_or_create(**key)
+        return bool(rows.update(participants=F('participants') + delta))
+
+
+class TournamentCounter(models.Model):
+    """Количество участников турнира, обновляется в одной транзакции с регистрациями"""
+    tournament = models.OneToOneField(
+        'Tournament',
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='participant_counter'
+    )
+    participants = models.PositiveIntegerField(_('Участников'), default=0)
+
+    objects = CounterQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _('Счетчик участников турнира')
+        verbose_name_plural = _('Счетчики участников турниров')
+
+    def __str__(self):
+        return f"{self.tournament_id}: {self.participants}"
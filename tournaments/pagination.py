@@ -0,0 +1,42 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+# Количество карточек турниров на одной странице
+PAGE_SIZE = 24
+
+
+def encode_cursor(tournament):
+    """Кодирует позицию (created_at, id) турнира в строку курсора"""
+    raw = f"{tournament.created_at.isoformat()}|{tournament.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Декодирует курсор в (created_at, id); возвращает None для некорректного значения"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        created_at, pk = raw.split('|')
+        return datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, UnicodeError):
+        return None
+
+
+def keyset_page(queryset, cursor=None, page_size=PAGE_SIZE):
+    """
+    Возвращает (список турниров, курсор следующей страницы) по порядку (-created_at, -id).
+    Стоимость страницы не зависит от её номера, в отличие от OFFSET.
+    """
+    queryset = queryset.order_by('-created_at', '-id')
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        created_at, pk = position
+        queryset = queryset.filter(
+            Q(created_at__lte=created_at),
+            Q(created_at__lt=created_at) | Q(id__lt=pk)
+        )
+
+    items = list(queryset[:page_size + 1])
+    next_cursor = encode_cursor(items[page_size - 1]) if len(items) > page_size else None
+    return items[:page_size], next_cursor
@@ -0,0 +1,122 @@
+"""
+Результаты схваток, которые вводятся за судейским столом ковра.
+Запись результата — одна короткая транзакция: победитель и проигравший проходят
+в следующие схватки сетки, определившиеся места записываются в регистрации и в медальный зачет,
+событие попадает в ленту результатов и рассылается табло через NOTIFY.
+"""
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils import timezone
+
+from tournaments import live
+from tournaments.standings import add_medals
+from tournaments.models import Fight, Registration, ResultEvent
+from tournaments.models.fight import SLOT_BLUE, SLOT_RED, STAGE_BRONZE, STAGE_MAIN, STAGE_ROUND_ROBIN
+
+# Призовые места, которые попадают в ленту результатов
+PODIUM = 3
+
+
+def _elimination_places(fight, winner_id, loser_id):
+    """Места, которые определяет схватка олимпийской сетки"""
+    rounds = fight.bracket.size.bit_length() - 1
+    if fight.stage == STAGE_BRONZE:
+        return [(winner_id, 3)]
+    if fight.stage != STAGE_MAIN:
+        return []
+    if fight.round == rounds:
+        return [(winner_id, 1), (loser_id, 2)]
+    # Проигравший полуфинал без схватки за бронзу (маленькая сетка или пустая утешительная ветка)
+    if fight.round == rounds - 1 and not fight.loser_next_fight_id:
+        return [(loser_id, 3)]
+    return []
+
+
+def _round_robin_places(bracket):
+    """Места круговой системы, когда сыграны все схватки: по победам, затем по очкам"""
+    fights = list(Fight.objects.filter(bracket=bracket).values_list(
+        'red', 'blue', 'winner', 'red_score', 'blue_score'
+    ))
+    if any(winner is None for _red, _blue, winner, *_scores in fights):
+        return []
+    wins, points = defaultdict(int), defaultdict(int)
+    for red, blue, winner, red_score, blue_score in fights:
+        wins[winner] += 1
+        points[red] += red_score
+        points[blue] += blue_score
+    ranking = sorted(points, key=lambda athlete: (-wins[athlete], -points[athlete], athlete))
+    return [(athlete, place) for place, athlete in enumerate(ranking, 1)]
+
+
+def _event_payload(fight, places, names):
+    bracket = fight.bracket
+    return {
+        'fight': fight.id,
+        'bracket': bracket.id,
+        'category': f"{bracket.tournament_category.actual_name()}, {bracket.weight_category} кг, {bracket.belt_level}",
+        'number': fight.number,
+        'stage': fight.get_stage_display(),
+        'mat': fight.mat,
+        'red': names[fight.red_id],
+        'blue': names[fight.blue_id],
+        'winner': SLOT_RED if fight.winner_id == fight.red_id else SLOT_BLUE,
+        'red_score': fight.red_score,
+        'blue_score': fight.blue_score,
+        'method': fight.get_method_display(),
+        'finished_at': fight.finished_at.isoformat(),
+        'places': [
+            {'registration': athlete, 'name': names[athlete], 'place': place}
+            for athlete, place in places if place <= PODIUM
+        ],
+    }
+
+
+def record_result(tournament, fight_id, winner, method, red_score=0, blue_score=0):
+    """
+    Записывает результат схватки турнира. winner — угол победителя (red / blue).
+    Возвращает событие ленты результатов. Схватка, у которой еще нет соперника
+    или уже есть результат, не меняется (ValidationError).
+    """
+    participant = ('profile_user', 'unregistered_participant')
+    with transaction.atomic():
+        fight = Fight.objects.filter(bracket__tournament=tournament).select_related(
+            'bracket__tournament_category__template',
+            *(f'{corner}__{field}' for corner in ('red', 'blue') for field in participant)
+        ).select_for_update(of=('self',)).get(pk=fight_id)
+        if fight.winner_id:
+            raise ValidationError('Результат схватки уже записан', code='fight_finished')
+        if not (fight.red_id and fight.blue_id):
+            raise ValidationError('Соперники в схватке еще не определены', code='fight_not_ready')
+
+        winner_id, loser_id = (fight.red_id, fight.blue_id) if winner == SLOT_RED else (fight.blue_id, fight.red_id)
+        fight.winner_id = winner_id
+        fight.method = method
+        fight.red_score, fight.blue_score = red_score, blue_score
+        fight.finished_at = timezone.now()
+        fight.save(update_fields=['winner', 'method', 'red_score', 'blue_score', 'finished_at'])
+
+        for target, slot, athlete in ((fight.next_fight_id, fight.next_slot, winner_id),
+                                      (fight.loser_next_fight_id, fight.loser_next_slot, loser_id)):
+            if target:
+                Fight.objects.filter(pk=target).update(**{f'{slot}_id': athlete})
+
+        if fight.stage == STAGE_ROUND_ROBIN:
+            places = _round_robin_places(fight.bracket)
+        else:
+            places = _elimination_places(fight, winner_id, loser_id)
+        for athlete, place in places:
+            Registration.objects.filter(pk=athlete).update(place=place)
+        add_medals(fight.bracket.tournament_id, places)
+
+        names = {athlete.id: athlete.participant_name() for athlete in (fight.red, fight.blue)}
+        # Призеры круговой системы могут не участвовать в последней схватке
+        medalists = {athlete for athlete, place in places if place <= PODIUM} - names.keys()
+        for other in Registration.objects.filter(pk__in=medalists).select_related(*participant):
+            names[other.id] = other.participant_name()
+
+        payload = _event_payload(fight, places, names)
+        event = ResultEvent.objects.create(tournament_id=fight.bracket.tournament_id, fight=fight, payload=payload)
+        live.publish(event)
+    return event
@@ -0,0 +1,196 @@
+"""
+Расписание схваток турнира по коврам.
+Жадное списочное планирование: освободившийся ковер берет самую приоритетную из готовых схваток.
+Схватка готова, когда закончились схватки, из которых приходят ее участники, и участники отдохнули.
+Приоритет — возраст категории (младшие заканчивают раньше), затем длина оставшейся цепочки
+схваток сетки, чтобы длинные сетки не задерживали окончание турнира.
+"""
+import heapq
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from tournaments.models import Fight
+
+# Категории без возраста идут последними
+UNKNOWN_AGE = 1000
+
+
+class Task:
+    """Схватка для планировщика; время — в минутах от начала расписания"""
+    __slots__ = ('key', 'priority', 'athletes', 'predecessors', 'successors', 'start', 'mat', 'fixed', 'ready')
+
+    def __init__(self, key, rank, athletes=(), fixed=False, start=None, mat=None):
+        self.key = key
+        self.priority = rank
+        self.athletes = athletes
+        self.predecessors = []
+        self.successors = []
+        self.fixed = fixed
+        self.start = start
+        self.mat = mat
+        self.ready = 0
+
+
+def build_tasks(rows):
+    """
+    Задачи из строк (key, rank, athletes, next_key, loser_next_key, fixed, start, mat).
+    rank — кортеж сортировки (возраст категории, порядок схватки).
+    """
+    rows = list(rows)
+    tasks = {row[0]: Task(row[0], row[1], row[2], *row[5:]) for row in rows}
+    for key, _rank, _athletes, next_key, loser_next_key, *_rest in rows:
+        for target in (next_key, loser_next_key):
+            if target is not None and target in tasks:
+                tasks[key].successors.append(tasks[target])
+                tasks[target].predecessors.append(tasks[key])
+    return list(tasks.values())
+
+
+def _chain_lengths(tasks, duration):
+    """Длина самой длинной цепочки незакрепленных схваток от каждой задачи до конца сетки"""
+    tails = {}
+
+    def tail(task):
+        if task.key not in tails:
+            tails[task.key] = duration + max(
+                (tail(successor) for successor in task.successors if not successor.fixed), default=0
+            )
+        return tails[task.key]
+
+    return {task.key: tail(task) for task in tasks}
+
+
+def plan(tasks, mats, duration, rest, now=0):
+    """
+    Расставляет незакрепленные задачи по коврам не раньше now.
+    Закрепленные (сыгранные или уже начатые) схватки не двигаются, но занимают ковры и участников.
+    Возвращает время окончания последней схватки.
+    """
+    mat_free = {mat: now for mat in range(1, mats + 1)}
+    athlete_free = {}
+    finish = now
+    for task in tasks:
+        if task.fixed and task.start is not None:
+            end = task.start + duration
+            finish = max(finish, end)
+            if task.mat in mat_free:
+                mat_free[task.mat] = max(mat_free[task.mat], end)
+            for athlete in task.athletes:
+                athlete_free[athlete] = max(athlete_free.get(athlete, now), end + rest)
+
+    tails = _chain_lengths(tasks, duration)
+    pending = {}
+    waiting = []
+    for order, task in enumerate(tasks):
+        if task.fixed:
+            continue
+        task.priority = (task.priority[0], -tails[task.key], task.priority[1:], order)
+        task.ready = now
+        pending[task.key] = 0
+        for predecessor in task.predecessors:
+            if predecessor.fixed:
+                if predecessor.start is not None:
+                    task.ready = max(task.ready, predecessor.start + duration + rest)
+            else:
+                pending[task.key] += 1
+    for task in tasks:
+        if not task.fixed and not pending[task.key]:
+            heapq.heappush(waiting, (task.ready, task.priority, task))
+
+    free_mats = [(free_at, mat) for mat, free_at in mat_free.items()]
+    heapq.heapify(free_mats)
+    ready = []
+    while waiting or ready:
+        time, mat = heapq.heappop(free_mats)
+        while True:
+            while waiting and waiting[0][0] <= time:
+                _ready, priority, task = heapq.heappop(waiting)
+                heapq.heappush(ready, (priority, task))
+            if not ready:
+                time = waiting[0][0]
+                continue
+            priority, task = heapq.heappop(ready)
+            # Схватку мог перенести в готовые другой ковер, освободившийся позже,
+            # а участник мог освободиться позже: тогда схватка ждет
+            starts_at = max([task.ready, *(athlete_free.get(athlete, now) for athlete in task.athletes)])
+            if starts_at > time:
+                heapq.heappush(waiting, (starts_at, priority, task))
+                continue
+            break
+
+        task.start, task.mat = time, mat
+        end = time + duration
+        finish = max(finish, end)
+        for athlete in task.athletes:
+            athlete_free[athlete] = end + rest
+        for successor in task.successors:
+            if successor.fixed:
+                continue
+            successor.ready = max(successor.ready, end + rest)
+            pending[successor.key] -= 1
+            if not pending[successor.key]:
+                heapq.heappush(waiting, (successor.ready, successor.priority, successor))
+        heapq.heappush(free_mats, (end, mat))
+    return finish
+
+
+def _participant(profile_id, guest_id):
+    """Один человек может выступать в нескольких категориях — отдых считается по участнику"""
+    if profile_id:
+        return 'profile', profile_id
+    if guest_id:
+        return 'guest', guest_id
+    return None
+
+
+def schedule_tournament(tournament, incremental=False, now=None):
+    """
+    Строит расписание схваток турнира.
+    В инкрементальном режиме сыгранные и начатые схватки остаются на местах,
+    остальные переставляются начиная с текущего момента.
+    Возвращает (количество перенесенных схваток, время окончания последней схватки).
+    """
+    if now is None:
+        now = timezone.now()
+    origin = tournament.tournament_start
+    duration, rest = tournament.fight_duration, tournament.rest_duration
+
+    def minutes(moment):
+        return (moment - origin).total_seconds() / 60
+
+    with transaction.atomic():
+        fights = Fight.objects.filter(bracket__tournament=tournament).select_for_update(of=('self',)).values_list(
+            'id', 'bracket__tournament_category__template__age_from', 'bracket_id', 'number',
+            'red__profile_user', 'red__unregistered_participant',
+            'blue__profile_user', 'blue__unregistered_participant',
+            'next_fight', 'loser_next_fight', 'winner', 'mat', 'scheduled_at',
+        ).order_by('bracket_id', 'number')
+
+        rows, previous = [], {}
+        for (fight_id, age, bracket_id, number, red_profile, red_guest, blue_profile, blue_guest,
+             next_fight, loser_next_fight, winner, mat, scheduled_at) in fights:
+            previous[fight_id] = (mat, scheduled_at)
+            started = incremental and scheduled_at is not None and scheduled_at <= now
+            fixed = winner is not None or started
+            athletes = tuple(filter(None, (_participant(red_profile, red_guest), _participant(blue_profile, blue_guest))))
+            rows.append((
+                fight_id, (UNKNOWN_AGE if age is None else age, bracket_id, number), athletes,
+                next_fight, loser_next_fight, fixed,
+                minutes(scheduled_at) if fixed and scheduled_at else None, mat if fixed else None,
+            ))
+
+        tasks = build_tasks(rows)
+        start = max(minutes(now), 0) if incremental else 0
+        finish = plan(tasks, tournament.mats, duration, rest, now=start)
+
+        moved = []
+        for task in tasks:
+            if task.fixed:
+                continue
+            placement = (task.mat, origin + timedelta(minutes=task.start))
+            if previous[task.key] != placement:
+                moved.append(Fight(id=task.key, mat=placement[0], scheduled_at=placement[1]))
+        Fight.objects.bulk_update(moved, ['mat', 'scheduled_at'], batch_size=100)
+    return len(moved), origin + timedelta(minutes=finish)
@@ -0,0 +1,74 @@
+"""
+Медальный зачет клубов, регионов и спортсменов.
+Строки зачета обновляются инкрементально в транзакции записи результата схватки,
+страницы читают готовые строки; полный пересчет по местам регистраций — rebuild_standings.
+"""
+from collections import Counter, defaultdict
+
+from django.db import connection, transaction
+
+from tournaments.models import MedalStanding, Registration
+from tournaments.models.medal_standing import MEDALS, SCOPE_ATHLETE, SCOPE_CLUB, SCOPE_REGION
+
+
+def _medalists(registrations):
+    return registrations.select_related('profile_user', 'unregistered_participant').prefetch_related(
+        'profile_user__clubs', 'unregistered_participant__clubs'
+    )
+
+
+def _standing_keys(reg):
+    """Строки зачета, которые получают медаль участника: [(scope, по всем турнирам, key, name)]"""
+    participant = reg.profile_user or reg.unregistered_participant
+    clubs = participant.clubs.all()
+    if reg.profile_user_id:
+        athlete = f'profile:{reg.profile_user_id}'
+    else:
+        athlete = f'guest:{reg.unregistered_participant_id}'
+    # Спортсмены ранжируются по сумме турниров, клубы и регионы — в турнире и по всем турнирам
+    keys = [(SCOPE_ATHLETE, True, athlete, reg.participant_name())]
+    for club in clubs:
+        keys += [(SCOPE_CLUB, overall, str(club.id), club.name) for overall in (False, True)]
+    for region in sorted({club.region for club in clubs if club.region}):
+        keys += [(SCOPE_REGION, overall, region, region) for overall in (False, True)]
+    return keys
+
+
+def add_medals(tournament_id, places):
+    """Добавляет медали за места [(id регистрации, место)] в строки зачета"""
+    places = {athlete: place for athlete, place in places if place in MEDALS}
+    # Строки обновляются в одном порядке, чтобы параллельные результаты не давали взаимных блокировок
+    updates = []
+    for reg in _medalists(Registration.objects.filter(pk__in=places)):
+        for scope, overall, key, name in _standing_keys(reg):
+            updates.append((scope, overall, key, places[reg.pk], name))
+    for scope, overall, key, place, name in sorted(updates):
+        MedalStanding.objects.add(place, name, scope=scope, tournament_id=None if overall else tournament_id, key=key)
+
+
+def rebuild_standings():
+    """
+    Пересчитывает весь зачет по местам в регистрациях. Таблица зачета блокируется,
+    поэтому результаты, записанные во время пересчета, учитываются после него.
+    Возвращает количество строк зачета.
+    """
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            cursor.execute(f'LOCK TABLE {MedalStanding._meta.db_table} IN EXCLUSIVE MODE')
+        MedalStanding.objects.all().delete()
+
+        medals, names = defaultdict(Counter), {}
+        medalists = Registration.objects.filter(place__in=list(MEDALS)).order_by('id')
+        for reg in _medalists(medalists).iterator(chunk_size=2000):
+            for scope, overall, key, name in _standing_keys(reg):
+                row = (scope, None if overall else reg.tournament_id, key)
+                medals[row][MEDALS[reg.place]] += 1
+                names[row] = name
+
+        MedalStanding.objects.bulk_create(
+            (MedalStanding(scope=scope, tournament_id=tournament_id, key=key, name=names[scope, tournament_id, key],
+                           **medals[scope, tournament_id, key])
+             for scope, tournament_id, key in medals),
+            batch_size=1000
+        )
+    return len(medals)
@@ -0,0 +1,128 @@
+"""
+Статистика турнира для организатора: несколько GROUP BY-запросов, результат кэшируется
+на турнир в общем кэше воркеров ('shared') и сбрасывается при изменении регистраций и платежей.
+"""
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.db.models.lookups import Exact
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from payments.models import Payment
+from payments.settings import PAYMENT_STATUS_SUCCEEDED
+from tournaments.models import Registration, RegistrationPhase
+from tournaments.models.registration import last_payment
+from tournaments.models.registration_phase import PHASE_CHOICES
+
+# Страховочное время жизни кэша статистики, сек (основной сброс — по сигналам)
+STATS_CACHE_TIMEOUT = 60 * 10
+
+PHASE_NAMES = dict(PHASE_CHOICES)
+
+
+def stats_cache_key(tournament_id):
+    return f'tournament_stats:{tournament_id}'
+
+
+def get_tournament_stats(tournament):
+    """Статистика турнира из кэша; при промахе считается заново"""
+    key = stats_cache_key(tournament.pk)
+    stats = caches['shared'].get(key)
+    if stats is None:
+        stats = build_tournament_stats(tournament)
+        caches['shared'].set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def _grouped(queryset, *fields):
+    """Количество участников и оплативших в разрезе полей"""
+    return list(queryset.values(*fields).annotate(
+        participants=Count('id', distinct=True),
+        paid=Count('id', distinct=True, filter=Exact(last_payment('status'), PAYMENT_STATUS_SUCCEEDED)),
+    ).order_by(*fields))
+
+
+def build_tournament_stats(tournament):
+    registrations = Registration.objects.filter(tournament=tournament).order_by()
+
+    totals = registrations.aggregate(
+        participants=Count('id'),
+        paid=Count('id', filter=Exact(last_payment('status'), PAYMENT_STATUS_SUCCEEDED)),
+    )
+    totals['unpaid'] = totals['participants'] - totals['paid']
+
+    by_category = _grouped(registrations, 'tournament_category', 'tournament_category__template__name')
+    by_weight = _grouped(registrations, 'tournament_category', 'weight_category')
+    by_belt = _grouped(registrations, 'belt_level')
+    by_gender = _grouped(
+        registrations.annotate(gender=Coalesce('profile_user__gender', 'unregistered_participant__gender')),
+        'gender'
+    )
+    # Участник может состоять в нескольких клубах: JOIN дает строку на каждый клуб, и регистрация
+    # учитывается в каждом своем клубе (сумма по клубам может быть больше общего числа).
+    # Внутри клуба повторов нет: счет distinct по id, группы — по id клуба, а не по названию
+    by_club = _grouped(
+        registrations.annotate(
+            club_id=Coalesce('profile_user__clubs__id', 'unregistered_participant__clubs__id'),
+            club=Coalesce('profile_user__clubs__name', 'unregistered_participant__clubs__name'),
+        ),
+        'club_id', 'club'
+    )
+
+    # Период регистрации определяется по дате регистрации (GiST-индекс по period)
+    phase = RegistrationPhase.objects.filter(
+        tournament=OuterRef('registration__tournament'),
+        period__contains=OuterRef('registration__registration_date'),
+    ).order_by('-starts_at').values('phase')[:1]
+    revenue_by_phase = list(
+        Payment.objects.filter(
+            registration__tournament=tournament,
+            status=PAYMENT_STATUS_SUCCEEDED,
+        ).annotate(phase=Subquery(phase)).values('phase').annotate(
+            payments=Count('id'),
+            revenue=Sum('amount'),
+        ).order_by('phase')
+    )
+    for row in revenue_by_phase:
+        row['label'] = PHASE_NAMES.get(row['phase'], 'Вне периодов')
+
+    signups_by_day = list(
+        registrations.annotate(day=TruncDate('registration_date')).values('day').annotate(
+            participants=Count('id')
+        ).order_by('day')
+    )
+
+    return {
+        'totals': totals,
+        'by_category': by_category,
+        'by_weight': by_weight,
+        'by_belt': by_belt,
+        'by_gender': by_gender,
+        'by_club': by_club,
+        'revenue_by_phase': revenue_by_phase,
+        'revenue': sum((row['revenue'] for row in revenue_by_phase), 0),
+        'signups_by_day': signups_by_day,
+    }
+
+
+def invalidate_tournament_stats(tournament_id):
+    # После коммита, чтобы параллельный запрос не закэшировал данные до изменения
+    transaction.on_commit(lambda: caches['shared'].delete(stats_cache_key(tournament_id)))
+
+
+@receiver(post_save, sender=Registration)
+@receiver(post_delete, sender=Registration)
+def registration_changed(sender, instance, **kwargs):
+    invalidate_tournament_stats(instance.tournament_id)
+
+
+@receiver(post_save, sender=Payment)
+@receiver(post_delete, sender=Payment)
+def payment_changed(sender, instance, **kwargs):
+    tournament_id = Registration.objects.filter(pk=instance.registration_id).values_list(
+        'tournament_id', flat=True
+    ).first()
+    if tournament_id is not None:
+        invalidate_tournament_stats(tournament_id)
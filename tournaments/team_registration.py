@@ -0,0 +1,147 @@
+"""
+Командная регистрация: тренер записывает спортсменов своего состава одним запросом.
+Все строки проверяются за один проход по закэшированным сведениям о категориях;
+при ошибках ничего не сохраняется и возвращаются ошибки по строкам. Регистрации
+вставляются одним bulk_create, счетчики меняются одним UPDATE на весовую категорию.
+"""
+from datetime import date
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+from psycopg2.errorcodes import UNIQUE_VIOLATION
+
+from tournaments.categories import gender_error, tournament_categories
+from tournaments.models import Registration
+from tournaments.models.registration import DUPLICATE_REGISTRATION_MESSAGE
+from tournaments.stats import invalidate_tournament_stats
+
+
+class RosterEntry:
+    """Спортсмен из состава тренера"""
+    __slots__ = ('key', 'name', 'birth_date', 'gender', 'profile_id', 'guest_id')
+
+    def __init__(self, key, name, birth_date, gender, profile_id=None, guest_id=None):
+        self.key = key
+        self.name = name
+        self.birth_date = birth_date
+        self.gender = gender
+        self.profile_id = profile_id
+        self.guest_id = guest_id
+
+
+def coach_roster(coach):
+    """Состав тренера: {'profile:<id>' | 'guest:<id>': RosterEntry}, по фамилии"""
+    fields = ('id', 'last_name', 'first_name', 'surname', 'birth_date', 'gender')
+    entries = [
+        RosterEntry(f'profile:{profile.id}', profile.get_full_name(), profile.birth_date, profile.gender,
+                    profile_id=profile.id)
+        for profile in coach.participants.only(*fields)
+    ] + [
+        RosterEntry(f'guest:{guest.id}', str(guest), guest.birth_date, guest.gender, guest_id=guest.id)
+        for guest in coach.unregistered_participants.only(*fields)
+    ]
+    entries.sort(key=lambda entry: entry.name)
+    return {entry.key: entry for entry in entries}
+
+
+def _age(birth_date):
+    today = date.today()
+    return today.year - birth_date.year - ((today.month, today.day) < (birth_date.month, birth_date.day))
+
+
+def _row_errors(row, entry, categories):
+    if entry is None:
+        return ["Спортсмена нет в составе тренера"]
+    meta = categories.get(row['tournament_category'])
+    if meta is None:
+        return ["Выберите категорию турнира"]
+    errors = []
+    if row['weight_category'] not in meta.weights:
+        errors.append(f"Вес {row['weight_category'] or '—'} кг не доступен в категории. "
+                      f"Доступные веса: {', '.join(map(str, meta.weights))} кг")
+    if row['belt_level'] not in meta.belts:
+        errors.append(f"Пояс {row['belt_level'] or '—'} не доступен в категории. "
+                      f"Доступные пояса: {', '.join(meta.belts)}")
+    if entry.birth_date:
+        age = _age(entry.birth_date)
+        if meta.age_from and age < meta.age_from:
+            errors.append(f"Возраст {age} лет, минимальный для категории — {meta.age_from}")
+        if meta.age_to and age > meta.age_to:
+            errors.append(f"Возраст {age} лет, максимальный для категории — {meta.age_to}")
+    error = gender_error(meta, entry.gender)
+    if error:
+        errors.append(error)
+    return errors
+
+
+def register_team(tournament, coach, rows):
+    """
+    Регистрирует спортсменов тренера. rows — список словарей participant (ключ состава),
+    tournament_category (id), weight_category, belt_level.
+    Возвращает (созданные регистрации, {номер строки: [ошибки]}); при ошибках ничего не создается.
+    """
+    roster = coach_roster(coach)
+    categories = tournament_categories(tournament)
+    errors = {}
+    for index, row in enumerate(rows):
+        row_errors = _row_errors(row, roster.get(row['participant']), categories)
+        if row_errors:
+            errors[index] = row_errors
+
+    # Повторы: внутри заявки и уже существующие регистрации — одним запросом на всю заявку
+    seen = {}
+    for index, row in enumerate(rows):
+        key = (row['participant'], row['tournament_category'])
+        if key in seen:
+            errors.setdefault(index, []).append("Спортсмен уже указан в этой категории выше")
+        seen.setdefault(key, index)
+    entries = [roster[row['participant']] for row in rows if row['participant'] in roster]
+    existing = Registration.objects.filter(tournament=tournament).filter(
+        Q(profile_user__in=[entry.profile_id for entry in entries if entry.profile_id])
+        | Q(unregistered_participant__in=[entry.guest_id for entry in entries if entry.guest_id])
+    ).values_list('profile_user', 'unregistered_participant', 'tournament_category')
+    for profile_id, guest_id, category_id in existing:
+        key = (f'profile:{profile_id}' if profile_id else f'guest:{guest_id}', category_id)
+        if key in seen:
+            errors.setdefault(seen[key], []).append(DUPLICATE_REGISTRATION_MESSAGE)
+    if errors or not rows:
+        return [], errors
+
+    registrations = []
+    for row in rows:
+        entry = roster[row['participant']]
+        registrations.append(Registration(
+            tournament=tournament, tournament_category_id=row['tournament_category'],
+            weight_category=row['weight_category'], belt_level=row['belt_level'],
+            profile_user_id=entry.profile_id, unregistered_participant_id=entry.guest_id,
+        ))
+    try:
+        with transaction.atomic():
+            Registration.objects.bulk_create(registrations)
+            Registration.add_counters(
+                tournament.pk,
+                [(row['tournament_category'], row['weight_category']) for row in rows],
+                limit=tournament.max_participants
+            )
+    except IntegrityError as e:
+        # Параллельная регистрация того же спортсмена успела раньше
+        if getattr(e.__cause__, 'pgcode', None) == UNIQUE_VIOLATION:
+            raise ValidationError(DUPLICATE_REGISTRATION_MESSAGE, code='duplicate_registration')
+        raise
+    invalidate_tournament_stats(tournament.pk)
+    return registrations, {}
+
+
+def parse_rows(data):
+    """Строки заявки из POST-формы: отмеченные спортсмены и поля category-/weight-/belt-<ключ>"""
+    rows = []
+    for key in data.getlist('participant'):
+        category, weight = data.get(f'category-{key}', ''), data.get(f'weight-{key}', '')
+        rows.append({
+            'participant': key,
+            'tournament_category': int(category) if category.isdigit() else None,
+            'weight_category': int(weight) if weight.isdigit() else None,
+            'belt_level': data.get(f'belt-{key}', ''),
+        })
+    return rows
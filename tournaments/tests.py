@@ -1,3 +1,1405 @@
-from django.test import TestCase
+import csv
+import io
+import json
+import threading
+import zipfile
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest.mock import patch
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth.models import User
+from django.core.cache import cache, caches
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from accounts.merge import merge_duplicate_participants
+from accounts.models import Club, Coach, Profile_organizer, Profile_user, UnregisteredParticipant
+from payments.models import Payment
+from tournaments.models import (
+    Bracket,
+    CategoryCounter,
+    Fight,
+    FightingStyle,
+    MedalStanding,
+    Registration,
+    ResultEvent,
+    Tournament,
+    TournamentCategory,
+    TournamentCategoryTemplate,
+)
+from tournaments.models.registration_phase import (
+    PHASE_CLOSED,
+    PHASE_EARLY,
+    PHASE_LATE,
+    PHASE_NOT_STARTED,
+    PHASE_REGULAR,
+)
+from tournaments.brackets import generate_brackets, meeting_round, seed_order
+from tournaments.live import broadcaster
+from tournaments.models.fight import METHOD_POINTS
+from tournaments.results import record_result
+from tournaments.standings import rebuild_standings
+from tournaments.counters import reconcile_participant_counters
+from tournaments.filters import TournamentFilter
+from tournaments.forms import TournamentRegistrationForm
+from tournaments.scheduling import schedule_tournament
+from tournaments.pagination import keyset_page
+
+
+def make_tournament(title, base, early=None, regular=0, late=None, deadline=30, **kwargs):
+    """Создает турнир; даты периодов задаются смещением в днях от base"""
+    def at(days):
+        return base + timedelta(days=days) if days is not None else None
+
+    kwargs.setdefault('location', 'Москва')
+    return Tournament.objects.create(
+        title=title,
+        early_registration_start=at(early),
+        early_registration_price=Decimal('1000.00') if early is not None else None,
+        regular_registration_start=at(regular),
+        regular_registration_price=Decimal('2000.00'),
+        late_registration_start=at(late),
+        late_registration_price=Decimal('3000.00') if late is not None else None,
+        registration_deadline=at(deadline),
+        tournament_start=at(deadline + 5),
+        tournament_end=at(deadline + 6),
+        **kwargs
+    )
+
+
+def make_category(code='M1', weights=(60, 70), style=None):
+    """Создает категорию турнира по новому шаблону"""
+    template = TournamentCategoryTemplate.objects.create(
+        fighting_style=style or FightingStyle.objects.get_or_create(name='BJJ')[0],
+        category_type='Взрослые', code=code, name=f'Мужчины {code}', gender='М', age_from=18, age_to=35
+    )
+    return TournamentCategory.objects.create(template=template, weight_categories=list(weights), belt_levels=['Белый'])
+
+
+def make_guest(number, **kwargs):
+    """Создает участника без аккаунта"""
+    kwargs.setdefault('birth_date', date(1995, 1, 1))
+    kwargs.setdefault('first_name', f'Участник{number}')
+    kwargs.setdefault('last_name', 'Гостев')
+    kwargs.setdefault('phone', '+70000000000')
+    kwargs.setdefault('email', f'guest{number}@example.com')
+    return UnregisteredParticipant.objects.create(surname='', gender='М', **kwargs)
+
+
+class RegistrationPhaseTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.base = timezone.now().replace(microsecond=0)
+        make_tournament('Только обычная', cls.base, regular=0, deadline=30)
+        make_tournament('Ранняя и обычная', cls.base, early=-10, regular=0, deadline=30)
+        make_tournament('Все периоды', cls.base, early=-10, regular=0, late=20, deadline=30)
+        make_tournament('Только поздняя', cls.base, regular=0, late=20, deadline=30)
+        make_tournament('Без обычной', cls.base, early=-10, regular=None, deadline=30)
+
+    def assertPhase(self, title, days, phase, price=None, ends_in_days=None):
+        now = self.base + timedelta(days=days)
+        tournament = Tournament.objects.with_registration_phase(now).get(title=title)
+        ends_at = self.base + timedelta(days=ends_in_days) if ends_in_days is not None else None
+        self.assertEqual(
+            (tournament.current_phase, tournament.current_price, tournament.phase_ends_at),
+            (phase, Decimal(price) if price else None, ends_at),
+            f"{title}, день {days}"
+        )
+
+    def test_phase_schedule(self):
+        self.assertPhase('Только обычная', -5, PHASE_NOT_STARTED, ends_in_days=0)
+        self.assertPhase('Только обычная', 0, PHASE_REGULAR, '2000.00', 30)
+        self.assertPhase('Только обычная', 30, PHASE_REGULAR, '2000.00', 30)
+        self.assertPhase('Только обычная', 35, PHASE_CLOSED)
+        self.assertPhase('Ранняя и обычная', -20, PHASE_NOT_STARTED, ends_in_days=-10)
+        self.assertPhase('Ранняя и обычная', -10, PHASE_EARLY, '1000.00', 0)
+        self.assertPhase('Ранняя и обычная', 0, PHASE_REGULAR, '2000.00', 30)
+        self.assertPhase('Все периоды', 5, PHASE_REGULAR, '2000.00', 20)
+        self.assertPhase('Все периоды', 25, PHASE_LATE, '3000.00', 30)
+        self.assertPhase('Только поздняя', 5, PHASE_REGULAR, '2000.00', 20)
+        self.assertPhase('Только поздняя', 20, PHASE_LATE, '3000.00', 30)
+        self.assertPhase('Без обычной', -5, PHASE_EARLY, '1000.00', 30)
+
+    def test_python_lookup_matches_annotation(self):
+        tournaments = list(Tournament.objects.all())
+        for days in (-20, -10, -5, 0, 5, 20, 25, 30, 35):
+            now = self.base + timedelta(days=days)
+            annotated = {
+                tournament.pk: (tournament.current_phase, tournament.current_price, tournament.phase_ends_at)
+                for tournament in Tournament.objects.with_registration_phase(now)
+            }
+            with self.assertNumQueries(0):
+                for tournament in tournaments:
+                    self.assertEqual(tournament.get_registration_phase(now), annotated[tournament.pk],
+                                     f"{tournament.title}, день {days}")
+
+    def test_unsaved_tournament(self):
+        tournament = Tournament(
+            title='Черновик',
+            regular_registration_start=self.base - timedelta(days=1),
+            regular_registration_price=Decimal('2000.00'),
+            registration_deadline=self.base + timedelta(days=30),
+        )
+        with self.assertNumQueries(0):
+            self.assertTrue(tournament.is_registration_open())
+            self.assertEqual(tournament.get_current_registration_price(), Decimal('2000.00'))
+            self.assertTrue(tournament.get_current_registration_info().startswith('Регистрация открыта до'))
+
+    def test_methods_read_annotations(self):
+        now = self.base + timedelta(days=25)
+        tournament = Tournament.objects.with_registration_phase(now).get(title='Все периоды')
+        self.assertEqual(tournament.current_phase, PHASE_LATE)
+        with self.assertNumQueries(0):
+            self.assertTrue(tournament.is_registration_open())
+            self.assertEqual(tournament.get_current_registration_price(), Decimal('3000.00'))
+            self.assertTrue(tournament.get_current_registration_info().startswith('Поздняя регистрация'))
+
+    def test_registration_open_filter(self):
+        now = self.base + timedelta(days=-5)
+        open_titles = set(Tournament.objects.registration_open(now).values_list('title', flat=True))
+        self.assertEqual(open_titles, {'Ранняя и обычная', 'Все периоды', 'Без обычной'})
+        cheap = Tournament.objects.registration_open(self.base + timedelta(days=5), max_price=2000)
+        self.assertEqual(cheap.count(), 5)
+        cheap = Tournament.objects.registration_open(now, max_price=500)
+        self.assertFalse(cheap.exists())
+
+    def test_schedule_follows_tournament_edits(self):
+        tournament = Tournament.objects.get(title='Только обычная')
+        tournament.late_registration_start = self.base + timedelta(days=10)
+        tournament.late_registration_price = Decimal('5000.00')
+        tournament.save()
+        self.assertEqual(
+            list(tournament.registration_phases.values_list('phase', flat=True)),
+            [PHASE_REGULAR, PHASE_LATE]
+        )
+        self.assertPhase('Только обычная', 15, PHASE_LATE, '5000.00', 30)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.base = timezone.now().replace(microsecond=0)
+        for i in range(7):
+            make_tournament(f'Турнир {i}', cls.base)
+        # Часть турниров с одинаковым created_at, чтобы проверить порядок по id
+        Tournament.objects.filter(title__in=['Турнир 2', 'Турнир 3', 'Турнир 4']).update(created_at=cls.base)
+
+    def test_pages_cover_all_rows_in_order(self):
+        expected = list(Tournament.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(Tournament.objects.all(), cursor, page_size=3)
+            seen.extend(tournament.id for tournament in page)
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_api_returns_next_cursor(self):
+        response = self.client.get(reverse('tournaments:tournaments_api'))
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(len(data['results']), 7)
+        self.assertIsNone(data['next_cursor'])
+        self.assertEqual(data['results'][0]['current_phase'], PHASE_REGULAR)
+
+    def test_api_rejects_broken_cursor(self):
+        response = self.client.get(reverse('tournaments:tournaments_api'), {'cursor': 'broken'})
+        self.assertEqual(response.status_code, 400)
+
+
+class TournamentListingQueriesTests(TestCase):
+    def setUp(self):
+        self.base = timezone.now().replace(microsecond=0)
+        self.style = FightingStyle.objects.create(name='Грэпплинг')
+
+    def add_tournaments(self, count):
+        for i in range(Tournament.objects.count(), Tournament.objects.count() + count):
+            tournament = make_tournament(f'Турнир {i}', self.base, description='Длинное описание')
+            tournament.fighting_styles.add(self.style)
+
+    def test_index_query_count_does_not_depend_on_cards(self):
+        # Валидатор условного запроса + турниры + виды борьбы
+        self.add_tournaments(2)
+        with self.assertNumQueries(3):
+            self.client.get(reverse('tournaments:index'))
+
+        self.add_tournaments(8)
+        with self.assertNumQueries(3):
+            response = self.client.get(reverse('tournaments:index'))
+        self.assertContains(response, 'Грэпплинг', count=10)
+
+    def test_cards_do_not_load_description(self):
+        self.add_tournaments(1)
+        tournament = Tournament.objects.for_cards().get()
+        self.assertIn('description', tournament.get_deferred_fields())
+
+
+class CardCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.base = timezone.now().replace(microsecond=0)
+
+    def test_timeout_ends_at_phase_boundary(self):
+        tournament = make_tournament('Ранняя', self.base, early=-1, regular=0.25, deadline=30)
+        timeout = tournament.get_card_cache_timeout()
+        self.assertAlmostEqual(timeout, timedelta(hours=6).total_seconds(), delta=5)
+
+    def test_card_is_rendered_from_cache_until_update(self):
+        tournament = make_tournament('Кэш', self.base)
+        self.client.get(reverse('tournaments:index'))
+        Tournament.objects.filter(pk=tournament.pk).update(title='Новое название')
+        self.assertContains(self.client.get(reverse('tournaments:index')), 'Кэш')
+
+        tournament.refresh_from_db()
+        tournament.save()
+        self.assertContains(self.client.get(reverse('tournaments:index')), 'Новое название')
+
+    def test_card_follows_fighting_styles(self):
+        tournament = make_tournament('Стили', self.base)
+        style = FightingStyle.objects.create(name='Самбо')
+        self.client.get(reverse('tournaments:index'))
+        tournament.fighting_styles.add(style)
+        self.assertContains(self.client.get(reverse('tournaments:index')), 'Самбо')
+
+        style.name = 'Боевое самбо'
+        style.save()
+        self.assertContains(self.client.get(reverse('tournaments:index')), 'Боевое самбо')
+        style.tournament_set.clear()
+        self.assertNotContains(self.client.get(reverse('tournaments:index')), 'Боевое самбо')
+
+
+class TournamentSearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        base = timezone.now().replace(microsecond=0)
+        cls.bjj = FightingStyle.objects.create(name='BJJ')
+        cls.grappling = FightingStyle.objects.create(name='Грэпплинг')
+        kazan = make_tournament('Кубок Казани', base, location='Казань, Дворец единоборств', newbies=True)
+        kazan.fighting_styles.add(cls.bjj, cls.grappling)
+        moscow = make_tournament('Открытый чемпионат', base, early=-5, regular=5, location='Москва',
+                                 description='Соревнования по борьбе для взрослых')
+        moscow.fighting_styles.add(cls.grappling)
+
+    def test_search_uses_russian_stemming(self):
+        response = self.client.get(reverse('tournaments:search_api'), {'q': 'соревнование'})
+        titles = [tournament['title'] for tournament in response.json()['results']]
+        self.assertEqual(titles, ['Открытый чемпионат'])
+
+    def test_filters_and_facets(self):
+        response = self.client.get(reverse('tournaments:search_api'), {'style': self.grappling.id, 'price_max': 1500})
+        data = response.json()
+        self.assertEqual([tournament['title'] for tournament in data['results']], ['Открытый чемпионат'])
+        self.assertEqual(data['facets']['total'], 1)
+        phases = {phase['value']: phase['count'] for phase in data['facets']['phases']}
+        self.assertEqual(phases[PHASE_EARLY], 1)
+
+        response = self.client.get(reverse('tournaments:search_api'), {'q': 'Казань'})
+        facets = response.json()['facets']
+        styles = {style['name']: style['count'] for style in facets['styles']}
+        self.assertEqual(styles, {'BJJ': 1, 'Грэпплинг': 1})
+        self.assertEqual(facets['newbies'], 1)
+
+    def test_phase_filter_and_facets_use_phase_schedule(self):
+        base = timezone.now().replace(microsecond=0)
+        make_tournament('Будущий', base, regular=10, deadline=30)
+        make_tournament('Прошедший', base, regular=-30, deadline=-10)
+        url = reverse('tournaments:search_api')
+        expected = {PHASE_EARLY: ['Открытый чемпионат'], PHASE_REGULAR: ['Кубок Казани'],
+                    PHASE_LATE: [], PHASE_NOT_STARTED: ['Будущий'], PHASE_CLOSED: ['Прошедший']}
+        for phase, titles in expected.items():
+            results = self.client.get(url, {'phase': phase}).json()['results']
+            self.assertEqual([tournament['title'] for tournament in results], titles, phase)
+
+        # Фасеты: итоги, периоды и виды борьбы — по запросу на каждый, без аннотаций фаз
+        tournament_filter, styles = TournamentFilter({}, queryset=Tournament.objects.all()), list(FightingStyle.objects.all())
+        with self.assertNumQueries(3):
+            facets = tournament_filter.facets(styles)
+        self.assertEqual({phase['value']: phase['count'] for phase in facets['phases']},
+                         {phase: len(titles) for phase, titles in expected.items()})
+        self.assertEqual(facets['total'], 4)
+        self.assertEqual({style['name']: style['count'] for style in facets['styles']}, {'BJJ': 1, 'Грэпплинг': 2})
+        self.assertEqual(self.client.get(url, {'price_min': 1500}).json()['facets']['total'], 1)
+
+    def test_search_page_renders(self):
+        response = self.client.get(reverse('tournaments:search'), {'q': 'кубок'})
+        self.assertContains(response, 'Кубок Казани')
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.base = timezone.now().replace(microsecond=0)
+        self.tournament = make_tournament('Условный', self.base)
+
+    def assertNotModified(self, url, response):
+        with self.assertNumQueries(1):
+            repeat = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(repeat.status_code, 304)
+
+    def test_listing_and_detail_return_304(self):
+        for url in (reverse('tournaments:index'), reverse('tournaments:latest'),
+                    reverse('tournaments:tournament_detail', kwargs={'pk': self.tournament.pk})):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertIn('no-cache', response['Cache-Control'])
+            self.assertNotModified(url, response)
+
+    def test_if_modified_since_does_not_hide_changes(self):
+        # Удаление турнира не меняет ни одной даты: клиент с одним If-Modified-Since должен получить страницу
+        url = reverse('tournaments:index')
+        self.assertFalse(self.client.get(url).has_header('Last-Modified'))
+        self.tournament.delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE='Fri, 01 Jan 2100 00:00:00 GMT')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Условный')
+
+    def test_etag_changes_with_tournament_and_phase(self):
+        url = reverse('tournaments:index')
+        etag = self.client.get(url)['ETag']
+
+        self.tournament.title = 'Новое название'
+        self.tournament.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+        # Наступление следующего периода регистрации меняет карточку без правки турнира
+        etag = response['ETag']
+        self.tournament.registration_phases.update(starts_at=self.base - timedelta(days=1))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_category_info_etag(self):
+        template = TournamentCategoryTemplate.objects.create(
+            fighting_style=FightingStyle.objects.create(name='BJJ'), category_type='Взрослые',
+            code='M1', name='Мужчины', gender='М', age_from=18, age_to=35
+        )
+        category = TournamentCategory.objects.create(template=template, weight_categories=[60, 70], belt_levels=['Белый'])
+        url = reverse('tournaments:get_category_info', kwargs={'category_id': category.pk})
+        response = self.client.get(url)
+        self.assertNotModified(url, response)
+
+
+class TournamentDetailQueriesTests(TestCase):
+    def setUp(self):
+        self.base = timezone.now().replace(microsecond=0)
+        organizer = Profile_organizer.objects.create(
+            user=User.objects.create_user('organizer', 'org@example.com'),
+            last_name='Иванов', first_name='Иван', company_phone='+70000000000'
+        )
+        self.tournament = make_tournament('Детальный', self.base, early=-5, regular=5, profile_organizer=organizer)
+        self.style = FightingStyle.objects.create(name='Грэпплинг')
+        self.tournament.fighting_styles.add(self.style, FightingStyle.objects.create(name='BJJ'))
+
+    def add_categories(self, count):
+        start = TournamentCategory.objects.count()
+        for i in range(start, start + count):
+            template = TournamentCategoryTemplate.objects.create(
+                fighting_style=self.style, category_type='Взрослые', code=f'M{i}',
+                name=f'Категория {i}', gender='М', age_from=18, age_to=35
+            )
+            self.tournament.tournament_categories.add(TournamentCategory.objects.create(template=template))
+
+    def test_query_count_does_not_depend_on_categories(self):
+        url = reverse('tournaments:tournament_detail', kwargs={'pk': self.tournament.pk})
+        # Валидатор условного запроса + турнир с организатором + категории
+        self.add_categories(1)
+        with self.assertNumQueries(3):
+            self.client.get(url)
+
+        self.add_categories(5)
+        with self.assertNumQueries(3):
+            response = self.client.get(url)
+        self.assertContains(response, 'Иванов Иван')
+        self.assertContains(response, 'BJJ\nГрэпплинг')
+        self.assertContains(response, 'Категория 5')
+        self.assertContains(response, 'Ранняя регистрация открыта до')
+        self.assertContains(response, '1000,00 ₽')
+
+
+class ParticipantCounterTests(TestCase):
+    def setUp(self):
+        self.tournament = make_tournament('Счетчики', timezone.now())
+        self.category = make_category()
+        self.tournament.tournament_categories.add(self.category)
+
+    def register(self, number, weight=60):
+        return Registration.objects.create(
+            tournament=self.tournament, tournament_category=self.category,
+            weight_category=weight, belt_level='Белый', unregistered_participant=make_guest(number)
+        )
+
+    def assertCounts(self, total, by_weight):
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.get_current_participants_count(), total)
+        counts = {weight: n for (_category, weight), n in self.tournament.get_category_participants_counts().items() if n}
+        self.assertEqual(counts, by_weight)
+
+    def test_counters_follow_registrations(self):
+        first = self.register(1)
+        self.register(2)
+        third = self.register(3, weight=70)
+        self.assertCounts(3, {60: 2, 70: 1})
+
+        first.weight_category = 70
+        first.save()
+        self.assertCounts(3, {60: 1, 70: 2})
+
+        third.delete()
+        # Каскадное удаление через участника тоже уменьшает счетчики
+        first.unregistered_participant.delete()
+        self.assertCounts(1, {60: 1})
+
+    def test_count_reads_counter_row(self):
+        self.register(1)
+        tournament = Tournament.objects.select_related('participant_counter').get(pk=self.tournament.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(tournament.get_current_participants_count(), 1)
+
+    def test_delete_with_drifted_counter(self):
+        first = self.register(1)
+        # Перенос через QuerySet.update() минует счетчики: строка веса 70 остается нулевой
+        Registration.objects.filter(pk=first.pk).update(weight_category=70)
+        CategoryCounter.objects.create(
+            tournament=self.tournament, tournament_category=self.category, weight_category=70
+        )
+        self.tournament.participant_counter.participants = 0
+        self.tournament.participant_counter.save()
+
+        Registration.objects.get(pk=first.pk).delete()
+        self.assertFalse(Registration.objects.exists())
+        # Строку веса 60 update() не уменьшил — это расхождение исправляет сверка
+        self.assertCounts(0, {60: 1})
+
+    def test_reconcile_fixes_drift(self):
+        self.register(1)
+        self.register(2, weight=70)
+        CategoryCounter.objects.filter(weight_category=60).update(participants=5)
+        CategoryCounter.objects.filter(weight_category=70).delete()
+        self.tournament.participant_counter.delete()
+
+        self.assertEqual(reconcile_participant_counters(self.tournament), 3)
+        self.assertCounts(2, {60: 1, 70: 1})
+        self.assertEqual(reconcile_participant_counters(self.tournament), 0)
+
+
+class ParticipantsPageQueriesTests(TestCase):
+    def setUp(self):
+        self.tournament = make_tournament('Участники', timezone.now())
+        self.category = make_category()
+        self.tournament.tournament_categories.add(self.category)
+        self.number = 0
+
+    def add_registrations(self, count):
+        for _i in range(count):
+            self.number += 1
+            registration = Registration.objects.create(
+                tournament=self.tournament, tournament_category=self.category,
+                weight_category=60, belt_level='Белый', unregistered_participant=make_guest(self.number)
+            )
+            for status in ('canceled', 'succeeded'):
+                Payment.objects.create(
+                    registration=registration, payment_id=f'{self.number}-{status}',
+                    amount=Decimal('2000.00'), status=status
+                )
+
+    def test_last_payment_annotation(self):
+        self.add_registrations(1)
+        registration = Registration.objects.with_last_payment().get()
+        self.assertEqual(registration.last_payment_status, 'succeeded')
+        self.assertEqual(registration.last_payment_date, registration.payments.first().created_at)
+
+    def test_query_count_does_not_depend_on_participants(self):
+        url = reverse('tournaments:view_participants', kwargs={'pk': self.tournament.pk})
+        self.add_registrations(2)
+        with self.assertNumQueries(4):
+            self.client.get(url)
+
+        self.add_registrations(8)
+        with self.assertNumQueries(4):
+            response = self.client.get(url)
+        self.assertContains(response, 'guest10@example.com')
+
+    def test_counts_grouped_in_database(self):
+        self.add_registrations(3)
+        Registration.objects.filter(unregistered_participant__email='guest1@example.com').update(weight_category=77)
+        Payment.objects.filter(payment_id='2-succeeded').delete()
+
+        response = self.client.get(reverse('tournaments:view_participants', kwargs={'pk': self.tournament.pk}))
+        [category] = response.context['categories_list']
+        self.assertEqual(
+            [(w['weight'], w['count'], w['paid_count'], w['custom']) for w in category['weight_categories']],
+            [(60, 2, 1, False), (77, 1, 1, True)]
+        )
+        self.assertEqual((category['total_participants'], category['total_paid']), (3, 2))
+
+
+class AllParticipantsPageTests(TestCase):
+    def setUp(self):
+        base = timezone.now()
+        self.category = make_category()
+        self.active = make_tournament('Будущий', base)
+        self.completed = make_tournament('Прошедший', base, deadline=-30)
+        for number, tournament in enumerate([self.active, self.active, self.active, self.completed]):
+            registration = Registration.objects.create(
+                tournament=tournament, tournament_category=self.category,
+                weight_category=60, belt_level='Белый', unregistered_participant=make_guest(number)
+            )
+            if number == 0:
+                Payment.objects.create(registration=registration, payment_id='p0', amount=Decimal('2000.00'),
+                                       status='succeeded')
+
+    def test_overview_has_only_totals(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tournaments:view_all_participants'))
+        tournaments = {t.title: t for t in response.context['tournaments_list']}
+        self.assertEqual(
+            (tournaments['Будущий'].total_participants, tournaments['Будущий'].paid_participants), (3, 1)
+        )
+        self.assertTrue(tournaments['Прошедший'].completed)
+        self.assertNotContains(response, 'guest0@example.com')
+
+    def test_rows_are_paginated(self):
+        url = reverse('tournaments:participants_rows', kwargs={'pk': self.active.pk})
+        with patch('tournaments.views.PARTICIPANTS_PAGE_SIZE', 2):
+            first = self.client.get(url)
+            second = self.client.get(url, {'page': 2})
+        self.assertEqual(len(first.context['participants']), 2)
+        self.assertEqual(first.context['participants'][0]['category'], 'Мужчины M1')
+        self.assertContains(first, '?page=2')
+        self.assertEqual(len(second.context['participants']), 1)
+        self.assertNotContains(second, 'load-more-rows')
+
+
+class ParticipantsExportTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('organizer', 'org@example.com', 'password')
+        organizer = Profile_organizer.objects.create(user=self.user)
+        self.tournament = make_tournament('Выгрузка', timezone.now(), profile_organizer=organizer)
+        category = make_category()
+        for number, (weight, belt) in enumerate([(70, 'Белый'), (60, 'Синий'), (60, 'Белый')]):
+            Registration.objects.create(
+                tournament=self.tournament, tournament_category=category,
+                weight_category=weight, belt_level=belt, unregistered_participant=make_guest(number)
+            )
+
+    def export(self, export_format):
+        url = reverse(f'tournaments:export_participants_{export_format}', kwargs={'pk': self.tournament.pk})
+        return self.client.get(url)
+
+    def test_only_organizer_can_export(self):
+        self.assertEqual(self.export('csv').status_code, 302)
+        User.objects.create_user('other', 'other@example.com', 'password')
+        self.client.login(username='other', password='password')
+        self.assertEqual(self.export('csv').status_code, 403)
+
+    def test_csv_is_streamed_grouped_by_weight_and_belt(self):
+        self.client.login(username='organizer', password='password')
+        response = self.export('csv')
+        self.assertTrue(response.streaming)
+        rows = list(csv.reader(b''.join(response.streaming_content).decode('utf-8-sig').splitlines()))
+        self.assertEqual(rows[0][:3], ['Категория', 'Вес, кг', 'Пояс'])
+        self.assertEqual([(row[1], row[2], row[5]) for row in rows[1:]], [
+            ('60', 'Белый', 'guest2@example.com'),
+            ('60', 'Синий', 'guest1@example.com'),
+            ('70', 'Белый', 'guest0@example.com'),
+        ])
+        self.assertEqual(rows[1][8], 'Не оплачено')
+
+    def test_xlsx_is_valid_workbook(self):
+        self.client.login(username='organizer', password='password')
+        response = self.export('xlsx')
+        archive = zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content)))
+        self.assertIsNone(archive.testzip())
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode()
+        self.assertEqual(sheet.count('<row>'), 4)
+        self.assertIn('guest2@example.com', sheet)
+
+
+class TournamentStatsTests(TestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        self.user = User.objects.create_user('organizer', 'org@example.com', 'password')
+        organizer = Profile_organizer.objects.create(user=self.user)
+        self.tournament = make_tournament('Статистика', timezone.now(), early=-10, regular=5,
+                                          profile_organizer=organizer)
+        category = make_category()
+        self.registrations = [
+            Registration.objects.create(
+                tournament=self.tournament, tournament_category=category, weight_category=weight,
+                belt_level=belt, unregistered_participant=make_guest(number)
+            )
+            for number, (weight, belt) in enumerate([(60, 'Белый'), (60, 'Синий'), (70, 'Белый')])
+        ]
+        Payment.objects.create(registration=self.registrations[0], payment_id='p0',
+                               amount=Decimal('1000.00'), status='succeeded')
+        self.url = reverse('tournaments:tournament_stats_api', kwargs={'pk': self.tournament.pk})
+        self.client.login(username='organizer', password='password')
+
+    def test_grouped_numbers(self):
+        stats = self.client.get(self.url).json()
+        self.assertEqual(stats['totals'], {'participants': 3, 'paid': 1, 'unpaid': 2})
+        self.assertEqual([(row['weight_category'], row['participants'], row['paid']) for row in stats['by_weight']],
+                         [(60, 2, 1), (70, 1, 0)])
+        self.assertEqual({row['belt_level']: row['participants'] for row in stats['by_belt']}, {'Белый': 2, 'Синий': 1})
+        self.assertEqual(stats['by_gender'], [{'gender': 'М', 'participants': 3, 'paid': 1}])
+        self.assertEqual(stats['by_club'], [{'club_id': None, 'club': None, 'participants': 3, 'paid': 1}])
+        self.assertEqual(stats['revenue_by_phase'],
+                         [{'phase': PHASE_EARLY, 'payments': 1, 'revenue': '1000.00', 'label': 'Ранняя регистрация'}])
+        self.assertEqual(sum(row['participants'] for row in stats['signups_by_day']), 3)
+
+    def test_cached_until_payment_changes(self):
+        self.client.get(self.url)
+        # Сессия, пользователь, турнир, проверка организатора и чтение общего кэша
+        with self.assertNumQueries(5):
+            self.client.get(self.url)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Payment.objects.create(registration=self.registrations[1], payment_id='p1',
+                                   amount=Decimal('1000.00'), status='succeeded')
+        self.assertEqual(self.client.get(self.url).json()['totals']['paid'], 2)
+
+    def test_participant_counted_once_per_club(self):
+        coach = Coach.objects.create(user=User.objects.create_user('coach', 'coach@example.com', 'password'))
+        clubs = [Club.objects.create(name='Клуб', location=city, coach=coach) for city in ('Москва', 'Казань')]
+        guest = self.registrations[0].unregistered_participant
+        guest.clubs.add(*clubs)
+        by_club = self.client.get(self.url).json()['by_club']
+        self.assertEqual([(row['club_id'], row['participants'], row['paid']) for row in by_club],
+                         [(clubs[0].pk, 1, 1), (clubs[1].pk, 1, 1), (None, 2, 0)])
+
+    def test_dashboard_page_renders(self):
+        response = self.client.get(reverse('tournaments:tournament_stats', kwargs={'pk': self.tournament.pk}))
+        self.assertContains(response, 'Ранняя регистрация')
+
+
+class CheckInTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('organizer', 'org@example.com', 'password')
+        organizer = Profile_organizer.objects.create(user=self.user)
+        self.tournament = make_tournament('Регистрация на месте', timezone.now(), early=-10, regular=5,
+                                          profile_organizer=organizer)
+        other = make_tournament('Другой турнир', timezone.now(), early=-10, regular=5)
+        category = make_category()
+
+        def register(tournament, **participant):
+            return Registration.objects.create(
+                tournament=tournament, tournament_category=category, weight_category=60,
+                belt_level='Белый', **participant
+            )
+
+        athlete = User.objects.create_user('athlete', 'athlete@example.com', 'password')
+        profile = Profile_user.objects.create(user=athlete, first_name='Иван', last_name='Петров', phone='+79161234567')
+        self.member = register(self.tournament, profile_user=profile)
+        self.guest = register(self.tournament, unregistered_participant=make_guest(1, last_name='Петрова'))
+        register(self.tournament, unregistered_participant=make_guest(2, last_name='Сидоров'))
+        self.foreign = register(other, unregistered_participant=make_guest(3, last_name='Петровский'))
+
+        self.search_url = reverse('tournaments:check_in_search_api', kwargs={'pk': self.tournament.pk})
+        self.client.login(username='organizer', password='password')
+
+    def search(self, query):
+        response = self.client.get(self.search_url, {'q': query})
+        return [row['id'] for row in response.json()['results']]
+
+    def mark_url(self, registration):
+        return reverse('tournaments:check_in_mark', kwargs={
+            'pk': self.tournament.pk, 'registration_id': registration.pk
+        })
+
+    def test_search_is_scoped_to_tournament(self):
+        self.assertEqual(self.search('петров'), [self.member.pk, self.guest.pk])
+        self.assertEqual(self.search('1234567'), [self.member.pk])
+        self.assertEqual(self.search('athlete@'), [self.member.pk])
+        self.assertEqual(self.search('guest1@'), [self.guest.pk])
+        self.assertEqual(self.search('пе'), [])
+
+    def test_mark_is_single_update(self):
+        # сессия, пользователь, турнир, проверка организатора, UPDATE
+        with self.assertNumQueries(5):
+            response = self.client.post(self.mark_url(self.guest), {'mark': 'check_in'})
+        self.assertEqual(response.status_code, 200)
+
+        self.client.post(self.mark_url(self.guest), {'mark': 'weigh_in', 'actual_weight': '59.4'})
+        self.guest.refresh_from_db()
+        self.assertIsNotNone(self.guest.checked_in_at)
+        self.assertIsNotNone(self.guest.weighed_in_at)
+        self.assertEqual(self.guest.actual_weight, Decimal('59.40'))
+
+    def test_mark_validation(self):
+        response = self.client.post(self.mark_url(self.guest), {'mark': 'weigh_in'})
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(self.mark_url(self.foreign), {'mark': 'check_in'})
+        self.assertEqual(response.status_code, 404)
+        self.foreign.refresh_from_db()
+        self.assertIsNone(self.foreign.checked_in_at)
+
+    def test_only_organizer(self):
+        self.client.login(username='athlete', password='password')
+        self.assertEqual(self.client.get(self.search_url, {'q': 'петров'}).status_code, 403)
+        self.assertEqual(self.client.post(self.mark_url(self.guest), {'mark': 'check_in'}).status_code, 403)
+
+
+class BracketTests(TestCase):
+    def setUp(self):
+        self.tournament = make_tournament('Жеребьевка', timezone.now(), early=-10, regular=5)
+        self.category = make_category(weights=(60, 70, 80, 90))
+        coach = Coach.objects.create(user=User.objects.create_user('coach', 'coach@example.com', 'password'))
+        self.club = Club.objects.create(name='Клуб', coach=coach, location='Москва')
+        self.number = 0
+
+    def register(self, count, weight=60, **kwargs):
+        registrations = []
+        for _ in range(count):
+            self.number += 1
+            registrations.append(Registration.objects.create(
+                tournament=self.tournament, tournament_category=self.category, weight_category=weight,
+                belt_level='Белый', unregistered_participant=make_guest(self.number), **kwargs
+            ))
+        return registrations
+
+    def athletes(self, fight):
+        return {fight.red_id, fight.blue_id}
+
+    def test_seed_order(self):
+        # 1-4, 2-3 в первом круге; первый и второй номера в разных половинах
+        self.assertEqual(seed_order(4), [0, 2, 3, 1])
+        self.assertEqual(seed_order(8), [0, 4, 6, 2, 3, 7, 5, 1])
+
+    def test_single_elimination_with_byes_and_repechage(self):
+        registrations = self.register(6)
+        bracket, = generate_brackets(self.tournament, seed=1)
+        self.assertEqual((bracket.bracket_format, bracket.size, bracket.participants), ('single_elimination', 8, 6))
+
+        fights = list(bracket.fights.all())
+        # Первые два номера проходят четвертьфинал без схватки, утешительные схватки
+        # сводятся к проходу, и проигравшие четвертьфиналы сразу борются за бронзу
+        self.assertEqual([(fight.stage, fight.round) for fight in fights],
+                         [('main', 1), ('main', 1), ('main', 2), ('main', 2), ('main', 3), ('bronze', 1), ('bronze', 1)])
+        entered = {athlete for fight in fights for athlete in self.athletes(fight)} - {None}
+        self.assertEqual(entered, {reg.pk for reg in registrations})
+
+        quarterfinal, _, semifinal, _, final, bronze, _ = fights
+        self.assertEqual((quarterfinal.next_fight, quarterfinal.loser_next_fight), (semifinal, bronze))
+        self.assertIsNotNone(semifinal.red_id)
+        self.assertIsNone(semifinal.blue_id)
+        self.assertIsNone(final.next_fight)
+        self.assertEqual(Fight.objects.filter(bracket=bracket, loser_next_fight=bronze).count(), 2)
+
+    def test_round_robin_for_small_groups(self):
+        registrations = self.register(4)
+        bracket, = generate_brackets(self.tournament, seed=1)
+        self.assertEqual(bracket.bracket_format, 'round_robin')
+        pairs = [frozenset(self.athletes(fight)) for fight in bracket.fights.all()]
+        self.assertEqual(len(pairs), 6)
+        self.assertEqual(len(set(pairs)), 6)
+        self.assertEqual({fight.round for fight in bracket.fights.all()}, {1, 2, 3})
+        self.assertEqual(set().union(*pairs), {reg.pk for reg in registrations})
+
+    def test_single_participant_has_no_fights(self):
+        self.register(1)
+        bracket, = generate_brackets(self.tournament, seed=1)
+        self.assertFalse(bracket.fights.exists())
+
+    def test_draw_is_reproducible(self):
+        self.register(12)
+        self.register(7, weight=70)
+
+        def draw(seed):
+            generate_brackets(self.tournament, seed=seed)
+            return list(Fight.objects.filter(bracket__tournament=self.tournament).values_list(
+                'bracket__weight_category', 'number', 'red', 'blue'
+            ))
+
+        first = draw(42)
+        self.assertEqual(draw(42), first)
+        self.assertNotEqual(draw(43), first)
+
+    def test_seeds_and_club_separation(self):
+        top, second = self.register(2)
+        Registration.objects.filter(pk=top.pk).update(seed=1)
+        Registration.objects.filter(pk=second.pk).update(seed=2)
+        clubmates = self.register(4)
+        for reg in clubmates:
+            reg.unregistered_participant.clubs.add(self.club)
+        self.register(2)
+
+        for seed in range(5):
+            bracket, = generate_brackets(self.tournament, seed=seed)
+            first_round = list(bracket.fights.filter(stage='main', round=1))
+            positions = {}
+            for fight in first_round:
+                positions[fight.red_id] = 2 * (fight.number - 1)
+                positions[fight.blue_id] = 2 * (fight.number - 1) + 1
+            # Посевы в разных половинах, одноклубники не встречаются в первом круге
+            self.assertEqual(meeting_round(positions[top.pk], positions[second.pk]), 3)
+            for fight in first_round:
+                self.assertFalse({fight.red_id, fight.blue_id} <= {reg.pk for reg in clubmates})
+
+    def test_refuses_to_redraw_after_results(self):
+        self.register(2)
+        bracket, = generate_brackets(self.tournament, seed=1)
+        final = bracket.fights.get()
+        final.winner_id = final.red_id
+        final.save()
+        with self.assertRaises(ValidationError):
+            generate_brackets(self.tournament, seed=2)
+        self.assertTrue(Bracket.objects.filter(pk=bracket.pk).exists())
+
+    def test_brackets_page(self):
+        user = User.objects.create_user('organizer', 'org@example.com', 'password')
+        Tournament.objects.filter(pk=self.tournament.pk).update(
+            profile_organizer=Profile_organizer.objects.create(user=user)
+        )
+        self.register(6)
+        self.client.login(username='organizer', password='password')
+        url = reverse('tournaments:tournament_brackets', kwargs={'pk': self.tournament.pk})
+        self.assertRedirects(self.client.post(url, {'seed': '7'}), url)
+        self.assertContains(self.client.get(url), 'Победитель схватки 1')
+        self.assertEqual(Bracket.objects.get(tournament=self.tournament).draw_seed, 7)
+
+
+class ScheduleTests(TestCase):
+    def setUp(self):
+        self.start = timezone.now().replace(second=0, microsecond=0) + timedelta(days=1)
+        self.tournament = make_tournament('Расписание', timezone.now(), early=-10, regular=5,
+                                          mats=2, fight_duration=5, rest_duration=10)
+        Tournament.objects.filter(pk=self.tournament.pk).update(tournament_start=self.start)
+        self.tournament.refresh_from_db()
+        adults = make_category('M1', weights=(60,))
+        kids = make_category('K1', weights=(30,))
+        kids.template.age_from = 8
+        kids.template.save()
+        number = 0
+        for category, weight, count in ((adults, 60, 8), (kids, 30, 3)):
+            for _ in range(count):
+                number += 1
+                Registration.objects.create(
+                    tournament=self.tournament, tournament_category=category, weight_category=weight,
+                    belt_level='Белый', unregistered_participant=make_guest(number)
+                )
+        generate_brackets(self.tournament, seed=1)
+        self.kids = kids
+
+    def fights(self):
+        return list(Fight.objects.filter(bracket__tournament=self.tournament).order_by('scheduled_at', 'mat'))
+
+    def test_mats_rest_and_bracket_order(self):
+        moved, finish = schedule_tournament(self.tournament)
+        fights = self.fights()
+        self.assertEqual(moved, len(fights))
+        duration, rest = timedelta(minutes=5), timedelta(minutes=10)
+        self.assertEqual(finish, max(fight.scheduled_at for fight in fights) + duration)
+
+        by_id = {fight.id: fight for fight in fights}
+        for fight in fights:
+            self.assertIn(fight.mat, (1, 2))
+            self.assertGreaterEqual(fight.scheduled_at, self.start)
+            for target in (fight.next_fight_id, fight.loser_next_fight_id):
+                if target:
+                    self.assertGreaterEqual(by_id[target].scheduled_at, fight.scheduled_at + duration + rest)
+        for mat in (1, 2):
+            starts = [fight.scheduled_at for fight in fights if fight.mat == mat]
+            self.assertTrue(all(later - earlier >= duration for earlier, later in zip(starts, starts[1:])))
+        # Круговая система: участник отдыхает между своими схватками
+        appearances = {}
+        for fight in fights:
+            for athlete in (fight.red_id, fight.blue_id):
+                if athlete:
+                    appearances.setdefault(athlete, []).append(fight.scheduled_at)
+        for starts in appearances.values():
+            self.assertTrue(all(later - earlier >= duration + rest for earlier, later in zip(starts, starts[1:])))
+
+        kids_end = max(fight.scheduled_at for fight in fights if fight.bracket.tournament_category_id == self.kids.pk)
+        self.assertLess(kids_end, max(fight.scheduled_at for fight in fights))
+
+    def test_incremental_keeps_played_fights(self):
+        schedule_tournament(self.tournament)
+        fights = self.fights()
+        played = fights[:2]
+        for fight in played:
+            fight.winner_id = fight.red_id
+            fight.save()
+        now = self.start + timedelta(minutes=7)
+
+        schedule_tournament(self.tournament, incremental=True, now=now)
+        for before, after in zip(fights, self.fights()):
+            if before in played or before.scheduled_at <= now:
+                self.assertEqual((after.mat, after.scheduled_at), (before.mat, before.scheduled_at))
+        replanned = [fight for fight in self.fights() if fight.scheduled_at > now]
+        self.assertTrue(replanned)
+
+    def test_schedule_page(self):
+        user = User.objects.create_user('organizer', 'org@example.com', 'password')
+        Tournament.objects.filter(pk=self.tournament.pk).update(
+            profile_organizer=Profile_organizer.objects.create(user=user)
+        )
+        self.client.login(username='organizer', password='password')
+        url = reverse('tournaments:tournament_schedule', kwargs={'pk': self.tournament.pk})
+        self.assertRedirects(self.client.post(url, {'mode': 'full'}), url)
+        self.assertContains(self.client.get(url), 'Ковер 2')
+
+
+class ResultTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('organizer', 'org@example.com', 'password')
+        organizer = Profile_organizer.objects.create(user=self.user)
+        self.tournament = make_tournament('Результаты', timezone.now(), early=-10, regular=5,
+                                          profile_organizer=organizer)
+        category = make_category(weights=(60, 70))
+        for number, weight in enumerate([60] * 6 + [70] * 3, 1):
+            Registration.objects.create(
+                tournament=self.tournament, tournament_category=category, weight_category=weight,
+                belt_level='Белый', unregistered_participant=make_guest(number)
+            )
+        self.elimination, self.round_robin = generate_brackets(self.tournament, seed=1)
+
+    def tearDown(self):
+        broadcaster.subscribers.clear()
+
+    def play(self, bracket):
+        """Записывает результаты всех схваток сетки по порядку, побеждает красный угол"""
+        for fight_id in bracket.fights.values_list('id', flat=True):
+            record_result(self.tournament, fight_id, 'red', METHOD_POINTS, red_score=2)
+
+    def places(self, bracket):
+        return dict(Registration.objects.filter(
+            tournament_category=bracket.tournament_category, weight_category=bracket.weight_category,
+            place__isnull=False
+        ).values_list('id', 'place'))
+
+    def test_winner_and_loser_advance(self):
+        first = self.elimination.fights.first()
+        event = record_result(self.tournament, first.id, 'blue', METHOD_POINTS, red_score=1, blue_score=3)
+        self.assertEqual(event.payload['category'], 'Мужчины M1, 60 кг, Белый')
+        first.refresh_from_db()
+        self.assertEqual(first.winner_id, first.blue_id)
+        self.assertEqual(getattr(first.next_fight, f'{first.next_slot}_id'), first.blue_id)
+        self.assertEqual(getattr(first.loser_next_fight, f'{first.loser_next_slot}_id'), first.red_id)
+
+        with self.assertRaises(ValidationError):
+            record_result(self.tournament, first.id, 'red', METHOD_POINTS)
+
+    def test_elimination_places(self):
+        self.play(self.elimination)
+        final = self.elimination.fights.get(stage='main', next_fight__isnull=True)
+        places = self.places(self.elimination)
+        self.assertEqual(sorted(places.values()), [1, 2, 3, 3])
+        self.assertEqual((places[final.red_id], places[final.blue_id]), (1, 2))
+        self.assertEqual(Registration.objects.get(pk=final.red_id).result, '1 место')
+
+    def test_round_robin_places_after_last_fight(self):
+        fights = list(self.round_robin.fights.values_list('id', flat=True))
+        for fight_id in fights[:-1]:
+            record_result(self.tournament, fight_id, 'red', METHOD_POINTS)
+        self.assertEqual(self.places(self.round_robin), {})
+
+        event = record_result(self.tournament, fights[-1], 'red', METHOD_POINTS)
+        self.assertEqual(sorted(self.places(self.round_robin).values()), [1, 2, 3])
+        self.assertEqual([row['place'] for row in event.payload['places']], [1, 2, 3])
+
+    def test_result_endpoint(self):
+        fight = self.elimination.fights.first()
+        url = reverse('tournaments:fight_result', kwargs={'pk': self.tournament.pk, 'fight_id': fight.pk})
+        data = {'winner': 'red', 'method': METHOD_POINTS, 'red_score': 4}
+
+        User.objects.create_user('other', 'other@example.com', 'password')
+        self.client.login(username='other', password='password')
+        self.assertEqual(self.client.post(url, data).status_code, 403)
+
+        self.client.login(username='organizer', password='password')
+        self.assertEqual(self.client.post(url, {'winner': 'green'}).status_code, 400)
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.json()['red_score'], response.json()['blue_score']), (4, 0))
+        self.assertEqual(self.client.post(url, data).status_code, 409)
+
+        # Соперники в финале еще не определены
+        final = self.elimination.fights.get(stage='main', next_fight__isnull=True)
+        url = reverse('tournaments:fight_result', kwargs={'pk': self.tournament.pk, 'fight_id': final.pk})
+        self.assertEqual(self.client.post(url, data).status_code, 409)
+
+    async def test_stream_replays_missed_and_pushes_new_results(self):
+        fights = [fight async for fight in Fight.objects.filter(bracket=self.elimination).values_list('id', flat=True)]
+        first = await sync_to_async(record_result)(self.tournament, fights[0], 'red', METHOD_POINTS)
+        url = reverse('tournaments:live_results_stream', kwargs={'pk': self.tournament.pk})
+
+        with patch('tournaments.live.Broadcaster.listen'):
+            response = await self.async_client.get(url, headers={'Last-Event-ID': str(first.id - 1)})
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = aiter(response.streaming_content)
+        self.assertEqual(await anext(content), b'retry: 3000\n\n')
+        self.assertTrue((await anext(content)).startswith(f'id: {first.id}\nevent: result\n'.encode()))
+
+        # Событие от слушателя NOTIFY попадает в поток подписчика
+        second = await sync_to_async(record_result)(self.tournament, fights[1], 'red', METHOD_POINTS)
+        broadcaster.dispatch(json.dumps({'tournament': self.tournament.pk, 'id': second.id, 'data': second.payload}))
+        pushed = (await anext(content)).decode()
+        self.assertTrue(pushed.startswith(f'id: {second.id}\n'))
+        self.assertEqual(json.loads(pushed.split('data: ', 1)[1])['fight'], fights[1])
+        self.assertEqual(await ResultEvent.objects.filter(tournament=self.tournament).acount(), 2)
+
+
+class StandingsTests(TestCase):
+    def setUp(self):
+        self.tournament = make_tournament('Зачет', timezone.now(), early=-10, regular=5)
+        category = make_category(weights=(60, 70))
+        coach = Coach.objects.create(user=User.objects.create_user('coach', 'coach@example.com', 'password'))
+        clubs = [
+            Club.objects.create(name=name, coach=coach, location=region, region=region)
+            for name, region in (('Самбо-70', 'Москва'), ('Динамо', 'Москва'), ('Рубин', 'Казань'))
+        ]
+        # В весе 60 двое (один финал), в весе 70 трое (круговая система)
+        for number, (weight, club) in enumerate([(60, 0), (60, 2), (70, 0), (70, 1), (70, 2)], 1):
+            guest = make_guest(number)
+            guest.clubs.add(clubs[club])
+            Registration.objects.create(
+                tournament=self.tournament, tournament_category=category, weight_category=weight,
+                belt_level='Белый', unregistered_participant=guest
+            )
+        generate_brackets(self.tournament, seed=1)
+        for fight_id in Fight.objects.filter(bracket__tournament=self.tournament).values_list('id', flat=True):
+            record_result(self.tournament, fight_id, 'red', METHOD_POINTS)
+
+    def table(self, scope, tournament=None):
+        return [
+            (row.name, row.gold, row.silver, row.bronze)
+            for row in MedalStanding.objects.filter(scope=scope, tournament=tournament).ranked()
+        ]
+
+    def test_incremental_standings_match_rebuild(self):
+        medals = Registration.objects.filter(place__isnull=False).count()
+        self.assertEqual(medals, 5)
+        clubs = self.table('club', self.tournament)
+        self.assertEqual(sum(gold + silver + bronze for _name, gold, silver, bronze in clubs), medals)
+        regions = self.table('region', self.tournament)
+        self.assertEqual({name for name, *_medals in regions}, {'Москва', 'Казань'})
+        self.assertEqual(sum(row[1] for row in regions), 2)
+        # Зачет по всем турнирам совпадает с единственным турниром
+        self.assertEqual(self.table('club'), clubs)
+        self.assertEqual(len(self.table('athlete')), medals)
+
+        incremental = {scope: self.table(scope, tournament) for scope in ('club', 'region', 'athlete')
+                       for tournament in (None, self.tournament)}
+        MedalStanding.objects.all().delete()
+        self.assertEqual(rebuild_standings(), MedalStanding.objects.count())
+        self.assertEqual({scope: self.table(scope, tournament) for scope in ('club', 'region', 'athlete')
+                          for tournament in (None, self.tournament)}, incremental)
+
+    def test_standings_pages(self):
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse('tournaments:medal_standings'), {'scope': 'athlete'})
+        self.assertEqual(len(response.context['rows']), 5)
+        response = self.client.get(reverse('tournaments:tournament_standings', kwargs={'pk': self.tournament.pk}),
+                                   {'scope': 'region'})
+        self.assertContains(response, 'Казань')
+
+
+class RegistrationFormTests(TestCase):
+    def setUp(self):
+        self.tournament = make_tournament('Форма', timezone.now(), early=-10, regular=-5)
+        self.category = make_category('M1', weights=(60, 70))
+        self.tournament.tournament_categories.add(self.category, make_category('M2'))
+        self.user = User.objects.create_user('athlete', 'athlete@example.com', 'password')
+        self.profile = Profile_user.objects.create(user=self.user, birth_date=date(1995, 1, 1))
+
+    def form(self, **data):
+        tournament = Tournament.objects.select_related('participant_counter').get(pk=self.tournament.pk)
+        data = {'tournament_category': self.category.pk, 'weight_category': 60, 'belt_level': 'Белый', **data}
+        return TournamentRegistrationForm(data, tournament=tournament, user=self.user)
+
+    def test_validation_uses_cached_category_meta(self):
+        self.user.profile_user  # профиль загружает представление
+        self.assertTrue(self.form().is_valid())
+        form = self.form(weight_category=80)
+        with self.assertNumQueries(0):
+            self.assertFalse(form.is_valid())
+        self.assertIn('weight_category', form.errors)
+
+    def test_category_change_refreshes_meta(self):
+        self.assertFalse(self.form(weight_category=80).is_valid())
+        self.category.weight_categories = [60, 70, 80]
+        self.category.save()
+        self.assertTrue(self.form(weight_category=80).is_valid())
+
+        self.category.template.age_from = 40
+        self.category.template.save()
+        self.assertIn('tournament_category', self.form().errors)
+
+    def test_form_sets_category_id_and_gender(self):
+        registration = self.form().save(commit=False)
+        self.assertEqual(registration.tournament_category_id, self.category.pk)
+        # Категория загружается обычным обращением к связи, а не берется из заглушки без шаблона
+        self.assertEqual(registration.tournament_category.template.code, 'M1')
+
+        self.profile.gender = 'Ж'
+        self.profile.save()
+        form = self.form()
+        self.assertEqual(form.errors['tournament_category'], ['Категория только для мужчин'])
+
+    def test_duplicate_rejected_by_unique_index(self):
+        registration = self.form().save(commit=False)
+        registration.tournament, registration.profile_user = self.tournament, self.profile
+        registration.save()
+        duplicate = self.form().save(commit=False)
+        duplicate.tournament, duplicate.profile_user = self.tournament, self.profile
+        with self.assertRaisesMessage(ValidationError, 'Вы уже зарегистрированы в этой категории'):
+            duplicate.save()
+        self.assertEqual(self.tournament.registrations.count(), 1)
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.get_current_participants_count(), 1)
+
+    def test_registration_page_embeds_category_catalog(self):
+        self.client.login(username='athlete', password='password')
+        response = self.client.get(reverse('tournaments:registration_tournament', kwargs={'pk': self.tournament.pk}))
+        self.assertContains(response, 'id="category-catalog"')
+        self.assertEqual(response.context['category_catalog'][self.category.pk]['weights'], (60, 70))
+
+        catalog_url = response.context['catalog_url']
+        response = self.client.get(catalog_url)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(response.json()['categories'][str(self.category.pk)]['belts'], ['Белый'])
+        with self.assertNumQueries(1):
+            self.assertEqual(self.client.get(catalog_url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+        # После изменения категории старая версия не кэшируется, ETag меняется
+        self.category.belt_levels = ['Белый', 'Синий']
+        self.category.save()
+        response = self.client.get(catalog_url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertEqual(response.json()['categories'][str(self.category.pk)]['belts'], ['Белый', 'Синий'])
+
+
+class TeamRegistrationTests(TestCase):
+    def setUp(self):
+        self.tournament = make_tournament('Команды', timezone.now(), early=-10, regular=-5, max_participants=5)
+        self.category = make_category('M1', weights=(60, 70))
+        self.tournament.tournament_categories.add(self.category)
+        self.user = User.objects.create_user('coach', 'coach@example.com', 'password')
+        self.coach = Coach.objects.create(user=self.user)
+        athlete = User.objects.create_user('athlete', 'athlete@example.com', 'password')
+        self.profile = Profile_user.objects.create(
+            user=athlete, last_name='Борцов', first_name='Иван', birth_date=date(1995, 1, 1)
+        )
+        self.guests = [make_guest(number) for number in range(3)]
+        self.coach.participants.add(self.profile)
+        self.coach.unregistered_participants.add(*self.guests)
+        self.client.login(username='coach', password='password')
+
+    def row(self, participant, weight=60, **kwargs):
+        return {'participant': participant, 'tournament_category': self.category.pk,
+                'weight_category': weight, 'belt_level': 'Белый', **kwargs}
+
+    def post(self, rows):
+        return self.client.post(
+            reverse('tournaments:team_registration_api', kwargs={'pk': self.tournament.pk}),
+            json.dumps({'rows': rows}), content_type='application/json'
+        )
+
+    def test_team_registered_in_one_batch(self):
+        rows = [self.row(f'profile:{self.profile.pk}')] + [
+            self.row(f'guest:{guest.pk}', weight=60 + 10 * (number % 2)) for number, guest in enumerate(self.guests)
+        ]
+        for weight in (60, 70):
+            CategoryCounter.objects.create(
+                tournament=self.tournament, tournament_category=self.category, weight_category=weight
+            )
+        # Сессия, пользователь, тренер, турнир, состав (2), категории, существующие регистрации,
+        # вставка и счетчики (1 + 2) в точке сохранения
+        with self.assertNumQueries(14):
+            response = self.post(rows)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(response.json()['registrations']), 4)
+
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.get_current_participants_count(), 4)
+        counts = {weight: n for (_category, weight), n in self.tournament.get_category_participants_counts().items()}
+        self.assertEqual(counts, {60: 3, 70: 1})
+
+    def test_row_errors_reject_whole_team(self):
+        Registration.objects.create(
+            tournament=self.tournament, tournament_category=self.category, weight_category=60,
+            belt_level='Белый', unregistered_participant=self.guests[0]
+        )
+        UnregisteredParticipant.objects.filter(pk=self.guests[2].pk).update(gender='Ж')
+        rows = [
+            self.row(f'profile:{self.profile.pk}'),
+            self.row(f'guest:{self.guests[0].pk}'),
+            self.row(f'guest:{self.guests[1].pk}', weight=90),
+            self.row('guest:0'),
+            self.row(f'profile:{self.profile.pk}'),
+            self.row(f'guest:{self.guests[2].pk}'),
+        ]
+        response = self.post(rows)
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(sorted(errors), ['1', '2', '3', '4', '5'])
+        self.assertIn('Вы уже зарегистрированы в этой категории', errors['1'][0])
+        self.assertIn('Вес 90 кг', errors['2'][0])
+        self.assertEqual(errors['5'], ['Категория только для мужчин'])
+        self.assertEqual(self.tournament.registrations.count(), 1)
+
+    def test_api_coerces_and_rejects_malformed_rows(self):
+        key = f'guest:{self.guests[0].pk}'
+        for row in (self.row(key, weight=[60]), self.row(key, tournament_category={'id': 1}), self.row(key, weight='шестьдесят')):
+            response = self.post([row])
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['errors'], {'__all__': ["Некорректная заявка"]})
+        self.assertFalse(self.tournament.registrations.exists())
+
+        response = self.post([self.row(key, weight='60', tournament_category=str(self.category.pk))])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.tournament.registrations.get().weight_category, 60)
+
+    def test_team_over_capacity_rolls_back(self):
+        self.tournament.max_participants = 3
+        self.tournament.save()
+        rows = [self.row(f'profile:{self.profile.pk}')] + [self.row(f'guest:{guest.pk}') for guest in self.guests]
+        self.assertEqual(self.post(rows).status_code, 409)
+        self.assertFalse(self.tournament.registrations.exists())
+
+    def test_page_registers_checked_athletes(self):
+        url = reverse('tournaments:team_registration', kwargs={'pk': self.tournament.pk})
+        response = self.client.get(url)
+        self.assertContains(response, 'Борцов Иван')
+        self.assertContains(response, 'id="category-catalog"')
+
+        key = f'guest:{self.guests[0].pk}'
+        response = self.client.post(url, {
+            'participant': [key], f'category-{key}': self.category.pk, f'weight-{key}': 70, f'belt-{key}': 'Белый',
+        })
+        self.assertRedirects(response, reverse('tournaments:view_participants', kwargs={'pk': self.tournament.pk}))
+        self.assertTrue(self.tournament.registrations.filter(unregistered_participant=self.guests[0]).exists())
+
+        self.client.login(username='athlete', password='password')
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+
+class GuestIdentityTests(TestCase):
+    def setUp(self):
+        self.tournament = make_tournament('Гости', timezone.now(), early=-10, regular=-5)
+        self.category = make_category('M1')
+        self.other_category = make_category('M2')
+        self.tournament.tournament_categories.add(self.category, self.other_category)
+
+    def register(self, category, email='guest@example.com'):
+        return self.client.post(reverse('tournaments:registration_tournament', kwargs={'pk': self.tournament.pk}), {
+            'first_name': 'Гость', 'last_name': 'Гостев', 'surname': 'Гостевич', 'gender': 'М',
+            'birth_date': '1995-01-01', 'phone': '+70000000000', 'email': email,
+            'tournament_category': category.pk, 'weight_category': 60, 'belt_level': 'Белый',
+        })
+
+    def test_guest_reused_across_registrations(self):
+        self.assertEqual(self.register(self.category).status_code, 302)
+        self.assertEqual(self.register(self.other_category, email=' Guest@Example.com').status_code, 302)
+        self.assertEqual(UnregisteredParticipant.objects.count(), 1)
+        self.assertEqual(self.tournament.registrations.values('unregistered_participant').distinct().count(), 1)
+
+        response = self.register(self.category, email='GUEST@example.com')
+        self.assertContains(response, 'Вы уже зарегистрированы в этой категории')
+        self.assertEqual(self.tournament.registrations.count(), 2)
+
+        data = dict(first_name=' гость', last_name='ГОСТЕВ', surname='', gender='М', birth_date=date(1995, 1, 1),
+                    phone='', email='guest@EXAMPLE.com')
+        participant, created = UnregisteredParticipant.objects.resolve(**data)
+        self.assertFalse(created)
+        self.assertEqual(participant.first_name, 'Гость')
+
+        # Совпали email и дата рождения, но не имя: чужую запись не подставляем
+        with self.assertRaisesMessage(ValidationError, 'уже зарегистрирован под другим именем'):
+            UnregisteredParticipant.objects.resolve(**{**data, 'first_name': 'Другой'})
+        response = self.client.post(reverse('tournaments:registration_tournament', kwargs={'pk': self.tournament.pk}), {
+            'first_name': 'Другой', 'last_name': 'Гостев', 'surname': 'Гостевич', 'gender': 'М',
+            'birth_date': '1995-01-01', 'phone': '+70000000000', 'email': 'guest@example.com',
+            'tournament_category': self.other_category.pk, 'weight_category': 70, 'belt_level': 'Белый',
+        })
+        self.assertContains(response, 'уже зарегистрирован под другим именем')
+        self.assertEqual(self.tournament.registrations.count(), 2)
+
+    def test_merge_repoints_registrations_and_memberships(self):
+        # Дубликаты, накопленные до уникального индекса; DDL откатится вместе с транзакцией теста
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX unique_guest_identity')
+        first, second, third = (
+            make_guest(1, email=email) for email in ('guest@example.com', 'Guest@Example.com', 'GUEST@example.com')
+        )
+        coach = Coach.objects.create(user=User.objects.create_user('coach', 'coach@example.com', 'password'))
+        club = Club.objects.create(name='Клуб', location='Москва', coach=coach)
+        coach.unregistered_participants.add(second)
+        club.unregistered_participants.add(first, third)
+
+        def register(guest, category):
+            return Registration.objects.create(
+                tournament=self.tournament, tournament_category=category, weight_category=60,
+                belt_level='Белый', unregistered_participant=guest
+            )
+        unpaid = register(first, self.category)
+        paid = register(second, self.category)
+        Payment.objects.create(registration=paid, payment_id='p0', amount=Decimal('2000.00'), status='succeeded')
+        other = register(second, self.other_category)
+
+        self.assertEqual(merge_duplicate_participants(batch_size=1), (2, []))
+
+        self.assertEqual(list(UnregisteredParticipant.objects.values_list('id', flat=True)), [first.pk])
+        self.assertFalse(Registration.objects.filter(pk=unpaid.pk).exists())
+        self.assertEqual(
+            set(self.tournament.registrations.values_list('id', 'unregistered_participant')),
+            {(paid.pk, first.pk), (other.pk, first.pk)}
+        )
+        self.assertEqual(list(coach.unregistered_participants.all()), [first])
+        self.assertEqual(list(club.unregistered_participants.all()), [first])
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.get_current_participants_count(), 2)
+
+
+class CapacityTests(TransactionTestCase):
+    def setUp(self):
+        self.tournament = make_tournament('Лимит', timezone.now(), max_participants=5)
+        self.category = make_category()
+        self.tournament.tournament_categories.add(self.category)
+
+    def register(self, participant):
+        return Registration.objects.create(
+            tournament=self.tournament, tournament_category=self.category,
+            weight_category=60, belt_level='Белый', unregistered_participant=participant
+        )
+
+    def test_concurrent_registrations_never_overshoot(self):
+        participants = [make_guest(i) for i in range(20)]
+        barrier = threading.Barrier(len(participants))
+        results = []
+
+        def worker(participant):
+            try:
+                barrier.wait()
+                self.register(participant)
+                results.append('ok')
+            except ValidationError:
+                results.append('full')
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=worker, args=(participant,)) for participant in participants]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count('ok'), 5)
+        self.assertEqual(results.count('full'), 15)
+        self.assertEqual(self.tournament.registrations.count(), 5)
+        self.tournament.refresh_from_db()
+        self.assertEqual(self.tournament.get_current_participants_count(), 5)
+
+    def test_full_tournament_is_rejected_before_form(self):
+        for i in range(5):
+            self.register(make_guest(i))
+        response = self.client.get(reverse('tournaments:registration_tournament', kwargs={'pk': self.tournament.pk}))
+        self.assertRedirects(
+            response, reverse('tournaments:tournament_detail', kwargs={'pk': self.tournament.pk}),
+            fetch_redirect_response=False
+        )
+        with self.assertRaisesMessage(ValidationError, 'Все места на турнире заняты'):
+            self.register(make_guest(6))
@@ -6,6 +6,9 @@ app_name = 'tournaments'
 urlpatterns = [
     path('', views.index, name='index'),
     path('latest/', views.latest, name='latest'),
+    path('api/tournaments/', views.tournaments_api, name='tournaments_api'),
+    path('search/', views.search, name='search'),
+    path('api/tournaments/search/', views.search_api, name='search_api'),
     path('myRegistrations/', views.myRegistrations, name='myRegistrations'),
 
     path('create/', views.createTournament, name='create_tournament'),
@@ -14,9 +17,29 @@ urlpatterns = [
     
     path('<int:pk>/', views.tournament_detail, name='tournament_detail'),
     path('<int:pk>/registration_tournament/', views.registrationTournament, name='registration_tournament'),
+    path('<int:pk>/team-registration/', views.teamRegistration, name='team_registration'),
+    path('api/tournaments/<int:pk>/team-registration/', views.team_registration_api, name='team_registration_api'),
     path('get-category-info/<int:category_id>/', views.get_category_info, name='get_category_info'),
+    path('<int:pk>/categories.json', views.categories_catalog, name='categories_catalog'),
     path('<int:pk>/viewParticipants/', views.viewParticipants, name='viewParticipants'),
     path('tournament/<int:pk>/participants/', views.viewParticipants, name='view_participants'),
+    path('<int:pk>/participants/export.csv', views.exportParticipants, {'export_format': 'csv'},
+         name='export_participants_csv'),
+    path('<int:pk>/participants/export.xlsx', views.exportParticipants, {'export_format': 'xlsx'},
+         name='export_participants_xlsx'),
+    path('<int:pk>/stats/', views.tournamentStats, name='tournament_stats'),
+    path('api/tournaments/<int:pk>/stats/', views.tournament_stats_api, name='tournament_stats_api'),
+    path('<int:pk>/brackets/', views.tournamentBrackets, name='tournament_brackets'),
+    path('<int:pk>/schedule/', views.tournamentSchedule, name='tournament_schedule'),
+    path('api/tournaments/<int:pk>/fights/<int:fight_id>/result/', views.fight_result, name='fight_result'),
+    path('standings/', views.medalStandings, name='medal_standings'),
+    path('<int:pk>/standings/', views.tournamentStandings, name='tournament_standings'),
+    path('<int:pk>/live/', views.liveResults, name='live_results'),
+    path('<int:pk>/live/stream/', views.live_results_stream, name='live_results_stream'),
+    path('<int:pk>/check-in/', views.checkIn, name='check_in'),
+    path('api/tournaments/<int:pk>/check-in/search/', views.check_in_search_api, name='check_in_search_api'),
+    path('api/tournaments/<int:pk>/check-in/<int:registration_id>/', views.check_in_mark, name='check_in_mark'),
     path('participants/', views.viewAllParticipants, name='view_all_participants'),
+    path('participants/<int:pk>/rows/', views.tournamentParticipantsRows, name='participants_rows'),
     # path('registration/<int:pk>/cancel/', views.cancelRegistration, name='cancel_registration'),
 ]
\ No newline at end of file
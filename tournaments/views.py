@@ -1,36 +1,141 @@
+import asyncio
+import json
 from datetime import date
-from django.http import JsonResponse
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render
 from django.utils import timezone
 from accounts.forms import UnregisteredParticipantForm
-from accounts.models import Profile_organizer
+from accounts.models import Profile_organizer, UnregisteredParticipant
 # from accounts.forms import UnregisteredParticipantForm
-from tournaments.forms import TournamentForm, TournamentRegistrationForm, WeightCategoriesForm
-from tournaments.models import Registration, Tournament, TournamentCategory, TournamentCategoryTemplate
+from tournaments.scheduling import schedule_tournament
+from tournaments.results import record_result
+from tournaments.team_registration import coach_roster, parse_rows, register_team
+from tournaments.categories import catalog_version, category_catalog, tournament_categories
+from tournaments import live
+from tournaments.exports import export_rows, stream_csv, stream_xlsx
+from tournaments.filters import SEARCH_LIMIT, TournamentFilter
+from tournaments.stats import get_tournament_stats
+from tournaments.brackets import generate_brackets
+from tournaments.forms import BracketDrawForm, CheckInMarkForm, FightResultForm, TournamentForm, TournamentRegistrationForm, WeightCategoriesForm
+from tournaments.models import Bracket, Fight, FightingStyle, MedalStanding, Registration, ResultEvent, Tournament, TournamentCategory, TournamentCategoryTemplate
+from tournaments.models.fight import METHOD_CHOICES
+from tournaments.models.medal_standing import SCOPE_ATHLETE, SCOPE_CHOICES
+from tournaments.models.registration import LOOKUP_LIMIT, TOURNAMENT_FULL_MESSAGE
 # from tournaments.forms import TournamentForm, TournamentForm2, WeightCategoriesForm, TournamentRegistrationForm
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth.decorators import permission_required
 from django.shortcuts import get_object_or_404
 from django.contrib import messages
 from django.shortcuts import redirect
-from django.db import models
-from collections import defaultdict
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.core.paginator import Paginator
+from django.db import models, transaction
+from django.db.models import Count, F, OuterRef, Prefetch, Q, Subquery
+from django.db.models.functions import Coalesce
+from itertools import groupby
+from operator import attrgetter
 from django.template.loader import render_to_string
+from django.urls import reverse
+from tournaments.pagination import decode_cursor, keyset_page
+from tournaments import conditional
+from django.utils.cache import patch_cache_control
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, etag, require_POST
+from django.views.decorators.vary import vary_on_cookie, vary_on_headers
 
+def _tournament_listing(request, queryset, template_name):
+    """Постраничный вывод карточек турниров; AJAX-запрос получает только следующую порцию"""
+    cards, next_cursor = keyset_page(queryset, request.GET.get('cursor'))
+    context = {'tournaments': cards, 'next_cursor': next_cursor}
+    if request.headers.get('x-requested-with') == 'XMLHttpRequest':
+        return render(request, 'partials/tournament_cards.html', context)
+    return render(request, template_name, context)
+
+
+def _listing_queryset(scope, now):
+    return Tournament.objects.listing(scope, now).for_cards().with_registration_phase(now)
+
+
+# Страницы кэшируются браузером, но каждый раз сверяются с сервером по ETag / Last-Modified
+@cache_control(private=True, no_cache=True)
+@vary_on_headers('Cookie', 'X-Requested-With')
+@condition(etag_func=conditional.listing_etag('active'))
 def index(request):
     now = timezone.now()
-    tournaments = Tournament.objects.filter(
-        registration_deadline__gt=now
-    ).order_by('-created_at')
-    return render(request, 'index.html', {'tournaments': tournaments})
+    tournaments = _listing_queryset('active', now)
+    return _tournament_listing(request, tournaments, 'index.html')
 
 
+@cache_control(private=True, no_cache=True)
+@vary_on_headers('Cookie', 'X-Requested-With')
+@condition(etag_func=conditional.listing_etag('latest'))
 def latest(request):
     now = timezone.now()
-    tournaments = Tournament.objects.filter(
-        registration_deadline__lte=now
-    ).order_by('-created_at')
-    return render(request, 'latest.html', {'tournaments': tournaments})
+    tournaments = _listing_queryset('latest', now)
+    return _tournament_listing(request, tournaments, 'latest.html')
+
+
+def tournaments_api(request):
+    """JSON-каталог турниров с курсорной пагинацией (?cursor=, ?scope=latest)"""
+    cursor = request.GET.get('cursor')
+    if cursor and decode_cursor(cursor) is None:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+
+    now = timezone.now()
+    tournaments, next_cursor = keyset_page(_listing_queryset(request.GET.get('scope'), now), cursor)
+    return JsonResponse({
+        'results': [_tournament_json(tournament) for tournament in tournaments],
+        'next_cursor': next_cursor,
+    })
+
+
+def _tournament_json(tournament):
+    return {
+        'id': tournament.id,
+        'title': tournament.title,
+        'location': tournament.location,
+        'image': tournament.image.url if tournament.image else None,
+        'registration_deadline': tournament.registration_deadline,
+        'tournament_start': tournament.tournament_start,
+        'tournament_end': tournament.tournament_end,
+        'current_phase': tournament.current_phase,
+        'current_price': tournament.current_price,
+        'url': reverse('tournaments:tournament_detail', kwargs={'pk': tournament.pk}),
+    }
+
+
+def _search(request):
+    """Фильтрует турниры по параметрам запроса; возвращает (фильтр, результаты, фасеты)"""
+    now = timezone.now()
+    tournament_filter = TournamentFilter(
+        request.GET,
+        queryset=Tournament.objects.for_cards().with_registration_phase(now).order_by('-created_at', '-id'),
+        now=now
+    )
+    styles = list(FightingStyle.objects.all())
+    results = list(tournament_filter.qs[:SEARCH_LIMIT]) if tournament_filter.is_valid() else []
+    facets = tournament_filter.facets(styles) if tournament_filter.is_valid() else None
+    return tournament_filter, results, facets
+
+
+def search(request):
+    tournament_filter, tournaments, facets = _search(request)
+    return render(request, 'search.html', {
+        'filter': tournament_filter,
+        'tournaments': tournaments,
+        'facets': facets,
+    })
+
+
+def search_api(request):
+    tournament_filter, tournaments, facets = _search(request)
+    if not tournament_filter.is_valid():
+        return JsonResponse({'errors': tournament_filter.errors}, status=400)
+    return JsonResponse({
+        'results': [_tournament_json(tournament) for tournament in tournaments],
+        'facets': facets,
+    })
+
 
 @login_required
 def myRegistrations(request):
@@ -39,16 +144,16 @@ def myRegistrations(request):
     
     # Получаем все регистрации пользователя
     registrations = Registration.objects.filter(
-        models.Q(Profile_user__user=request.user) | 
+        models.Q(profile_user__user=request.user) | 
         models.Q(unregistered_participant__email=request.user.email)
     ).select_related(
-        'Tournament',
+        'tournament',
         'tournament_category',
         'tournament_category__template',
-        'Profile_user',
+        'profile_user',
         'unregistered_participant'
     ).order_by(
-        'Tournament__tournament_start'
+        'tournament__tournament_start'
     )
     
     # Разделяем на текущие и прошедшие регистрации
@@ -57,7 +162,7 @@ def myRegistrations(request):
     past_regs = []
     
     for reg in registrations:
-        if reg.Tournament.tournament_start.date() >= today:
+        if reg.tournament.tournament_start.date() >= today:
             upcoming_regs.append(reg)
         else:
             past_regs.append(reg)
@@ -209,120 +314,123 @@ def get_weights_form(request):
     }, status=400)
 
 
+@cache_control(private=True, no_cache=True)
+@vary_on_cookie
+@condition(etag_func=conditional.tournament_etag)
 def tournament_detail(request, pk):
-    tournament = get_object_or_404(Tournament, pk=pk)
-    profile_organizer = tournament.profile_organizer
-    return render(request, 'tournament_detail.html', {'tournament': tournament, 'profile_organizer': profile_organizer})
+    tournament = get_object_or_404(Tournament.objects.for_detail(), pk=pk)
+    return render(request, 'tournament_detail.html', _tournament_detail_context(tournament))
+
+
+def _tournament_detail_context(tournament):
+    """Контекст страницы турнира: период регистрации вычисляется один раз, шаблон не делает запросов"""
+    return {
+        'tournament': tournament,
+        'profile_organizer': tournament.profile_organizer,
+        'fighting_styles': tournament.fs_qset(),
+        'categories': tournament.tournament_categories.all(),
+        'registration_info': tournament.get_current_registration_info(),
+        'registration_price': tournament.get_current_registration_price(),
+    }
+
+
+def _participant_row(reg):
+    """Строка участника для списка; статус последнего платежа уже аннотирован подзапросом"""
+    if reg.profile_user:
+        return {
+            'name': reg.profile_user.get_full_name(),
+            'email': reg.profile_user.user.email,
+            'type': 'registered',
+            'payment_status': reg.last_payment_status or 'Не оплачено',
+            'payment_date': reg.last_payment_date
+        }
+    return {
+        'name': f"{reg.unregistered_participant.last_name} {reg.unregistered_participant.first_name} {reg.unregistered_participant.surname}",
+        'email': reg.unregistered_participant.email,
+        'type': 'unregistered',
+        'payment_status': reg.last_payment_status or 'Не оплачено',
+        'payment_date': reg.last_payment_date
+    }
 
 
 def viewParticipants(request, pk):
     tournament = get_object_or_404(Tournament, pk=pk)
     
     # Получаем все категории турнира
-    categories = tournament.tournament_categories.all().select_related('template')
+    categories = {
+        category.id: category
+        for category in tournament.tournament_categories.all().select_related('template__fighting_style')
+    }
     
-    # Создаем структуру данных для хранения участников
-    participants_data = defaultdict(lambda: defaultdict(list))
+    registrations = Registration.objects.filter(tournament=tournament)
+    # Количество участников и оплативших по (категория, вес) считает база
+    counts = {
+        (row['tournament_category'], row['weight_category']): row
+        for row in registrations.participant_counts()
+    }
     
-    # Получаем всех зарегистрированных участников
-    registrations = Registration.objects.filter(
-        tournament=tournament
-    ).select_related(
-        'tournament_category',
+    # Участники приходят уже упорядоченными по категориям и весам
+    rows = registrations.select_related(
         'profile_user',
         'profile_user__user',
         'unregistered_participant'
-    ).prefetch_related(
-        'payments'
-    ).order_by(
+    ).with_last_payment().order_by(
         'tournament_category__template__name',
+        'tournament_category_id',
         'weight_category'
     )
     
-    # Группируем участников по категориям и весам
-    for reg in registrations:
-        # Получаем последний платеж для регистрации
-        last_payment = reg.payments.order_by('-created_at').first()
-        payment_status = last_payment.status if last_payment else 'Не оплачено'
-        
-        if reg.profile_user:
-            participant = {
-                'name': reg.profile_user.get_full_name(),
-                'email': reg.profile_user.user.email,
-                'type': 'registered',
-                'payment_status': payment_status,
-                'payment_date': last_payment.created_at if last_payment else None
-            }
-        else:
-            participant = {
-                'name': f"{reg.unregistered_participant.last_name} {reg.unregistered_participant.first_name} {reg.unregistered_participant.surname}",
-                'email': reg.unregistered_participant.email,
-                'type': 'unregistered',
-                'payment_status': payment_status,
-                'payment_date': last_payment.created_at if last_payment else None
-            }
-        
-        participants_data[reg.tournament_category][reg.weight_category].append(participant)
-    
-    # Создаем финальную структуру для шаблона
+    # Один проход: группируем по категории, внутри — по весу
     categories_list = []
-    for category in categories:
-        weight_categories = []
-        
-        # Для стандартных весовых категорий из шаблона
-        for weight in sorted(category.weight_categories):
-            participants = participants_data[category].get(weight, [])
-            if participants:  # Добавляем только если есть участники
-                paid_count = sum(1 for p in participants if p['payment_status'] == 'succeeded')
-                weight_categories.append({
-                    'weight': weight,
-                    'participants': participants,
-                    'count': len(participants),
-                    'paid_count': paid_count
-                })
+    for category_id, category_regs in groupby(rows.iterator(), key=attrgetter('tournament_category_id')):
+        category = categories.get(category_id)
+        if category is None:
+            continue
         
-        # Для нестандартных весовых категорий (если есть)
-        custom_weights = set(participants_data[category].keys()) - set(category.weight_categories)
-        for weight in sorted(custom_weights):
-            participants = participants_data[category][weight]
-            if participants:  # Добавляем только если есть участники
-                paid_count = sum(1 for p in participants if p['payment_status'] == 'succeeded')
-                weight_categories.append({
-                    'weight': weight,
-                    'participants': participants,
-                    'count': len(participants),
-                    'paid_count': paid_count,
-                    'custom': True
-                })
-        
-        # Добавляем категорию только если в ней есть участники
-        if weight_categories:
-            total_paid = sum(w['paid_count'] for w in weight_categories)
-            categories_list.append({
-                'category': category,
-                'weight_categories': weight_categories,
-                'total_participants': sum(len(p) for p in participants_data[category].values()),
-                'total_paid': total_paid
+        weight_categories = []
+        for weight, weight_regs in groupby(category_regs, key=attrgetter('weight_category')):
+            row = counts[(category_id, weight)]
+            weight_categories.append({
+                'weight': weight,
+                'participants': [_participant_row(reg) for reg in weight_regs],
+                'count': row['participants'],
+                'paid_count': row['paid'],
+                # Нестандартные весовые категории выводятся после стандартных
+                'custom': weight not in category.weight_categories
             })
+        weight_categories.sort(key=lambda w: (w['custom'], w['weight']))
+        
+        categories_list.append({
+            'category': category,
+            'weight_categories': weight_categories,
+            'total_participants': sum(w['count'] for w in weight_categories),
+            'total_paid': sum(w['paid_count'] for w in weight_categories)
+        })
     
-    # Сортируем категории по имени
-    categories_list.sort(key=lambda x: x['category'].template.name)
-    
+    can_export = request.user.is_authenticated and (
+        request.user.is_staff or _is_tournament_organizer(request.user, tournament)
+    )
     return render(request, 'view_participants.html', {
         'tournament': tournament,
-        'categories_list': categories_list
+        'categories_list': categories_list,
+        'can_export': can_export
     })
 
 
 
 
 def registrationTournament(request, pk):
-    tournament = get_object_or_404(Tournament, pk=pk)
+    tournament = get_object_or_404(
+        Tournament.objects.with_registration_phase().select_related('participant_counter'), pk=pk
+    )
     
     # Проверка доступности регистрации
     if not tournament.is_registration_open():
         messages.error(request, "Регистрация на этот турнир закрыта")
         return redirect('tournaments:tournament_detail', pk=pk)
+    if not tournament.has_free_places():
+        messages.error(request, TOURNAMENT_FULL_MESSAGE)
+        return redirect('tournaments:tournament_detail', pk=pk)
 
     # Проверка существующей регистрации
     existing_reg = None
@@ -349,6 +457,8 @@ def registrationTournament(request, pk):
                     messages.success(request, "Вы успешно зарегистрированы на турнир!")
                     # Перенаправляем на страницу оплаты
                     return redirect('payments:create_payment', registration_id=registration.id)
+                except ValidationError as e:
+                    messages.error(request, e.messages[0])
                 except Exception as e:
                     messages.error(request, f"Произошла ошибка при регистрации: {str(e)}")
             else:
@@ -363,18 +473,22 @@ def registrationTournament(request, pk):
             
             if participant_form.is_valid() and reg_form.is_valid():
                 try:
-                    # Сначала сохраняем данные неавторизованного участника
-                    participant = participant_form.save()
-                    
-                    # Затем создаем регистрацию
-                    registration = reg_form.save(commit=False)
-                    registration.unregistered_participant = participant
-                    registration.tournament = tournament
-                    registration.save()
+                    # Участник и регистрация в одной транзакции: при нехватке мест участник не сохранится
+                    with transaction.atomic():
+                        # Гость находится по email и дате рождения: повторные регистрации не плодят записи
+                        participant, _created = UnregisteredParticipant.objects.resolve(**participant_form.cleaned_data)
+                        
+                        # Затем создаем регистрацию
+                        registration = reg_form.save(commit=False)
+                        registration.unregistered_participant = participant
+                        registration.tournament = tournament
+                        registration.save()
                     
                     messages.success(request, "Регистрация завершена успешно!")
                     # Перенаправляем на страницу оплаты
                     return redirect('payments:create_payment', registration_id=registration.id)
+                except ValidationError as e:
+                    messages.error(request, e.messages[0])
                 except Exception as e:
                     messages.error(request, f"Произошла ошибка при регистрации: {str(e)}")
             else:
@@ -394,9 +508,115 @@ def registrationTournament(request, pk):
         'reg_form': reg_form,
         'participant_form': participant_form,
         'existing_reg': existing_reg,
-        'user': request.user
+        'user': request.user,
+        # Справочник категорий встраивается в страницу: выбор категории не требует запросов
+        'category_catalog': category_catalog(tournament_categories(tournament)),
+        'catalog_url': f"{reverse('tournaments:categories_catalog', kwargs={'pk': pk})}?v={catalog_version(tournament)}",
+    })
+
+def _coach_tournament(request, pk):
+    """Турнир для командной регистрации и тренер текущего пользователя"""
+    coach = getattr(request.user, 'coach', None)
+    if coach is None:
+        raise PermissionDenied
+    tournament = get_object_or_404(
+        Tournament.objects.with_registration_phase().select_related('participant_counter'), pk=pk
+    )
+    return tournament, coach
+
+
+def _team_registration_closed(tournament):
+    if not tournament.is_registration_open():
+        return "Регистрация на этот турнир закрыта"
+    if not tournament.has_free_places():
+        return TOURNAMENT_FULL_MESSAGE
+    return None
+
+
+@login_required
+def teamRegistration(request, pk):
+    """Командная регистрация: тренер записывает спортсменов своего состава одной заявкой"""
+    tournament, coach = _coach_tournament(request, pk)
+    closed = _team_registration_closed(tournament)
+    if closed:
+        messages.error(request, closed)
+        return redirect('tournaments:tournament_detail', pk=pk)
+
+    rows, errors = [], {}
+    if request.method == 'POST':
+        rows = parse_rows(request.POST)
+        if not rows:
+            messages.error(request, "Отметьте спортсменов для регистрации")
+        else:
+            try:
+                registrations, errors = register_team(tournament, coach, rows)
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+            else:
+                if registrations:
+                    messages.success(request, f"Зарегистрировано спортсменов: {len(registrations)}")
+                    return redirect('tournaments:view_participants', pk=pk)
+                messages.error(request, "Заявка не сохранена: исправьте ошибки в отмеченных строках")
+
+    # Отмеченные строки и их ошибки показываются рядом со спортсменами
+    submitted = {row['participant']: (row, errors.get(index, [])) for index, row in enumerate(rows)}
+    roster = [(entry, *submitted.get(entry.key, (None, []))) for entry in coach_roster(coach).values()]
+    return render(request, 'team_registration.html', {
+        'tournament': tournament,
+        'roster': roster,
+        'categories': tournament_categories(tournament).values(),
+        'category_catalog': category_catalog(tournament_categories(tournament)),
     })
 
+
+@login_required
+@require_POST
+def team_registration_api(request, pk):
+    """
+    Командная регистрация из JSON: {"rows": [{"participant": "profile:1", "tournament_category": 2,
+    "weight_category": 60, "belt_level": "..."}]}. Ошибки возвращаются по номерам строк.
+    """
+    tournament, coach = _coach_tournament(request, pk)
+    closed = _team_registration_closed(tournament)
+    if closed:
+        return JsonResponse({'errors': {'__all__': [closed]}}, status=409)
+    try:
+        rows = [
+            {'participant': str(row['participant']), 'tournament_category': int(row['tournament_category']),
+             'weight_category': int(row['weight_category']), 'belt_level': str(row.get('belt_level', ''))}
+            for row in json.loads(request.body)['rows']
+        ]
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({'errors': {'__all__': ["Некорректная заявка"]}}, status=400)
+    try:
+        registrations, errors = register_team(tournament, coach, rows)
+    except ValidationError as e:
+        return JsonResponse({'errors': {'__all__': e.messages}}, status=409)
+    if errors or not registrations:
+        return JsonResponse({'errors': errors or {'__all__': ["Заявка пуста"]}}, status=400)
+    return JsonResponse({'registrations': [reg.id for reg in registrations]}, status=201)
+
+
+# Справочник с версией в URL не меняется, пока не изменится турнир
+CATALOG_MAX_AGE = 60 * 60 * 24 * 365
+
+
+@etag(conditional.catalog_etag)
+def categories_catalog(request, pk):
+    """Справочник категорий турнира; по URL с актуальной версией кэшируется надолго"""
+    tournament = conditional.catalog_tournament(request, pk)
+    if tournament is None:
+        raise Http404
+    response = JsonResponse({'categories': category_catalog(tournament_categories(tournament))})
+    if request.GET.get('v') == catalog_version(tournament):
+        patch_cache_control(response, public=True, max_age=CATALOG_MAX_AGE, immutable=True)
+    else:
+        patch_cache_control(response, no_cache=True)
+    return response
+
+
+@cache_control(no_cache=True)
+@etag(conditional.category_etag)
 def get_category_info(request, category_id):
     """Получение информации о категории (веса, пояса и возрастные ограничения)"""
     category = get_object_or_404(TournamentCategory, pk=category_id)
@@ -407,59 +627,350 @@ def get_category_info(request, category_id):
         'age_to': category.template.age_to
     })
 
+# Количество участников в одной порции таблицы турнира
+PARTICIPANTS_PAGE_SIZE = 100
+
+
 def viewAllParticipants(request):
-    # Получаем все регистрации с предзагрузкой связанных данных
-    registrations = Registration.objects.all().select_related(
-        'tournament',
-        'tournament_category',
-        'tournament_category__template',
-        'profile_user',
+    """Список турниров с итогами; таблицы участников подгружаются по запросу"""
+    now = timezone.now()
+    paid = Registration.objects.filter(tournament=OuterRef('pk')).paid().order_by().values(
+        'tournament'
+    ).annotate(paid=Count('id')).values('paid')
+    tournaments = Tournament.objects.filter(
+        participant_counter__participants__gt=0
+    ).annotate(
+        total_participants=F('participant_counter__participants'),
+        paid_participants=Coalesce(Subquery(paid), 0),
+        completed=Q(tournament_end__lt=now),
+    ).only('id', 'title', 'tournament_start', 'tournament_end', 'created_at')
+    tournaments, next_cursor = keyset_page(tournaments, request.GET.get('cursor'))
+
+    return render(request, 'view_all_participants.html', {
+        'tournaments_list': tournaments,
+        'next_cursor': next_cursor,
+    })
+
+
+def tournamentParticipantsRows(request, pk):
+    """Порция строк таблицы участников турнира (AJAX)"""
+    tournament = get_object_or_404(Tournament.objects.only('id'), pk=pk)
+    registrations = Registration.objects.filter(tournament=tournament).select_related(
+        'tournament_category__template__fighting_style',
+        'profile_user__user',
         'unregistered_participant'
-    ).prefetch_related(
-        'payments'
-    ).order_by(
-        'tournament__tournament_start',
+    ).with_last_payment().order_by(
         'tournament_category__template__name',
-        'weight_category'
+        'weight_category',
+        'id'
     )
-    
-    # Группируем регистрации по турнирам
-    tournaments_data = defaultdict(list)
-    for reg in registrations:
-        # Получаем последний платеж для регистрации
-        last_payment = reg.payments.order_by('-created_at').first()
-        payment_status = last_payment.status if last_payment else 'Не оплачено'
-        
-        # Формируем данные участника
-        participant_data = {
-            'registration': reg,
-            'name': reg.profile_user.get_full_name() if reg.profile_user else 
-                   f"{reg.unregistered_participant.last_name} {reg.unregistered_participant.first_name} {reg.unregistered_participant.surname}",
-            'email': reg.profile_user.user.email if reg.profile_user else reg.unregistered_participant.email,
-            'category': reg.tournament_category.actual_name,
+    page = Paginator(registrations, PARTICIPANTS_PAGE_SIZE).get_page(request.GET.get('page'))
+
+    participants = []
+    for reg in page:
+        participant = _participant_row(reg)
+        participant.update({
+            'category': reg.tournament_category.actual_name(),
             'weight': reg.weight_category,
             'belt': reg.belt_level,
-            'payment_status': payment_status,
-            'payment_date': last_payment.created_at if last_payment else None,
-            'is_registered': bool(reg.profile_user)
-        }
-        
-        tournaments_data[reg.tournament].append(participant_data)
-    
-    # Преобразуем в список для шаблона
-    tournaments_list = [
-        {
-            'tournament': tournament,
-            'participants': sorted(participants, key=lambda x: (x['category'], x['weight'])),
-            'total_participants': len(participants),
-            'paid_participants': sum(1 for p in participants if p['payment_status'] == 'succeeded')
-        }
-        for tournament, participants in tournaments_data.items()
+            'is_registered': bool(reg.profile_user),
+        })
+        participants.append(participant)
+
+    return render(request, 'partials/participant_rows.html', {
+        'tournament': tournament,
+        'participants': participants,
+        'page': page,
+    })
+
+
+EXPORT_FORMATS = {
+    'csv': (stream_csv, 'text/csv; charset=utf-8'),
+    'xlsx': (stream_xlsx, 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+}
+
+
+@login_required
+def exportParticipants(request, pk, export_format):
+    """Потоковая выгрузка участников турнира (CSV / XLSX) для организатора"""
+    tournament = _organizer_tournament(request, pk)
+
+    stream, content_type = EXPORT_FORMATS[export_format]
+    response = StreamingHttpResponse(stream(export_rows(tournament)), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="participants-{tournament.pk}.{export_format}"'
+    return response
+
+
+def _is_tournament_organizer(user, tournament):
+    return tournament.profile_organizer_id is not None and Profile_organizer.objects.filter(
+        pk=tournament.profile_organizer_id, user=user
+    ).exists()
+
+
+def _organizer_tournament(request, pk, queryset=None):
+    """Турнир, доступный только его организатору и персоналу"""
+    if queryset is None:
+        queryset = Tournament.objects.only('id', 'title', 'profile_organizer')
+    tournament = get_object_or_404(queryset, pk=pk)
+    if not (request.user.is_staff or _is_tournament_organizer(request.user, tournament)):
+        raise PermissionDenied
+    return tournament
+
+
+@login_required
+def tournamentStats(request, pk):
+    """Панель статистики турнира для организатора"""
+    tournament = _organizer_tournament(request, pk)
+    return render(request, 'tournament_stats.html', {
+        'tournament': tournament,
+        'stats': get_tournament_stats(tournament),
+    })
+
+
+@login_required
+def tournament_stats_api(request, pk):
+    tournament = _organizer_tournament(request, pk)
+    return JsonResponse(get_tournament_stats(tournament))
+
+
+@login_required
+def checkIn(request, pk):
+    """Регистрация на месте и взвешивание: поиск участника и отметки"""
+    tournament = _organizer_tournament(request, pk)
+    return render(request, 'check_in.html', {'tournament': tournament, 'form': CheckInMarkForm()})
+
+
+def _check_in_json(reg):
+    participant = reg.profile_user or reg.unregistered_participant
+    return {
+        'id': reg.id,
+        'name': participant.get_full_name() if reg.profile_user else str(participant),
+        'birth_date': participant.birth_date,
+        'phone': participant.phone or '',
+        'email': reg.profile_user.user.email if reg.profile_user else participant.email,
+        'category': reg.tournament_category.actual_name(),
+        'weight_category': reg.weight_category,
+        'belt_level': reg.belt_level,
+        'checked_in_at': reg.checked_in_at,
+        'weighed_in_at': reg.weighed_in_at,
+        'actual_weight': reg.actual_weight,
+    }
+
+
+@login_required
+def check_in_search_api(request, pk):
+    """Автодополнение по фамилии, имени, телефону и email среди регистраций турнира"""
+    tournament = _organizer_tournament(request, pk)
+    registrations = Registration.objects.filter(tournament=tournament).lookup(
+        request.GET.get('q', '')
+    ).select_related(
+        'tournament_category__template',
+        'profile_user__user',
+        'unregistered_participant'
+    ).order_by(
+        Coalesce('profile_user__last_name', 'unregistered_participant__last_name'),
+        'id'
+    )[:LOOKUP_LIMIT]
+    return JsonResponse({'results': [_check_in_json(reg) for reg in registrations]})
+
+
+@login_required
+@require_POST
+def check_in_mark(request, pk, registration_id):
+    """Отметка прибытия или взвешивания одним UPDATE, без чтения регистрации"""
+    tournament = _organizer_tournament(request, pk)
+    form = CheckInMarkForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    values = form.update_values()
+    if not Registration.objects.filter(pk=registration_id, tournament=tournament).update(**values):
+        raise Http404
+    return JsonResponse({'id': registration_id, **values})
+
+
+def _fight_labels(fights):
+    """Подписи углов схваток, участники которых определятся по ходу турнира"""
+    labels = {}
+    for fight in fights:
+        if fight.next_fight_id:
+            labels[fight.next_fight_id, fight.next_slot] = f"Победитель схватки {fight.number}"
+        if fight.loser_next_fight_id:
+            labels[fight.loser_next_fight_id, fight.loser_next_slot] = f"Проигравший в схватке {fight.number}"
+    for fight in fights:
+        fight.red_label = fight.red.participant_name() if fight.red else labels.get((fight.id, 'red'), '—')
+        fight.blue_label = fight.blue.participant_name() if fight.blue else labels.get((fight.id, 'blue'), '—')
+
+
+@login_required
+def tournamentBrackets(request, pk):
+    """Сетки турнира; POST проводит жеребьевку заново"""
+    tournament = _organizer_tournament(request, pk)
+    if request.method == 'POST':
+        form = BracketDrawForm(request.POST)
+        if form.is_valid():
+            try:
+                brackets = generate_brackets(tournament, seed=form.cleaned_data['seed'])
+                messages.success(request, f"Построено сеток: {len(brackets)}")
+            except ValidationError as e:
+                messages.error(request, e.messages[0])
+            return redirect('tournaments:tournament_brackets', pk=pk)
+    else:
+        form = BracketDrawForm()
+
+    participant = ('profile_user', 'unregistered_participant')
+    fights = Fight.objects.select_related(
+        *(f'{corner}__{field}' for corner in ('red', 'blue') for field in participant)
+    )
+    brackets = list(
+        Bracket.objects.filter(tournament=tournament).select_related(
+            'tournament_category__template'
+        ).prefetch_related(Prefetch('fights', queryset=fights))
+    )
+    for bracket in brackets:
+        _fight_labels(bracket.fights.all())
+    return render(request, 'brackets.html', {
+        'tournament': tournament,
+        'brackets': brackets,
+        'form': form,
+    })
+
+
+@login_required
+def tournamentSchedule(request, pk):
+    """Расписание схваток по коврам; POST строит его заново или переставляет несыгранные схватки"""
+    tournament = _organizer_tournament(request, pk, Tournament.objects.all())
+    if request.method == 'POST':
+        moved, finish = schedule_tournament(tournament, incremental=request.POST.get('mode') == 'incremental')
+        messages.success(request, f"Перенесено схваток: {moved}, окончание: {timezone.localtime(finish):%d.%m.%Y %H:%M}")
+        if finish > tournament.tournament_end:
+            messages.warning(request, "Расписание не укладывается в даты турнира")
+        return redirect('tournaments:tournament_schedule', pk=pk)
+
+    participant = ('profile_user', 'unregistered_participant')
+    fights = list(
+        Fight.objects.filter(bracket__tournament=tournament).select_related(
+            'bracket__tournament_category__template',
+            *(f'{corner}__{field}' for corner in ('red', 'blue') for field in participant)
+        ).order_by('mat', 'scheduled_at', 'id')
+    )
+    _fight_labels(fights)
+    mats = [
+        {'mat': mat, 'fights': list(mat_fights)}
+        for mat, mat_fights in groupby((fight for fight in fights if fight.mat), key=attrgetter('mat'))
     ]
-    
-    # Сортируем турниры по дате начала
-    tournaments_list.sort(key=lambda x: x['tournament'].tournament_start)
-    
-    return render(request, 'view_all_participants.html', {
-        'tournaments_list': tournaments_list
-    })
\ No newline at end of file
+    return render(request, 'schedule.html', {
+        'tournament': tournament,
+        'mats': mats,
+        'unscheduled': sum(1 for fight in fights if not fight.mat),
+        'methods': METHOD_CHOICES,
+    })
+
+
+@login_required
+@require_POST
+def fight_result(request, pk, fight_id):
+    """Результат схватки с судейского стола ковра"""
+    tournament = _organizer_tournament(request, pk)
+    form = FightResultForm(request.POST)
+    if not form.is_valid():
+        return JsonResponse({'errors': form.errors}, status=400)
+    try:
+        event = record_result(tournament, fight_id, **form.cleaned_data)
+    except Fight.DoesNotExist:
+        raise Http404
+    except ValidationError as e:
+        return JsonResponse({'errors': {'__all__': e.messages}}, status=409)
+    return JsonResponse({'id': event.id, **event.payload})
+
+
+STANDINGS_LIMIT = 100
+
+
+def _standings_page(request, tournament, scopes):
+    """Таблица зачета одного разреза; строки уже посчитаны, читаются первые STANDINGS_LIMIT по индексу"""
+    scope = request.GET.get('scope')
+    if scope not in dict(scopes):
+        scope = scopes[0][0]
+    rows = MedalStanding.objects.filter(scope=scope, tournament=tournament).ranked()[:STANDINGS_LIMIT]
+    return render(request, 'standings.html', {
+        'tournament': tournament,
+        'scopes': scopes,
+        'scope': scope,
+        'rows': rows,
+    })
+
+
+def medalStandings(request):
+    """Медальный зачет по всем турнирам"""
+    return _standings_page(request, None, SCOPE_CHOICES)
+
+
+def tournamentStandings(request, pk):
+    """Медальный зачет клубов и регионов турнира"""
+    tournament = get_object_or_404(Tournament.objects.only('id', 'title'), pk=pk)
+    scopes = [choice for choice in SCOPE_CHOICES if choice[0] != SCOPE_ATHLETE]
+    return _standings_page(request, tournament, scopes)
+
+
+def liveResults(request, pk):
+    """Табло результатов турнира; новые результаты приходят через SSE"""
+    tournament = get_object_or_404(Tournament.objects.only('id', 'title'), pk=pk)
+    events = list(ResultEvent.objects.filter(tournament=tournament).order_by('-id')[:50])
+    return render(request, 'live_results.html', {
+        'tournament': tournament,
+        'events': events,
+        'last_event_id': events[0].id if events else 0,
+    })
+
+
+def _last_event_id(request):
+    value = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+async def live_results_stream(request, pk):
+    """
+    SSE-поток результатов турнира. Асинхронное представление: открытое соединение
+    ждет события в очереди и не занимает поток, поэтому отдается ASGI-сервером (см. nginx.conf).
+    """
+    if not await Tournament.objects.filter(pk=pk).aexists():
+        raise Http404
+    last_event_id = _last_event_id(request)
+    # Подписка до чтения пропущенных событий, чтобы не потерять пришедшие между ними
+    queue = await live.broadcaster.subscribe(pk)
+    missed = []
+    if last_event_id is not None:
+        missed = [
+            event async for event in ResultEvent.objects.filter(
+                tournament_id=pk, id__gt=last_event_id
+            ).order_by('id').values_list('id', 'payload')[:live.REPLAY_LIMIT]
+        ]
+
+    async def stream():
+        sent = last_event_id or 0
+        try:
+            yield f"retry: {live.RETRY_INTERVAL}\n\n"
+            for event_id, payload in missed:
+                yield live.format_event(event_id, payload)
+                sent = event_id
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), live.HEARTBEAT_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if event is None:
+                    return
+                if event['id'] > sent:
+                    yield live.format_event(event['id'], event['data'])
+                    sent = event['id']
+        finally:
+            live.broadcaster.unsubscribe(pk, queue)
+
+    response = StreamingHttpResponse(stream(), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response